@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""Compare aggregates computed in one pass with the indexed ones.
+
+Usage: python3 -m benchmarks.bench_aggregate [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+from models.engine.query import aggregate
+
+
+def main(n):
+    """Print the time of every aggregate done both ways."""
+    with TempStore():
+        storage = FileStorage()
+        populate(n)
+        for cls_name, function, field, by in [
+                ("Place", "avg", "price_by_night", None),
+                ("Place", "avg", "price_by_night", "city_id"),
+                ("Review", "count", None, "user_id"),
+                ("Place", "max", "max_guest", "user_id")]:
+            objs = storage.all(cls_name).values()
+            expected, scan = timed(aggregate, objs, function, field, by)
+            storage.aggregate(cls_name, function, field, by)
+            result, seconds = timed(storage.aggregate, cls_name, function,
+                                    field, by)
+            assert result == expected or abs(result - expected) < 1e-6
+            print("{} {}({}) by {}: one pass {:.3f}s, storage {:.3f}s"
+                  .format(cls_name, function, field or "", by, scan,
+                          seconds))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""Compare finding the Places having several amenities by scan and index.
+
+Usage: python3 -m benchmarks.bench_amenities [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+
+
+def scan(storage, ids):
+    """Return the keys of the Places having ids, reading every Place."""
+    return [key for key, obj in storage.all("Place").items()
+            if all(i in obj.amenity_ids for i in ids)]
+
+
+def main(n):
+    """Print the time of the same filter done both ways."""
+    with TempStore():
+        storage = FileStorage()
+        made = populate(n)
+        ids = [a.id for a in made["Amenity"][:2]]
+        print("{} places".format(len(storage.all("Place"))))
+        _, build = timed(lambda: storage.find("Place", amenity_ids=ids))
+        print("index built in {:.3f}s".format(build))
+        keys, seconds = timed(scan, storage, ids)
+        print("scan   {:.6f}s  {} matches".format(seconds, len(keys)))
+        found, seconds = timed(
+            lambda: storage.find("Place", amenity_ids=ids))
+        print("index  {:.6f}s  {} matches".format(seconds, len(found)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
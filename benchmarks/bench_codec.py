@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+"""Compare the JSON and binary snapshot codecs of FileStorage.
+
+Usage: python3 -m benchmarks.bench_codec [number of objects]
+"""
+import os
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+
+
+def main(n):
+    """Print save time, reload time and file size for both codecs."""
+    with TempStore() as store:
+        for codec, name in (("json", "file.json"), ("binary", "file.bin")):
+            storage = FileStorage(codec=codec)
+            store.clear()
+            populate(n)
+            _, save = timed(storage.save)
+            store.clear()
+            _, reload = timed(storage.reload)
+            size = os.path.getsize(os.path.join(store.tmpdir.name, name))
+            print("{} objects".format(len(storage.all())))
+            print("{:6}  save {:6.2f}s  reload {:6.2f}s  size {:7.1f} MB"
+                  .format(codec, save, reload, size / 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
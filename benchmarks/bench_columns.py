@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""Compare Place range filters and aggregates over objects and columns.
+
+Usage: python3 -m benchmarks.bench_columns [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+
+
+def scan(storage):
+    """Filter and average the Places by reading their attributes."""
+    keys = [key for key, obj in storage.all("Place").items()
+            if 50 <= obj.price_by_night <= 150 and obj.number_rooms >= 3]
+    prices = [obj.price_by_night for obj in storage.all("Place").values()]
+    return keys, sum(prices) / len(prices)
+
+
+def columns(storage):
+    """Filter and average the Places through their columns."""
+    cols = storage.place_columns()
+    keys = cols.select(price_by_night=(50, 150), number_rooms=(3, None))
+    return keys, cols.stats("price_by_night")["mean"]
+
+
+def main(n):
+    """Print the time of the same query done both ways."""
+    with TempStore():
+        storage = FileStorage()
+        populate(n)
+        print("{} places".format(len(storage.all("Place"))))
+        _, build = timed(storage.place_columns)
+        print("columns built in {:.3f}s".format(build))
+        (keys, mean), seconds = timed(scan, storage)
+        print("objects  {:.3f}s  {} matches  mean {:.2f}".format(
+            seconds, len(keys), mean))
+        (keys, mean), seconds = timed(columns, storage)
+        print("columns  {:.3f}s  {} matches  mean {:.2f}".format(
+            seconds, len(keys), mean))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
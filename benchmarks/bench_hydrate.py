@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Compare the ways of building objects from their dictionaries.
+
+Usage: python3 -m benchmarks.bench_hydrate [number of objects]
+"""
+import sys
+from datetime import datetime
+from uuid import uuid4
+from benchmarks.fixtures import TempStore, populate, timed
+from models.base_model import registry, parse_stamp
+
+
+def hydrate(build, odicts):
+    """Build an object from every dictionary of odicts with build."""
+    for odict in odicts:
+        build(registry[odict["__class__"]], dict(odict))
+
+
+def legacy(cls, odict):
+    """Build an object the way BaseModel(**odict) used to."""
+    del odict["__class__"]
+    obj = cls.__new__(cls)
+    obj.id = str(uuid4())
+    obj.created_at = datetime.today()
+    obj.updated_at = datetime.today()
+    for i, n in odict.items():
+        if i == "created_at" or i == "updated_at":
+            obj.__dict__[i] = parse_stamp(n)
+        else:
+            obj.__dict__[i] = n
+    return obj
+
+
+def kwargs(cls, odict):
+    """Build an object through BaseModel.__init__."""
+    del odict["__class__"]
+    return cls(**odict)
+
+
+def main(n):
+    """Print the objects hydrated per second by both constructors."""
+    with TempStore():
+        odicts = [obj.to_dict() for objs in populate(n).values()
+                  for obj in objs]
+    print("{} objects".format(len(odicts)))
+    for label, build in (("legacy", legacy), ("cls(**odict)", kwargs),
+                         ("from_dict", lambda cls, o: cls.from_dict(o))):
+        _, seconds = timed(hydrate, build, odicts)
+        print("{:12}  {:6.2f}s  {:8.0f} obj/s".format(
+            label, seconds, len(odicts) / seconds))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
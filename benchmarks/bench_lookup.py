@@ -0,0 +1,37 @@
+#!/usr/bin/python3
+"""Compare looking a User up by email by scan and unique index.
+
+Usage: python3 -m benchmarks.bench_lookup [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+
+
+def scan(storage, email):
+    """Return the User with email, in any case, reading every object."""
+    email = email.lower()
+    for obj in storage.all().values():
+        if (type(obj).__name__ == "User" and
+                obj.email.lower() == email):
+            return obj
+    return None
+
+
+def main(n):
+    """Print the time of the same lookup done both ways."""
+    with TempStore():
+        storage = FileStorage()
+        made = populate(n)
+        email = made["User"][-1].email.upper()
+        print("{} users".format(storage.count("User")))
+        # The index was built by the first email set while populating.
+        for email in (email, "nobody@hbnb.io"):
+            obj, seconds = timed(scan, storage, email)
+            print("scan   {:.6f}s  {}".format(seconds, obj and obj.id))
+            obj, seconds = timed(storage.lookup, "User", "email", email)
+            print("index  {:.6f}s  {}".format(seconds, obj and obj.id))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
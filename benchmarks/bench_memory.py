@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""Compare the memory taken by reloaded objects with and without
+compact models (HBNB_COMPACT_MODELS=1).
+
+Usage: python3 -m benchmarks.bench_memory [number of objects]
+"""
+import os
+import subprocess
+import sys
+import tracemalloc
+from benchmarks.fixtures import TempStore, populate
+from models.engine.file_storage import FileStorage
+
+
+def measure(path):
+    """Print the objects reloaded from path and the bytes they take."""
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__objects = {}
+    storage = FileStorage()
+    tracemalloc.start()
+    storage.reload()
+    FileStorage._FileStorage__cache.clear()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(len(storage.all()), size)
+
+
+def main(n):
+    """Reload the same snapshot in a process per mode and compare."""
+    with TempStore() as store:
+        populate(n)
+        FileStorage().save()
+        for label, compact in (("regular", "0"), ("compact", "1")):
+            env = dict(os.environ, HBNB_COMPACT_MODELS=compact)
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_memory",
+                 "--measure", store.path],
+                env=env, check=True, capture_output=True, text=True).stdout
+            count, size = map(int, out.split())
+            print("{:8}  {} objects  {:7.1f} MB  {:5.0f} bytes/object"
+                  .format(label, count, size / 1e6, size / count))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--measure":
+        measure(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""Compare queries run by the planner with the same queries scanning.
+
+Usage: python3 -m benchmarks.bench_query [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+from models.engine.query import Query
+
+
+class Scanning:
+    """Give a query the objects of a storage, without any index."""
+
+    def __init__(self, storage):
+        """Wrap storage."""
+        self.storage = storage
+
+    def all(self, cls=None):
+        """Return the objects of cls."""
+        return self.storage.all(cls)
+
+
+def main(n):
+    """Print the time of every query, planned and scanning."""
+    with TempStore():
+        storage = FileStorage()
+        made = populate(n)
+        city = made["City"][0].id
+        user = made["User"][-1]
+        amenity = made["Amenity"][0].id
+        texts = [
+            ("Place", 'city_id == "{}", price_by_night < 100, '
+                      "number_rooms >= 3, order_by=price_by_night, "
+                      "limit=20".format(city)),
+            ("User", 'email == "{}"'.format(user.email)),
+            ("Place", '"{}" in amenity_ids, max_guest >= 10, '
+                      "order_by=-price_by_night, limit=20".format(amenity)),
+            ("Place", "price_by_night <= 25, number_rooms == 6, "
+                      "order_by=price_by_night"),
+        ]
+        for cls_name, text in texts:
+            query = Query.parse(cls_name, text)
+            query.run(storage)
+            planned, seconds = timed(query.run, storage)
+            scanned, scan = timed(query.run, Scanning(storage))
+            assert planned == scanned
+            print("{}\n  {}: {:.6f}s, scan {:.6f}s, {} results".format(
+                text, query.plan(storage)[0], seconds, scan, len(planned)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Compare class lookup through eval and through the model registry.
+
+Usage: python3 -m benchmarks.bench_registry [number of objects]
+"""
+import sys
+from unittest.mock import patch
+from benchmarks.fixtures import TempStore, populate, timed
+from models.base_model import registry
+from models.engine import file_storage
+from models.engine.file_storage import FileStorage
+
+
+class EvalLookup:
+    """Look classes up the way reload() used to, with eval."""
+
+    def __getitem__(self, cls_name):
+        """Return the class named cls_name in the storage module."""
+        return eval(cls_name, vars(file_storage))
+
+
+def lookups(table, names):
+    """Look every name of names up in table."""
+    for name in names:
+        table[name]
+
+
+def main(n):
+    """Print lookup and reload times with both kinds of lookup."""
+    with TempStore() as store:
+        storage = FileStorage()
+        populate(n)
+        storage.save()
+        names = [key.split(".")[0] for key in storage.all()]
+        print("{} objects".format(len(names)))
+        for label, table in (("eval", EvalLookup()),
+                             ("registry", registry)):
+            _, lookup = timed(lookups, table, names)
+            store.clear()
+            with patch.object(file_storage, "registry", table):
+                _, reload = timed(storage.reload)
+            print("{:8}  lookups {:6.2f}s  reload {:6.2f}s  {:8.0f} obj/s"
+                  .format(label, lookup, reload, len(names) / reload))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""Compare rendering a State page by scans and by relationships.
+
+The page lists the Cities of a State, their Places with their Amenities
+and the Reviews of every Place.
+
+Usage: python3 -m benchmarks.bench_relations [number of objects]
+"""
+import sys
+from benchmarks.fixtures import TempStore, populate, timed
+from models.engine.file_storage import FileStorage
+
+
+def scan(storage, sta):
+    """Return the page of sta, reading every object of each class."""
+    cities = [obj for obj in storage.all("City").values()
+              if obj.state_id == sta.id]
+    city_ids = {cty.id for cty in cities}
+    places = [obj for obj in storage.all("Place").values()
+              if obj.city_id in city_ids]
+    place_ids = {pla.id for pla in places}
+    reviews = [obj for obj in storage.all("Review").values()
+               if obj.place_id in place_ids]
+    amenities = {obj.id: obj for obj in storage.all("Amenity").values()}
+    return (cities, places, reviews,
+            [amenities[i] for pla in places for i in pla.amenity_ids])
+
+
+def accessors(sta):
+    """Return the page of sta, following the relationships of every
+    object."""
+    cities = sta.cities
+    places = [pla for cty in cities for pla in cty.places]
+    reviews = [rev for pla in places for rev in pla.reviews]
+    return (cities, places, reviews,
+            [ame for pla in places for ame in pla.amenities])
+
+
+def batched(storage, sta):
+    """Return the page of sta, finding each level in one call."""
+    cities = sta.cities
+    places = list(storage.find(
+        "Place", city_id=[cty.id for cty in cities]).values())
+    reviews = list(storage.find(
+        "Review", place_id=[pla.id for pla in places]).values())
+    return (cities, places, reviews, storage.get_many(
+        "Amenity", [i for pla in places for i in pla.amenity_ids]))
+
+
+def main(n):
+    """Print the time of the same page rendered each way."""
+    with TempStore():
+        storage = FileStorage()
+        objects = populate(n)
+        print("{} objects".format(storage.count()))
+        sta = objects["State"][0]
+        _, build = timed(accessors, sta)
+        print("indexes built in {:.3f}s".format(build))
+        for name, func, args in [("scan", scan, (storage, sta)),
+                                 ("accessors", accessors, (sta,)),
+                                 ("batched", batched, (storage, sta))]:
+            page, seconds = timed(func, *args)
+            print("{:9}  {:.6f}s  {} cities, {} places, {} reviews".format(
+                name, seconds, *map(len, page[:3])))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""Compare full-text searches over Reviews by scan and inverted index.
+
+Usage: python3 -m benchmarks.bench_search [number of reviews]
+"""
+import random
+import sys
+from benchmarks.fixtures import TempStore, timed
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import tokenize
+from models.review import Review
+
+WORDS = ["stay", "room", "host", "view", "bed", "clean", "noisy", "quiet",
+         "great", "bad", "location", "breakfast", "friendly", "small",
+         "spacious", "walk", "beach", "metro", "price", "value"]
+
+
+def scan(storage, text):
+    """Return the keys of the Reviews having every word, reading them."""
+    words = set(tokenize(text))
+    return [key for key, obj in storage.all("Review").items()
+            if words <= set(tokenize(obj.text))]
+
+
+def main(n):
+    """Print the time of the same searches done both ways."""
+    rnd = random.Random(0)
+    # A long tail of rare words, like names of streets or hosts.
+    rare = ["word{}".format(i) for i in range(n // 20)]
+    with TempStore():
+        storage = FileStorage()
+        for _ in range(n):
+            rev = Review()
+            rev.text = " ".join(rnd.choices(WORDS, k=8) + [rnd.choice(rare)])
+        print("{} reviews".format(storage.count("Review")))
+        _, build = timed(storage.search, "Review", "x")
+        print("index built in {:.3f}s".format(build))
+        for text in ["word7", "quiet beach", "great"]:
+            keys, seconds = timed(scan, storage, text)
+            print("{!r:14} scan   {:.6f}s  {} matches".format(
+                text, seconds, len(keys)))
+            found, seconds = timed(storage.search, "Review", text)
+            print("{!r:14} index  {:.6f}s  {} matches".format(
+                text, seconds, len(found)))
+            found, seconds = timed(storage.search, "Review", text, 10)
+            print("{!r:14} top 10 {:.6f}s".format(text, seconds))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""Compare radius and box searches over Places by scan and grid.
+
+Usage: python3 -m benchmarks.bench_spatial [number of places]
+"""
+import random
+import sys
+from benchmarks.fixtures import TempStore, timed
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import distance
+from models.place import Place
+
+
+def scan_near(storage, lat, lon, km):
+    """Return the keys of the Places within km, reading every Place."""
+    found = []
+    for key, obj in storage.all("Place").items():
+        d = distance(lat, lon, obj.latitude, obj.longitude)
+        if d <= km:
+            found.append((d, key))
+    found.sort()
+    return [key for _, key in found]
+
+
+def scan_within(storage, south, west, north, east):
+    """Return the keys of the Places inside a box, reading every Place."""
+    return [key for key, obj in storage.all("Place").items()
+            if south <= obj.latitude <= north and
+            west <= obj.longitude <= east]
+
+
+def main(n):
+    """Print the time of the same searches done both ways."""
+    rnd = random.Random(0)
+    with TempStore():
+        storage = FileStorage()
+        for _ in range(n):
+            pla = Place()
+            pla.latitude = rnd.uniform(-60.0, 70.0)
+            pla.longitude = rnd.uniform(-180.0, 180.0)
+        print("{} places".format(storage.count("Place")))
+        _, build = timed(storage.within, 0, 0, 0, 0)
+        print("grid built in {:.3f}s".format(build))
+        for name, scan, search, args in [
+                ("near 100 km", scan_near, storage.near, (48.85, 2.35, 100)),
+                ("box 2x2 deg", scan_within, storage.within,
+                 (48, 1, 50, 3))]:
+            keys, seconds = timed(scan, storage, *args)
+            print("{}  scan  {:.6f}s  {} matches".format(
+                name, seconds, len(keys)))
+            found, seconds = timed(search, *args)
+            print("{}  grid  {:.6f}s  {} matches".format(
+                name, seconds, len(found)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
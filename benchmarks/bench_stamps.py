@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Compare the ways BaseModel decodes reloaded timestamps.
+
+Usage: python3 -m benchmarks.bench_stamps [number of objects]
+"""
+import sys
+from datetime import datetime
+from unittest.mock import patch
+from benchmarks.fixtures import TempStore, populate, timed
+from models import base_model
+from models.engine.file_storage import FileStorage
+
+
+def strptime(text):
+    """Decode text the way BaseModel used to, with strptime."""
+    if "." in text:
+        return datetime.strptime(text, "%Y-%m-%dT%H:%M:%S.%f")
+    return datetime.strptime(text, "%Y-%m-%dT%H:%M:%S")
+
+
+def main(n):
+    """Print reload times and throughput for every decoding mode."""
+    with TempStore() as store:
+        storage = FileStorage()
+        populate(n)
+        storage.save()
+        count = len(storage.all())
+        print("{} objects".format(count))
+        for label, parse, lazy in (("strptime", strptime, False),
+                                   ("fromisoformat", None, False),
+                                   ("lazy", None, True)):
+            store.clear()
+            base_model.lazy_stamps(lazy)
+            try:
+                if parse is None:
+                    _, reload = timed(storage.reload)
+                else:
+                    with patch.object(base_model, "parse_stamp", parse):
+                        _, reload = timed(storage.reload)
+            finally:
+                base_model.lazy_stamps(False)
+            print("{:13}  reload {:6.2f}s  {:8.0f} obj/s".format(
+                label, reload, count / reload))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
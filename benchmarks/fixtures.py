@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Defines helpers shared by the storage benchmarks."""
+import os
+import random
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.user import User
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
+
+
+def populate(n, seed=0):
+    """Fill the storage with about n objects of every class.
+
+    Places and Reviews make up most of the store, like in a real site.
+
+    Returns:
+        dict: The objects created, by class name.
+    """
+    rnd = random.Random(seed)
+    made = {}
+
+    def make(cls, count, **attrs):
+        objs = []
+        for i in range(max(count, 1)):
+            obj = cls()
+            for name, gen in attrs.items():
+                setattr(obj, name, gen(i))
+            objs.append(obj)
+        made[cls.__name__] = objs
+        return objs
+
+    states = make(State, n // 1000, name=lambda i: "State {}".format(i))
+    cities = make(City, n // 100, name=lambda i: "City {}".format(i),
+                  state_id=lambda i: rnd.choice(states).id)
+    users = make(User, n // 10, email=lambda i: "user{}@hbnb.io".format(i),
+                 first_name=lambda i: "First{}".format(i))
+    amenities = make(Amenity, 20, name=lambda i: "Amenity {}".format(i))
+    places = make(Place, n * 3 // 10,
+                  city_id=lambda i: rnd.choice(cities).id,
+                  user_id=lambda i: rnd.choice(users).id,
+                  name=lambda i: "Place {}".format(i),
+                  description=lambda i: "A nice place number {}".format(i),
+                  number_rooms=lambda i: rnd.randint(1, 6),
+                  number_bathrooms=lambda i: rnd.randint(1, 3),
+                  max_guest=lambda i: rnd.randint(1, 12),
+                  price_by_night=lambda i: rnd.randint(20, 500),
+                  latitude=lambda i: rnd.uniform(-60.0, 70.0),
+                  longitude=lambda i: rnd.uniform(-180.0, 180.0),
+                  amenity_ids=lambda i: [a.id for a in rnd.sample(
+                      amenities, rnd.randint(0, 5))])
+    make(Review, n * 6 // 10,
+         place_id=lambda i: rnd.choice(places).id,
+         user_id=lambda i: rnd.choice(users).id,
+         text=lambda i: "Review {} of a stay, very {}".format(
+             i, rnd.choice(["good", "bad", "quiet", "clean", "noisy"])))
+    return made
+
+
+class TempStore:
+    """Point FileStorage at a temporary directory for a benchmark."""
+
+    def __enter__(self):
+        """Swap the storage file and objects for empty temporary ones."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__objects)
+        self.path = os.path.join(self.tmpdir.name, "file.json")
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        return self
+
+    def clear(self):
+        """Drop every object from memory, leaving the files alone."""
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__cache.clear()
+
+    def __exit__(self, *exc):
+        """Restore the storage file and objects."""
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__objects) = self.saved
+        self.tmpdir.cleanup()
+
+
+def timed(func, *args):
+    """Return the result of func(*args) and the seconds it took."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
@@ -2,9 +2,13 @@
 """Defines the HBnB console."""
 import cmd
 import re
+from ast import literal_eval
+from itertools import islice
+from math import isfinite
 from shlex import split
 from models import storage
-from models.base_model import BaseModel
+from models.base_model import BaseModel, registry
+from models.engine.query import Query
 from models.user import User
 from models.state import State
 from models.city import City
@@ -39,15 +43,14 @@ class HBNBCommand(cmd.Cmd):
     """
 
     prompt = "(hbnb) "
-    __classes = {
-        "BaseModel",
-        "User",
-        "State",
-        "City",
-        "Place",
-        "Amenity",
-        "Review"
-    }
+
+    def onecmd(self, line):
+        """Run line, reporting changes a read-only storage refuses."""
+        try:
+            return super().onecmd(line)
+        except PermissionError as e:
+            print("** {} **".format(e))
+            return False
 
     def emptyline(self):
         """Do nothing upon receiving an empty line."""
@@ -60,12 +63,17 @@ class HBNBCommand(cmd.Cmd):
             "show": self.do_show,
             "destroy": self.do_destroy,
             "count": self.do_count,
-            "update": self.do_update
+            "update": self.do_update,
+            "where": self.do_where,
+            "aggregate": self.do_aggregate,
+            "search": self.do_search,
+            "near": self.do_near,
+            "within": self.do_within
         }
         match = re.search(r"\.", arg)
         if match is not None:
             argl = [arg[:match.span()[0]], arg[match.span()[1]:]]
-            match = re.search(r"\((.*?)\)", argl[1])
+            match = re.search(r"\((.*)\)", argl[1])
             if match is not None:
                 command = [argl[1][:match.span()[0]], match.group()[1:-1]]
                 if command[0] in argdict.keys():
@@ -90,10 +98,10 @@ class HBNBCommand(cmd.Cmd):
         argl = parse(arg)
         if len(argl) == 0:
             print("** class name missing **")
-        elif argl[0] not in HBNBCommand.__classes:
+        elif argl[0] not in registry:
             print("** class doesn't exist **")
         else:
-            print(eval(argl[0])().id)
+            print(registry[argl[0]]().id)
             storage.save()
 
     def do_show(self, arg):
@@ -101,60 +109,181 @@ class HBNBCommand(cmd.Cmd):
         Display the string representation of a class instance of a given id.
         """
         argl = parse(arg)
-        objdict = storage.all()
+        obj = storage.get(argl[0], argl[1]) if len(argl) > 1 else None
         if len(argl) == 0:
             print("** class name missing **")
-        elif argl[0] not in HBNBCommand.__classes:
+        elif argl[0] not in registry:
             print("** class doesn't exist **")
         elif len(argl) == 1:
             print("** instance id missing **")
-        elif "{}.{}".format(argl[0], argl[1]) not in objdict:
+        elif obj is None:
             print("** no instance found **")
         else:
-            print(objdict["{}.{}".format(argl[0], argl[1])])
+            print(obj)
 
     def do_destroy(self, arg):
         """Usage: destroy <class> <id> or <class>.destroy(<id>)
         Delete a class instance of a given id."""
         argl = parse(arg)
-        objdict = storage.all()
+        obj = storage.get(argl[0], argl[1]) if len(argl) > 1 else None
         if len(argl) == 0:
             print("** class name missing **")
-        elif argl[0] not in HBNBCommand.__classes:
+        elif argl[0] not in registry:
             print("** class doesn't exist **")
         elif len(argl) == 1:
             print("** instance id missing **")
-        elif "{}.{}".format(argl[0], argl[1]) not in objdict.keys():
+        elif obj is None:
             print("** no instance found **")
         else:
-            del objdict["{}.{}".format(argl[0], argl[1])]
+            storage.delete(obj)
             storage.save()
 
     def do_all(self, arg):
-        """Usage: all or all <class> or <class>.all()
+        """Usage: all [<class>] [--limit <n>] [--offset <n>] or <class>.all()
         Display string representations of all instances of a given class.
-        If no class is specified, displays all instantiated objects."""
+        If no class is specified, displays all instantiated objects.
+        Skip the first --offset instances and show at most --limit.
+        --<foreign key> <id> only shows the instances referencing that id,
+        as in all Review --place_id <id>, and --amenity_ids <id>,<id> only
+        the Places having all of these amenities."""
+        argl = []
+        options = {"--limit": None, "--offset": 0}
+        fields = {}
+        args = iter(parse(arg))
+        for a in args:
+            if not a.startswith("--"):
+                argl.append(a)
+                continue
+            value = next(args, "")
+            if a == "--amenity_ids":
+                fields["amenity_ids"] = value.split(",")
+            elif a not in options:
+                fields[a[2:]] = value
+            elif not value.isdigit():
+                print("** {} needs a non-negative integer **".format(a))
+                return False
+            else:
+                options[a] = int(value)
+        if len(argl) > 0 and argl[0] not in registry:
+            print("** class doesn't exist **")
+        elif len(fields) > 0 and len(argl) == 0:
+            print("** class name missing **")
+        else:
+            try:
+                if len(fields) > 0:
+                    objs = storage.find(argl[0], **fields)
+                else:
+                    objs = storage.all(argl[0] if len(argl) > 0 else None)
+            except ValueError as e:
+                print("** {} **".format(e))
+                return False
+            start = options["--offset"]
+            stop = None
+            if options["--limit"] is not None:
+                stop = start + options["--limit"]
+            self.__print_objects(objs, start, stop)
+
+    def do_where(self, arg):
+        """Usage: where <class> <query> or <class>.where(<query>)
+        Display the instances of a given class meeting every condition,
+        as in Place.where(city_id == "<id>", price_by_night < 100,
+        number_rooms >= 3, order_by=price_by_night, limit=20).
+        order_by=-<attribute> sorts descending, offset=<n> skips results
+        and fields=(<attribute>, ...) only shows these attributes."""
+        argl = arg.split(maxsplit=1)
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in registry:
+            print("** class doesn't exist **")
+        else:
+            try:
+                query = Query.parse(argl[0], argl[1] if len(argl) > 1 else "")
+                results = query.run(storage)
+            except ValueError as e:
+                print("** {} **".format(e))
+                return False
+            if query.fields is None:
+                results = [obj.__str__() for obj in results]
+            print(results)
+
+    def do_aggregate(self, arg):
+        """Usage: aggregate <class> <function> [<attribute>] [--by <attribute>]
+       or <class>.aggregate(<function>, [<attribute>], [--by <attribute>])
+        Display count, or the sum, avg, min or max of an attribute, over
+        the instances of a given class, or per value of --by, as in
+        aggregate Place avg price_by_night --by city_id."""
+        argl = parse(arg)
+        by = None
+        if "--by" in argl:
+            i = argl.index("--by")
+            if i + 1 == len(argl):
+                print("** --by needs an attribute **")
+                return False
+            by = argl[i + 1]
+            del argl[i:i + 2]
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in registry:
+            print("** class doesn't exist **")
+        elif len(argl) == 1:
+            print("** function missing **")
+        else:
+            field = argl[2] if len(argl) > 2 else None
+            try:
+                print(storage.aggregate(argl[0], argl[1], field, by))
+            except ValueError as e:
+                print("** {} **".format(e))
+
+    def do_search(self, arg):
+        """Usage: search <class> <words> [--limit <n>] or
+       <class>.search(<words>)
+        Display the instances of a given class whose text has every word,
+        best match first, showing at most --limit."""
         argl = parse(arg)
-        if len(argl) > 0 and argl[0] not in HBNBCommand.__classes:
+        limit = None
+        if "--limit" in argl:
+            i = argl.index("--limit")
+            value = argl[i + 1] if i + 1 < len(argl) else ""
+            if not value.isdigit():
+                print("** --limit needs a non-negative integer **")
+                return False
+            limit = int(value)
+            del argl[i:i + 2]
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in registry:
             print("** class doesn't exist **")
+        elif len(argl) == 1:
+            print("** words missing **")
         else:
-            objl = []
-            for obj in storage.all().values():
-                if len(argl) > 0 and argl[0] == obj.__class__.__name__:
-                    objl.append(obj.__str__())
-                elif len(argl) == 0:
-                    objl.append(obj.__str__())
-            print(objl)
+            try:
+                objs = storage.search(argl[0], " ".join(argl[1:]), limit)
+            except ValueError as e:
+                print("** {} **".format(e))
+                return False
+            self.__print_objects(objs)
+
+    def do_near(self, arg):
+        """Usage: near Place <latitude> <longitude> <km> or
+       Place.near(<latitude>, <longitude>, <km>)
+        Display the Places within km of a point, nearest first."""
+        coords = self.__coordinates(arg, 3)
+        if coords is not None:
+            self.__print_objects(storage.near(*coords))
+
+    def do_within(self, arg):
+        """Usage: within Place <south> <west> <north> <east> or
+       Place.within(<south>, <west>, <north>, <east>)
+        Display the Places inside a latitude, longitude box."""
+        coords = self.__coordinates(arg, 4)
+        if coords is not None:
+            self.__print_objects(storage.within(*coords))
 
     def do_count(self, arg):
         """Usage: count <class> or <class>.count()
         Retrieve the number of instances of a given class."""
         argl = parse(arg)
-        count = 0
-        for obj in storage.all().values():
-            if argl[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        print(storage.count(argl[0]))
 
     def do_update(self, arg):
         """Usage: update <class> <id> <attribute_name> <attribute_value> or
@@ -163,18 +292,18 @@ class HBNBCommand(cmd.Cmd):
         Update a class instance of a given id by adding or updating
         a given attribute key/value pair or dictionary."""
         argl = parse(arg)
-        objdict = storage.all()
+        obj = storage.get(argl[0], argl[1]) if len(argl) > 1 else None
 
         if len(argl) == 0:
             print("** class name missing **")
             return False
-        if argl[0] not in HBNBCommand.__classes:
+        if argl[0] not in registry:
             print("** class doesn't exist **")
             return False
         if len(argl) == 1:
             print("** instance id missing **")
             return False
-        if "{}.{}".format(argl[0], argl[1]) not in objdict.keys():
+        if obj is None:
             print("** no instance found **")
             return False
         if len(argl) == 2:
@@ -182,29 +311,95 @@ class HBNBCommand(cmd.Cmd):
             return False
         if len(argl) == 3:
             try:
-                type(eval(argl[2])) != dict
-            except NameError:
+                literal_eval(argl[2])
+            except (ValueError, SyntaxError):
                 print("** value missing **")
                 return False
 
-        if len(argl) == 4:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            if argl[2] in obj.__class__.__dict__.keys():
-                valtype = type(obj.__class__.__dict__[argl[2]])
-                obj.__dict__[argl[2]] = valtype(argl[3])
+        try:
+            if len(argl) == 4:
+                updates = {argl[2]: argl[3]}
+            elif type(literal_eval(argl[2])) == dict:
+                updates = literal_eval(argl[2])
             else:
-                obj.__dict__[argl[2]] = argl[3]
-        elif type(eval(argl[2])) == dict:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            for x, z in eval(argl[2]).items():
-                if (x in obj.__class__.__dict__.keys() and
-                        type(obj.__class__.__dict__[x]) in {str, int, float}):
-                    valtype = type(obj.__class__.__dict__[x])
-                    obj.__dict__[x] = valtype(z)
-                else:
-                    obj.__dict__[x] = z
+                updates = {}
+            for name in updates:
+                if not self.__updatable(name):
+                    print("** {} can't be updated **".format(name))
+                    return False
+            # Every value is checked before the first is set, so a failed
+            # update leaves the object as it was.
+            values = {}
+            for name, value in updates.items():
+                attr = getattr(obj.__class__, name, None)
+                if isinstance(attr, property) and attr.fset is None:
+                    raise AttributeError(
+                        "property {!r} of {!r} object has no setter".format(
+                            name, obj.__class__.__name__))
+                if name in obj.__class__.__dict__.keys() and (
+                        len(argl) == 4 or type(attr) in {str, int, float}):
+                    value = type(attr)(value)
+                storage.check_unique(obj, name, value)
+                values[name] = value
+            for name, value in values.items():
+                setattr(obj, name, value)
+        except (ValueError, TypeError, AttributeError) as e:
+            print("** {} **".format(e))
+            return False
         storage.save()
 
+    @staticmethod
+    def __updatable(name):
+        """Return True if update may set the attribute name.
+
+        Special names like __class__ are refused, as setting them would
+        change what the object is rather than one of its values. So are
+        id, which storage files the object under, and the timestamps,
+        which the object keeps itself.
+        """
+        return (type(name) is str and
+                name not in ("id", "created_at", "updated_at") and
+                not (name.startswith("__") and name.endswith("__")))
+
+    def do_compact(self, arg):
+        """Usage: compact
+        Fold the storage journal into a fresh snapshot in the background."""
+        storage.compact()
+
+    def __coordinates(self, arg, n):
+        """Return the n numbers following Place in arg, or None if wrong.
+
+        The error is printed when there is one.
+        """
+        argl = parse(arg)
+        if len(argl) == 0:
+            print("** class name missing **")
+        elif argl[0] not in registry:
+            print("** class doesn't exist **")
+        elif argl[0] != "Place":
+            print("** {} has no location **".format(argl[0]))
+        elif len(argl) < n + 1:
+            print("** coordinates missing **")
+        else:
+            try:
+                coords = [float(a) for a in argl[1:n + 1]]
+            except ValueError:
+                print("** coordinates must be numbers **")
+            else:
+                if all(isfinite(c) for c in coords):
+                    return coords
+                print("** coordinates must be finite **")
+        return None
+
+    def __print_objects(self, objs, start=0, stop=None):
+        """Print the objects of a dictionary, as print(list) would their
+        strings, one at a time."""
+        print("[", end="")
+        for i, key in enumerate(islice(objs.keys(), start, stop)):
+            print(", " if i else "", repr(objs[key].__str__()),
+                  sep="", end="")
+        print("]")
+
 
 if __name__ == "__main__":
     HBNBCommand().cmdloop()
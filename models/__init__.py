@@ -1,7 +1,19 @@
 #!/usr/bin/python3
 
+from os import getenv
+from models.base_model import lazy_stamps
 from models.engine.file_storage import FileStorage
 
 
-storage = FileStorage()
+if getenv("HBNB_TYPE_STORAGE") == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(getenv("HBNB_SQLITE_PATH", "hbnb.db"))
+else:
+    storage = FileStorage(journal=getenv("HBNB_FILE_JOURNAL") == "1",
+                          lazy=getenv("HBNB_FILE_LAZY") == "1",
+                          sharded=getenv("HBNB_FILE_SHARDED") == "1",
+                          partitions=int(getenv("HBNB_FILE_PARTITIONS", "1")),
+                          codec=getenv("HBNB_FILE_CODEC", "json"),
+                          mapped=getenv("HBNB_FILE_MAPPED") == "1")
+lazy_stamps(getenv("HBNB_LAZY_STAMPS") == "1")
 storage.reload()
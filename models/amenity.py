@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ the Amenity class."""
+import models
 from models.base_model import BaseModel
 
 
@@ -10,3 +11,9 @@ class Amenity(BaseModel):
     """
 
     name = ""
+
+    @property
+    def places(self):
+        """list: The Places having the amenity, through their index."""
+        return list(models.storage.find(
+            "Place", amenity_ids=[self.id]).values())
@@ -1,13 +1,156 @@
 #!/usr/bin/python3
-"""Defines the BaseModel class."""
+"""Defines the BaseModel class and the registry of model classes."""
 import models
+from os import getenv
 from uuid import uuid4
 from datetime import datetime
 
+registry = {}
+"""dict: Every model class by name, filled in as the classes are defined."""
 
-class BaseModel:
+# to_dict() writes ISO 8601 timestamps, with microseconds unless they are
+# zero; fromisoformat reads both forms, many times faster than strptime.
+parse_stamp = datetime.fromisoformat
+_lazy_stamps = False
+
+# Compact models must be chosen before the classes are defined, as the
+# slots of a class are fixed when it is created.
+_compact = getenv("HBNB_COMPACT_MODELS") == "1"
+_shapes = {}
+_missing = object()
+
+
+def _intern_shape(shape):
+    """Return the one tuple of attribute names equal to shape."""
+    return _shapes.setdefault(shape, shape)
+
+
+class _Field:
+    """Keep a declared attribute in a slot, falling back to its default.
+
+    In compact mode this replaces the class attribute, so the class
+    still reads as its default, as do instances where it is not set.
+    """
+
+    __slots__ = ("name", "slot", "default")
+
+    def __init__(self, name, slot, default=_missing):
+        """Wrap the member descriptor slot of the attribute name."""
+        self.name = name
+        self.slot = slot
+        self.default = default
+
+    def __get__(self, obj, owner=None):
+        """Return the attribute of obj, or its default."""
+        if obj is None:
+            return self if self.default is _missing else self.default
+        try:
+            return self.slot.__get__(obj, owner)
+        except AttributeError:
+            if self.default is _missing:
+                raise AttributeError(self.name) from None
+            return self.default
+
+    def __set__(self, obj, value):
+        """Store the attribute of obj in its slot."""
+        self.slot.__set__(obj, value)
+
+    def __delete__(self, obj):
+        """Empty the slot of the attribute of obj."""
+        self.slot.__delete__(obj)
+
+
+class _ModelType(type):
+    """Create model classes, with slots for their attributes if compact.
+
+    In compact mode the public, non-callable class attributes of a model
+    become slots holding the per-instance values, which takes far less
+    memory than an instance __dict__. Other attributes set on an instance
+    go to an overflow __dict__, and the order attributes were set in is
+    kept as a shared tuple of names, so to_dict() and __str__ list them
+    exactly as a regular instance would.
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        """Create the class name, turning its attributes into slots."""
+        if not _compact:
+            return super().__new__(mcs, name, bases, namespace, **kwargs)
+        if bases:
+            fields = {key: value for key, value in namespace.items()
+                      if not key.startswith("_") and not callable(value) and
+                      not isinstance(value, (classmethod, staticmethod,
+                                             property))}
+            extra = ()
+        else:
+            fields = dict.fromkeys(("id", "created_at", "updated_at"),
+                                   _missing)
+            extra = ("_BaseModel__shape", "__dict__", "__weakref__")
+        for key in fields:
+            namespace.pop(key, None)
+        namespace["__slots__"] = tuple("_f_" + key for key in fields) + extra
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        for key, default in fields.items():
+            setattr(cls, key, _Field(key, cls.__dict__["_f_" + key], default))
+        return cls
+
+
+class _LazyStamp:
+    """Decode a timestamp kept as text the first time it is read."""
+
+    def __set_name__(self, owner, name):
+        """Remember the attribute name the descriptor is bound to."""
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        """Return the timestamp of obj, decoding it if still text."""
+        if obj is None:
+            return self
+        try:
+            value = obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+        if type(value) is str:
+            value = obj.__dict__[self.name] = parse_stamp(value)
+        return value
+
+    def __set__(self, obj, value):
+        """Store the timestamp of obj as is."""
+        obj.__dict__[self.name] = value
+
+
+def lazy_stamps(enabled=True):
+    """Keep reloaded timestamps as text until they are first read.
+
+    Objects that are saved again without their timestamps being read
+    write the original text back, skipping both decoding and encoding.
+
+    Args:
+        enabled (bool): Turn lazy decoding on or off.
+
+    Raises:
+        ValueError: If enabled while the models are compact.
+    """
+    if enabled and _compact:
+        raise ValueError("lazy timestamps need the regular model layout")
+    global _lazy_stamps
+    _lazy_stamps = enabled
+    for name in ("created_at", "updated_at"):
+        if enabled:
+            stamp = _LazyStamp()
+            stamp.__set_name__(BaseModel, name)
+            setattr(BaseModel, name, stamp)
+        elif name in BaseModel.__dict__:
+            delattr(BaseModel, name)
+
+
+class BaseModel(metaclass=_ModelType):
     """Represents the BaseModel of the HBnB project."""
 
+    def __init_subclass__(cls, **kwargs):
+        """Register a new model class under its name."""
+        super().__init_subclass__(**kwargs)
+        registry[cls.__name__] = cls
+
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel.
 
@@ -15,23 +158,94 @@ class BaseModel:
             *args (any): Unused.
             **kwargs (dict): Key/value pairs of attributes.
         """
-        thform = "%Y-%m-%dT%H:%M:%S.%f"
-        self.id = str(uuid4())
-        self.created_at = datetime.today()
-        self.updated_at = datetime.today()
-        if len(kwargs) != 0:
-            for i, n in kwargs.items():
-                if i == "created_at" or i == "updated_at":
-                    self.__dict__[i] = datetime.strptime(n, thform)
-                else:
-                    self.__dict__[i] = n
-        else:
+        if _compact:
+            object.__setattr__(self, "_BaseModel__shape", ())
+        if len(kwargs) == 0:
+            self.id = str(uuid4())
+            self.created_at = datetime.today()
+            self.updated_at = datetime.today()
             models.storage.new(self)
+            return
+        values = {"id": kwargs["id"] if "id" in kwargs else str(uuid4())}
+        for name in ("created_at", "updated_at"):
+            if name not in kwargs:
+                values[name] = datetime.today()
+        for i, n in kwargs.items():
+            if ((i == "created_at" or i == "updated_at") and
+                    not _lazy_stamps):
+                values[i] = parse_stamp(n)
+            else:
+                values[i] = n
+        self.__fill(values)
+
+    @classmethod
+    def from_dict(cls, odict):
+        """Return an instance rebuilt from its dictionary representation.
 
-    def save1(self):
+        Unlike cls(**odict), no id or timestamp is generated only to be
+        overwritten and the instance is not flagged as changed in
+        storage.
+
+        Args:
+            odict (dict): The representation, as returned by to_dict().
+        """
+        obj = cls.__new__(cls)
+        if _compact:
+            attrs = dict(odict)
+        else:
+            attrs = obj.__dict__
+            attrs.update(odict)
+        del attrs["__class__"]
+        if not _lazy_stamps:
+            attrs["created_at"] = parse_stamp(attrs["created_at"])
+            attrs["updated_at"] = parse_stamp(attrs["updated_at"])
+        if _compact:
+            obj.__fill(attrs)
+        return obj
+
+    def __fill(self, values):
+        """Set the attributes in values without flagging the instance."""
+        if not _compact:
+            self.__dict__.update(values)
+            return
+        overflow = self.__dict__
+        for name, value in values.items():
+            if name == "__class__":
+                overflow[name] = value
+            else:
+                object.__setattr__(self, name, value)
+        object.__setattr__(self, "_BaseModel__shape",
+                           _intern_shape(tuple(values)))
+
+    def __attributes(self):
+        """Return a new dictionary of the attributes of a compact instance.
+
+        The attributes are listed in the order they were first set.
+        """
+        overflow = self.__dict__
+        return {name: overflow[name] if name in overflow
+                else getattr(self, name) for name in self.__shape}
+
+    def __setattr__(self, name, value):
+        """Set an attribute and flag the instance as changed in storage."""
+        super().__setattr__(name, value)
+        if _compact and name not in self.__shape:
+            object.__setattr__(self, "_BaseModel__shape",
+                               _intern_shape(self.__shape + (name,)))
+        models.storage.mark_dirty(self)
+
+    def __delattr__(self, name):
+        """Delete an attribute, forgetting its place if compact."""
+        super().__delattr__(name)
+        if _compact:
+            object.__setattr__(self, "_BaseModel__shape", _intern_shape(
+                tuple(key for key in self.__shape if key != name)))
+
+    def save(self):
         """Update updated_at with the current datetime."""
         self.updated_at = datetime.today()
-        models.storage.save1()
+        models.storage.new(self)
+        models.storage.save()
 
     def to_dict(self):
         """Return the dictionary of the BaseModel instance.
@@ -39,13 +253,24 @@ class BaseModel:
         Includes the key/value pair __class__ representing
         the class name of the object.
         """
-        rdict = self.__dict__.copy()
-        rdict["created_at"] = self.created_at.isoformat()
-        rdict["updated_at"] = self.updated_at.isoformat()
+        if _compact:
+            rdict = self.__attributes()
+        else:
+            rdict = self.__dict__.copy()
+        for name in ("created_at", "updated_at"):
+            if type(rdict[name]) is not str:
+                rdict[name] = rdict[name].isoformat()
         rdict["__class__"] = self.__class__.__name__
         return rdict
 
     def __str__(self):
         """Return the print/str representation of the BaseModel instance."""
         clname = self.__class__.__name__
-        return "[{}] ({}) {}".format(clname, self.id, self.__dict__)
+        if _lazy_stamps:
+            # Reading the timestamps decodes any still kept as text.
+            self.created_at, self.updated_at
+        attrs = self.__attributes() if _compact else self.__dict__
+        return "[{}] ({}) {}".format(clname, self.id, attrs)
+
+
+registry[BaseModel.__name__] = BaseModel
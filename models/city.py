@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ the City class."""
+import models
 from models.base_model import BaseModel
 
 
@@ -11,3 +12,13 @@ class City(BaseModel):
 
     state_id = ""
     name = ""
+
+    @property
+    def state(self):
+        """State: The state of the city, or None."""
+        return models.storage.get("State", self.state_id)
+
+    @property
+    def places(self):
+        """list: The Places of the city, through the foreign keys."""
+        return list(models.storage.find("Place", city_id=self.id).values())
@@ -0,0 +1,407 @@
+#!/usr/bin/python3
+"""Defines a compact binary codec for FileStorage snapshots.
+
+A snapshot starts with the magic bytes and a dictionary listing, for
+every class, the names of the fields its records use. Each record then
+holds its length, the index of its class, its id (16 bytes when it is a
+UUID), created_at and updated_at as integer microseconds since the Unix
+epoch, and its other fields as (field index, tagged value) pairs. A zero
+length ends the records.
+
+An index follows the records: the offset of every record sorted by a
+64-bit hash of its key, then the number of records of every class, then
+a fixed-size footer locating the index. MappedSnapshot uses it to look
+up and count records straight from a memory-mapped file.
+
+Usage:
+    python3 -m models.engine.binary_codec json2bin <file.json> <file.bin>
+    python3 -m models.engine.binary_codec bin2json <file.bin> <file.json>
+"""
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from datetime import datetime, timedelta
+
+MAGIC = b"HBNB\x01"
+INDEX_MAGIC = b"HBNBIDX\x01"
+_epoch = datetime(1970, 1, 1)
+_micro = timedelta(microseconds=1)
+_stamps = ("created_at", "updated_at")
+_reserved = ("id", "__class__") + _stamps
+
+_u16 = struct.Struct("<H")
+_u32 = struct.Struct("<I")
+_head = struct.Struct("<HBqq")
+_int = struct.Struct("<q")
+_float = struct.Struct("<d")
+_entry = struct.Struct("<QQ")
+_footer = struct.Struct("<QI8s")
+
+
+def _hash(key):
+    """Return the 64-bit hash the index sorts key by."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"),
+                                          digest_size=8).digest(), "little")
+
+
+def _encode_str(s):
+    """Return s as a u32 length followed by its UTF-8 bytes."""
+    b = s.encode("utf-8")
+    return _u32.pack(len(b)) + b
+
+
+def _encode_value(value):
+    """Return value as a one-byte tag followed by its encoding."""
+    if value is None:
+        return b"N"
+    if type(value) is str:
+        return b"S" + _encode_str(value)
+    if type(value) is int and -(1 << 63) <= value < (1 << 63):
+        return b"I" + _int.pack(value)
+    if type(value) is float:
+        return b"F" + _float.pack(value)
+    return b"J" + _encode_str(json.dumps(value))
+
+
+def _encode_stamp(iso):
+    """Return the ISO format datetime iso as microseconds since 1970."""
+    return (datetime.fromisoformat(iso) - _epoch) // _micro
+
+
+def _decode_stamp(micros):
+    """Return the ISO format of the datetime micros after 1970."""
+    stamp = _epoch + timedelta(microseconds=micros)
+    return stamp.isoformat(timespec="microseconds")
+
+
+def _encode_id(oid):
+    """Return the id kind (0 for a UUID, 1 otherwise) and its bytes."""
+    if (type(oid) is str and len(oid) == 36 and oid == oid.lower() and
+            oid[8] == oid[13] == oid[18] == oid[23] == "-"):
+        try:
+            raw = bytes.fromhex(oid.replace("-", ""))
+        except ValueError:
+            raw = b""
+        if len(raw) == 16:
+            return 0, raw
+    return 1, _encode_str(oid)
+
+
+def dump(objects, f):
+    """Write the snapshot of objects to the binary file f.
+
+    Args:
+        objects (dict): The dictionary representations by key, as
+            returned by BaseModel.to_dict().
+        f (file): A binary file open for writing.
+    """
+    classes = {}
+    for odict in objects.values():
+        fields = classes.setdefault(odict["__class__"], {})
+        for name in odict:
+            if name not in _reserved and name not in fields:
+                fields[name] = len(fields)
+    cls_index = {name: i for i, name in enumerate(classes)}
+    head = [MAGIC, _u16.pack(len(classes))]
+    for cls_name, fields in classes.items():
+        head.append(_encode_str(cls_name))
+        head.append(_u16.pack(len(fields)))
+        for name in fields:
+            head.append(_encode_str(name))
+    head = b"".join(head)
+    f.write(head)
+    pos = len(head)
+    index = []
+    counts = [0] * len(classes)
+    for odict in objects.values():
+        cls_name = odict["__class__"]
+        fields = classes[cls_name]
+        kind, oid = _encode_id(odict["id"])
+        parts = [_head.pack(cls_index[cls_name], kind,
+                            _encode_stamp(odict["created_at"]),
+                            _encode_stamp(odict["updated_at"])), oid]
+        for name, value in odict.items():
+            if name not in _reserved:
+                parts.append(_u16.pack(fields[name]))
+                parts.append(_encode_value(value))
+        record = b"".join(parts)
+        f.write(_u32.pack(len(record)))
+        f.write(record)
+        index.append((_hash("{}.{}".format(cls_name, odict["id"])), pos))
+        counts[cls_index[cls_name]] += 1
+        pos += 4 + len(record)
+    f.write(_u32.pack(0))
+    pos += 4
+    index.sort()
+    f.write(b"".join(_entry.pack(h, offset) for h, offset in index))
+    f.write(b"".join(_u32.pack(n) for n in counts))
+    f.write(_footer.pack(pos, len(index), INDEX_MAGIC))
+
+
+def _str_at(buf, pos):
+    """Return the length-prefixed string at pos in buf and its end."""
+    n, = _u32.unpack_from(buf, pos)
+    pos += 4
+    return str(buf[pos:pos + n], "utf-8"), pos + n
+
+
+def _uuid_at(buf, pos):
+    """Return the 16-byte UUID at pos in buf in its canonical form."""
+    h = buf[pos:pos + 16].hex()
+    return "{}-{}-{}-{}-{}".format(h[:8], h[8:12], h[12:16], h[16:20],
+                                   h[20:])
+
+
+def read_header(buf):
+    """Return the class dictionary of the snapshot buf and its size.
+
+    Args:
+        buf (bytes-like): The whole snapshot.
+
+    Returns:
+        tuple: A list of (class name, field names) and the offset of the
+            first record.
+    """
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a binary HBNB snapshot")
+    pos = len(MAGIC)
+    nclasses, = _u16.unpack_from(buf, pos)
+    pos += 2
+    classes = []
+    for i in range(nclasses):
+        cls_name, pos = _str_at(buf, pos)
+        nfields, = _u16.unpack_from(buf, pos)
+        pos += 2
+        fields = []
+        for j in range(nfields):
+            name, pos = _str_at(buf, pos)
+            fields.append(name)
+        classes.append((cls_name, fields))
+    return classes, pos
+
+
+def decode_record(buf, pos, classes):
+    """Decode the record whose length prefix is at pos in buf.
+
+    Returns:
+        tuple: The key, the dictionary representation of the record and
+            the offset of the next record, or None at the end marker.
+    """
+    size, = _u32.unpack_from(buf, pos)
+    if size == 0:
+        return None
+    pos += 4
+    end = pos + size
+    cls_i, kind, created, updated = _head.unpack_from(buf, pos)
+    pos += _head.size
+    cls_name, fields = classes[cls_i]
+    if kind == 0:
+        oid = _uuid_at(buf, pos)
+        pos += 16
+    else:
+        oid, pos = _str_at(buf, pos)
+    odict = {"id": oid, "created_at": _decode_stamp(created),
+             "updated_at": _decode_stamp(updated)}
+    while pos < end:
+        name = fields[_u16.unpack_from(buf, pos)[0]]
+        tag = buf[pos + 2]
+        pos += 3
+        if tag == 0x53:
+            odict[name], pos = _str_at(buf, pos)
+        elif tag == 0x49:
+            odict[name], = _int.unpack_from(buf, pos)
+            pos += 8
+        elif tag == 0x46:
+            odict[name], = _float.unpack_from(buf, pos)
+            pos += 8
+        elif tag == 0x4e:
+            odict[name] = None
+        elif tag == 0x4a:
+            text, pos = _str_at(buf, pos)
+            odict[name] = json.loads(text)
+        else:
+            raise ValueError("Unknown value tag {!r}".format(chr(tag)))
+    odict["__class__"] = cls_name
+    return "{}.{}".format(cls_name, oid), odict, end
+
+
+def load(f):
+    """Yield the objects of the snapshot in the binary file f.
+
+    Yields:
+        tuple: The key and the dictionary representation of each object.
+    """
+    buf = f.read()
+    classes, pos = read_header(buf)
+    while True:
+        record = decode_record(buf, pos, classes)
+        if record is None:
+            return
+        key, odict, pos = record
+        yield key, odict
+
+
+class MappedSnapshot:
+    """Represent a read-only, memory-mapped binary snapshot.
+
+    Records are only decoded when asked for, so opening a snapshot costs
+    the same whatever its size and every process mapping the same file
+    shares its pages. Lookups by key binary search the index; snapshots
+    written without one are scanned once to build it in memory.
+    """
+
+    def __init__(self, path):
+        """Map the binary snapshot at path.
+
+        Args:
+            path (str): The path of the snapshot.
+        """
+        with open(path, "rb") as f:
+            self.__buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__classes, self.__first = read_header(self.__buf)
+        self.__names = {name: i
+                        for i, (name, fields) in enumerate(self.__classes)}
+        self.__offsets = None
+        size = len(self.__buf)
+        if (size >= _footer.size and
+                self.__buf[size - 8:] == INDEX_MAGIC):
+            self.__index, self.__size, magic = _footer.unpack_from(
+                self.__buf, size - _footer.size)
+            pos = self.__index + self.__size * _entry.size
+            self.__counts = [_u32.unpack_from(self.__buf, pos + 4 * i)[0]
+                             for i in range(len(self.__classes))]
+        else:
+            self.__scan()
+
+    def __len__(self):
+        """Return the number of records."""
+        return self.__size
+
+    def __contains__(self, key):
+        """Return True if the snapshot holds a record under key."""
+        return self.__find(key) is not None
+
+    def get(self, key):
+        """Return the dictionary representation stored under key, or None.
+
+        Args:
+            key (str): The <class name>.<id> key of the record.
+        """
+        pos = self.__find(key)
+        if pos is None:
+            return None
+        return decode_record(self.__buf, pos, self.__classes)[1]
+
+    def count(self, cls_name=None):
+        """Return the number of records, or of records of one class.
+
+        Args:
+            cls_name (str): Only count the records of this class.
+        """
+        if cls_name is None:
+            return self.__size
+        if cls_name not in self.__names:
+            return 0
+        return self.__counts[self.__names[cls_name]]
+
+    def items(self, cls_name=None):
+        """Yield the records in the order they are stored.
+
+        Args:
+            cls_name (str): Only yield the records of this class.
+
+        Yields:
+            tuple: The key and the dictionary representation of each
+                record.
+        """
+        if cls_name is not None and cls_name not in self.__names:
+            return
+        cls_i = self.__names.get(cls_name)
+        buf = self.__buf
+        pos = self.__first
+        while True:
+            size, = _u32.unpack_from(buf, pos)
+            if size == 0:
+                return
+            if cls_i is None or _u16.unpack_from(buf, pos + 4)[0] == cls_i:
+                key, odict, end = decode_record(buf, pos, self.__classes)
+                yield key, odict
+            pos += 4 + size
+
+    def close(self):
+        """Unmap the snapshot."""
+        self.__buf.close()
+
+    def __key_at(self, pos):
+        """Return the key of the record whose length prefix is at pos."""
+        buf = self.__buf
+        cls_i, kind, created, updated = _head.unpack_from(buf, pos + 4)
+        pos += 4 + _head.size
+        if kind == 0:
+            oid = _uuid_at(buf, pos)
+        else:
+            oid = _str_at(buf, pos)[0]
+        return "{}.{}".format(self.__classes[cls_i][0], oid)
+
+    def __find(self, key):
+        """Return the offset of the record under key, or None."""
+        if self.__offsets is not None:
+            return self.__offsets.get(key)
+        h = _hash(key)
+        buf, index, step = self.__buf, self.__index, _entry.size
+        lo, hi = 0, self.__size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _entry.unpack_from(buf, index + mid * step)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.__size:
+            eh, pos = _entry.unpack_from(buf, index + lo * step)
+            if eh != h:
+                return None
+            if self.__key_at(pos) == key:
+                return pos
+            lo += 1
+        return None
+
+    def __scan(self):
+        """Build the index of a snapshot written without one."""
+        self.__offsets = {}
+        self.__counts = [0] * len(self.__classes)
+        pos = self.__first
+        while True:
+            size, = _u32.unpack_from(self.__buf, pos)
+            if size == 0:
+                break
+            key = self.__key_at(pos)
+            self.__offsets[key] = pos
+            self.__counts[_u16.unpack_from(self.__buf, pos + 4)[0]] += 1
+            pos += 4 + size
+        self.__size = len(self.__offsets)
+
+
+def json_to_binary(src, dst):
+    """Convert the JSON snapshot at src to a binary snapshot at dst."""
+    with open(src) as f:
+        objects = json.load(f)
+    with open(dst, "wb") as f:
+        dump(objects, f)
+
+
+def binary_to_json(src, dst):
+    """Convert the binary snapshot at src to a JSON snapshot at dst."""
+    with open(src, "rb") as f:
+        objects = dict(load(f))
+    with open(dst, "w") as f:
+        json.dump(objects, f)
+
+
+if __name__ == "__main__":
+    commands = {"json2bin": json_to_binary, "bin2json": binary_to_json}
+    if len(sys.argv) != 4 or sys.argv[1] not in commands:
+        print(__doc__.split("Usage:")[1].strip(), file=sys.stderr)
+        sys.exit(1)
+    commands[sys.argv[1]](sys.argv[2], sys.argv[3])
@@ -1,7 +1,16 @@
 #!/usr/bin/python3
 """Defines the FileStorage class."""
 import json
-from models.base_model import BaseModel
+import os
+import re
+import threading
+import zlib
+from models.base_model import BaseModel, registry
+from models.engine import binary_codec
+from models.engine.indexes import (AmenityIndex, ClassIndex,
+                                   ForeignKeyIndex, PlaceColumns, PlaceGrid,
+                                   TextIndex, UniqueIndex)
+from models.engine.query import aggregate, check_aggregate
 from models.user import User
 from models.state import State
 from models.city import City
@@ -10,40 +19,1143 @@ from models.amenity import Amenity
 from models.review import Review
 
 
+_decoder = json.JSONDecoder()
+_space = re.compile(r"\s*")
+_member_end = re.compile(r"\s*[,}]")
+
+
+def iter_members(f, chunk=1 << 16):
+    """Yield the members of the JSON object in the file f one by one.
+
+    The file is read chunk characters at a time, so only the member
+    being decoded has to fit in memory, never the whole object.
+
+    Args:
+        f (file): A text file holding a single JSON object.
+        chunk (int): The number of characters read at a time.
+
+    Yields:
+        tuple: The key, the decoded value and the JSON text of the value.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    state = "open"
+    while True:
+        pos = _space.match(buf, pos).end()
+        try:
+            if pos == len(buf):
+                raise IndexError
+            if state == "open":
+                if buf[pos] != "{":
+                    raise ValueError("Expecting '{{' at {}".format(pos))
+                pos += 1
+                state = "first"
+            elif state in ("first", "next") and buf[pos] == "}":
+                return
+            elif state == "next":
+                if buf[pos] != ",":
+                    raise ValueError("Expecting ',' at {}".format(pos))
+                pos += 1
+                state = "first"
+            elif state == "first":
+                key, pos = _decoder.raw_decode(buf, pos)
+                state = "colon"
+            elif state == "colon":
+                if buf[pos] != ":":
+                    raise ValueError("Expecting ':' at {}".format(pos))
+                pos += 1
+                state = "value"
+            else:
+                value, end = _decoder.raw_decode(buf, pos)
+                if (not eof and buf[pos] in "-0123456789" and
+                        not _member_end.match(buf, end)):
+                    # The number may go on in the next chunk.
+                    raise IndexError
+                yield key, value, buf[pos:end]
+                pos = end
+                state = "next"
+        except (IndexError, json.JSONDecodeError):
+            if eof:
+                raise ValueError("Truncated JSON object in {}".format(
+                    getattr(f, "name", f)))
+            more = f.read(chunk)
+            eof = more == ""
+            buf = buf[pos:] + more
+            pos = 0
+
+
+class LazyObjects(dict):
+    """Represent a dictionary of objects built on first access.
+
+    Deferred keys hold a placeholder until they are looked up, at which
+    point the load callable builds the object and replaces it.
+    """
+
+    __unloaded = object()
+
+    def __init__(self, load, *args):
+        """Initialize a new LazyObjects.
+
+        Args:
+            load (callable): Return the object to store under a key.
+            *args (any): Passed on to dict.
+        """
+        super().__init__(*args)
+        self.__load = load
+
+    def defer(self, key):
+        """Put key in the dictionary without building its object."""
+        super().__setitem__(key, LazyObjects.__unloaded)
+
+    def is_loaded(self, key):
+        """Return True if the object under key has been built."""
+        return super().__getitem__(key) is not LazyObjects.__unloaded
+
+    def __getitem__(self, key):
+        """Return the object under key, building it if needed."""
+        value = super().__getitem__(key)
+        if value is LazyObjects.__unloaded:
+            value = self.__load(key)
+            super().__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        """Return the object under key if present, else default."""
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        """Remove key and return its object, building it if needed."""
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        super().pop(key)
+        return value
+
+    def __iter__(self):
+        """Iterate over the keys.
+
+        Defining it keeps dict(), update() and ** from copying the
+        placeholders, as they then look every key up through __getitem__.
+        """
+        return super().__iter__()
+
+    def copy(self):
+        """Return a shallow copy that still builds objects on access."""
+        return LazyObjects(self.__load, super().items())
+
+    def values(self):
+        """Return a list of every object, building those not yet built."""
+        return [self[key] for key in self]
+
+    def items(self):
+        """Return a list of (key, object) pairs, building as needed."""
+        return [(key, self[key]) for key in self]
+
+
 class FileStorage:
     """Represent an abstracted storage engine.
 
+    In journal mode save() appends one JSON line per created, changed or
+    deleted key to <__file_path>.log instead of rewriting __file_path,
+    and reload() replays that log on top of the snapshot. Once the log
+    outgrows both __compact_min bytes and __compact_ratio times the
+    snapshot, compact() folds it back into the snapshot in the background.
+
+    In lazy mode reload() only records the JSON text of each key and
+    __objects becomes a LazyObjects that builds an object the first time
+    it is looked up.
+
+    In sharded mode every class is saved to its own files in the
+    <__file_path>.d directory, optionally split in partitions by a hash of
+    the id. save() only rewrites the shards holding dirty keys and a shard
+    is only read once a caller asks for its class.
+
+    With the binary codec the snapshot is kept in the format of
+    models.engine.binary_codec, next to __file_path with a .bin extension.
+
+    In mapped mode the binary snapshot is memory-mapped read-only instead
+    of being reloaded: get() and count() answer from its index and objects
+    are only built when a caller asks for them. Changes are refused by
+    new(), mark_dirty(), delete() and save().
+
+    Secondary indexes, such as the Place columns, are built from the
+    objects the first time they are asked for and then kept up to date
+    by new(), mark_dirty() and delete(). reload() drops them, as does
+    replacing __objects with another dictionary. The keys of every class
+    are always indexed, so count() does not scan __objects.
+
     Attributes:
         __file_path (str): The name of the file to save objects to.
         __objects (dict): A dictionary of instantiated objects.
+        __dirty (set): Keys created, changed or deleted since the last save.
+        __cache (dict): The last JSON text written or read for each key.
+        __compact_min (int): Journal size in bytes below which it is never
+            compacted automatically.
+        __compact_ratio (float): Journal to snapshot size ratio above which
+            it is compacted automatically.
+        __compactor (threading.Thread): The running compaction, if any.
+        __unread (set): Names of the shards not read yet.
+        __stale (set): Names of the shards to rewrite on the next save.
+        __indexes (dict): The indexes built so far, by type.
+        __indexed (dict): The __objects dictionary they were built from.
     """
     __file_path = "file.json"
     __objects = {}
+    __dirty = set()
+    __cache = {}
+    __compact_min = 1 << 20
+    __compact_ratio = 1.0
+    __compactor = None
+    __unread = set()
+    __stale = set()
+    __indexes = {}
+    __indexed = None
+
+    def __init__(self, *, journal=False, lazy=False, sharded=False,
+                 partitions=1, codec="json", mapped=False):
+        """Initialize a new FileStorage.
+
+        Args:
+            journal (bool): Append changes to a log instead of rewriting
+                the whole file on every save.
+            lazy (bool): Build the reloaded objects on first access
+                instead of all at once.
+            sharded (bool): Save each class to its own files.
+            partitions (int): The number of files per class when sharded.
+            codec (str): The snapshot format, "json" or "binary".
+            mapped (bool): Memory-map the binary snapshot read-only.
+
+        Raises:
+            ValueError: If sharded is combined with journal, the binary
+                codec with either, mapped with anything but the binary
+                codec, or partitions is not a positive int.
+        """
+        if sharded and journal:
+            raise ValueError("sharded and journal modes are exclusive")
+        if type(partitions) is not int or partitions < 1:
+            raise ValueError("partitions must be a positive int")
+        if codec not in ("json", "binary"):
+            raise ValueError("codec must be 'json' or 'binary'")
+        if codec == "binary" and (journal or sharded):
+            raise ValueError("the binary codec only supports snapshots")
+        if mapped and (codec != "binary" or lazy):
+            raise ValueError("mapped mode needs the binary codec")
+        self.__journal = journal
+        self.__lazy = lazy
+        self.__sharded = sharded
+        self.__partitions = partitions
+        self.__binary = codec == "binary"
+        self.__mapped = mapped
+        self.__map = None
+
+    def all(self, cls=None):
+        """Return the dictionary __objects, or the objects of one class.
+
+        The objects of one class are looked up through the class index,
+        without going over the objects of the other classes.
+
+        Args:
+            cls (type or str): Only return the objects of this class.
+        """
+        if cls is None:
+            self.__read_shards()
+            self.__read_mapped()
+            return FileStorage.__objects
+        cls_name = cls if type(cls) is str else cls.__name__
+        self.__read_shards(cls_name)
+        self.__read_mapped(cls_name)
+        keys = self.__index(ClassIndex).keys(cls_name)
+        objects = FileStorage.__objects
+        if type(objects) is LazyObjects:
+            clsdict = LazyObjects(self.__hydrate)
+            for key in keys:
+                if objects.is_loaded(key):
+                    clsdict[key] = objects[key]
+                else:
+                    clsdict.defer(key)
+            return clsdict
+        return {key: objects[key] for key in keys}
+
+    def get(self, cls, id):
+        """Return the object of class cls with the given id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        self.__read_shards(cls_name)
+        key = "{}.{}".format(cls_name, id)
+        if (self.__map is not None and key not in FileStorage.__objects and
+                key not in FileStorage.__dirty):
+            odict = self.__map.get(key)
+            if odict is not None:
+                self.__load(key, odict)
+        return FileStorage.__objects.get(key)
+
+    def get_many(self, cls, ids):
+        """Return the objects of class cls with the given ids.
+
+        Args:
+            cls (type or str): The class of the objects.
+            ids (iterable): The ids of the objects.
+
+        Returns:
+            list: The objects found, once each, in the order of ids.
+        """
+        found = []
+        for id in dict.fromkeys(ids):
+            obj = self.get(cls, id)
+            if obj is not None:
+                found.append(obj)
+        return found
+
+    def count(self, cls=None):
+        """Return the number of objects, or of objects of one class.
 
-    def all(self):
-        """Return the dictionary __objects."""
-        return FileStorage.__objects
+        The count comes from the class index, without a scan. In mapped
+        mode the snapshot is not read, only its index.
+
+        Args:
+            cls (type or str): Only count the objects of this class.
+        """
+        cls_name = None
+        if cls is not None:
+            cls_name = cls if type(cls) is str else cls.__name__
+        if self.__map is None:
+            self.__read_shards(cls_name)
+            return self.__index(ClassIndex).count(cls_name)
+        n = self.__map.count(cls_name)
+        prefix = "" if cls_name is None else cls_name + "."
+        for key in FileStorage.__dirty:
+            if key.startswith(prefix):
+                n += (key in FileStorage.__objects) - (key in self.__map)
+        return n
 
     def new(self, obj):
-        """Set in __objects obj with key <obj_class_name>.id"""
+        """Set in __objects obj with key <obj_class_name>.id
+
+        Raises:
+            ValueError: If a unique field of obj has the value of another
+                object.
+            PermissionError: In mapped mode.
+        """
+        if self.__mapped:
+            raise PermissionError("storage is read-only")
         ocname = obj.__class__.__name__
-        FileStorage.__objects["{}.{}".format(ocname, obj.id)] = obj
+        for name in UniqueIndex.fields.get(ocname, ()):
+            self.check_unique(obj, name, getattr(obj, name, None))
+        key = "{}.{}".format(ocname, obj.id)
+        FileStorage.__objects[key] = obj
+        FileStorage.__dirty.add(key)
+        self.__index_put(key, obj)
+
+    def mark_dirty(self, obj):
+        """Flag obj as changed so the next save re-serializes it.
+
+        Objects that are not in storage are ignored.
+
+        Raises:
+            PermissionError: In mapped mode, for an object in storage,
+                which, already changed, is dropped from __objects so that
+                it is read back from the snapshot as it was.
+        """
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if self.__mapped:
+            if key not in FileStorage.__objects and (
+                    self.__map is None or key not in self.__map):
+                return
+            if FileStorage.__objects.get(key) is obj:
+                del FileStorage.__objects[key]
+                self.__index_put(key, None)
+            raise PermissionError("storage is read-only")
+        if key in FileStorage.__objects:
+            FileStorage.__dirty.add(key)
+            self.__index_put(key, obj)
+
+    def delete(self, obj=None):
+        """Delete obj from __objects if it's inside.
+
+        Raises:
+            PermissionError: In mapped mode.
+        """
+        if obj is None:
+            return
+        if self.__mapped:
+            raise PermissionError("storage is read-only")
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if FileStorage.__objects.pop(key, None) is not None:
+            FileStorage.__cache.pop(key, None)
+            FileStorage.__dirty.add(key)
+            self.__index_drop(key)
+
+    def lookup(self, cls, name, value):
+        """Return the object of cls whose unique field name is value, in
+        any case, or None, through the unique index.
+
+        Args:
+            cls (type or str): The class of the object.
+            name (str): The unique field, like email for User.
+            value (str): The value to look for.
+
+        Raises:
+            ValueError: If name is not a unique field of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        if name not in UniqueIndex.fields.get(cls_name, ()):
+            raise ValueError("{}.{} is not unique".format(cls_name, name))
+        key = self.__index(UniqueIndex).key(cls_name, name, value)
+        return None if key is None else FileStorage.__objects[key]
+
+    def has_duplicates(self, cls, name):
+        """Return True if objects of cls share a value of the unique field
+        name, in any case, as objects reloaded from an older file can.
+
+        Raises:
+            ValueError: If name is not a unique field of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        if name not in UniqueIndex.fields.get(cls_name, ()):
+            raise ValueError("{}.{} is not unique".format(cls_name, name))
+        return self.__index(UniqueIndex).shared(cls_name, name)
+
+    def check_unique(self, obj, name, value):
+        """Refuse value for the field name of obj if another object has it.
+
+        Fields that are not unique, and values that are not indexed, are
+        always accepted.
+
+        Raises:
+            ValueError: If another object of the class of obj has value,
+                in any case, in its unique field name.
+        """
+        cls_name = obj.__class__.__name__
+        if (name not in UniqueIndex.fields.get(cls_name, ()) or
+                UniqueIndex.normalize(value) is None):
+            return
+        key = self.__index(UniqueIndex).key(cls_name, name, value)
+        if key is not None and key != "{}.{}".format(cls_name, obj.id):
+            raise ValueError("{}.{} {} is already taken".format(
+                cls_name, name, value))
+
+    def find(self, cls, **fields):
+        """Return the objects of cls referencing the given ids.
+
+        The objects are looked up through the foreign-key index, for
+        example find(Review, place_id=<id>) or find(City, state_id=<id>).
+        Places can also be found by amenities, through the amenity
+        index: find(Place, amenity_ids=[<id>, <id>]) gives the Places
+        having all of them.
+
+        A foreign key can also be given a list of ids, to find the
+        objects referencing any of them in one call, for example the
+        Reviews of every Place of a City.
+
+        Args:
+            cls (type or str): The class of the objects.
+            **fields: The id, or list of ids, of each field.
+
+        Raises:
+            ValueError: If a field is not a foreign key of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        for name in fields:
+            if name not in ForeignKeyIndex.fields.get(cls_name, ()) and (
+                    cls_name, name) != ("Place", "amenity_ids"):
+                raise ValueError("{}.{} is not a foreign key".format(
+                    cls_name, name))
+        keys = None
+        amenity_ids = fields.pop("amenity_ids", ())
+        if type(amenity_ids) is str:
+            amenity_ids = (amenity_ids,)
+        if amenity_ids:
+            keys = self.__index(AmenityIndex).keys(*amenity_ids)
+        index = self.__index(ForeignKeyIndex) if fields else None
+        for name, value in fields.items():
+            if type(value) in (list, tuple, set, frozenset):
+                found = {}
+                for one in value:
+                    found.update(dict.fromkeys(
+                        index.keys(cls_name, name, one)))
+            else:
+                found = index.keys(cls_name, name, value)
+            keys = list(found) if keys is None else [
+                key for key in keys if key in found]
+        if keys is None:
+            return self.all(cls_name)
+        objects = FileStorage.__objects
+        return {key: objects[key] for key in keys}
+
+    def search(self, cls, text, limit=None):
+        """Return the objects of cls whose text has every word of text,
+        best match first, through the full-text index.
+
+        Args:
+            cls (type or str): The class of the objects.
+            text (str): The words to look for, in any case.
+            limit (int): Only return this many objects, the best ones.
+
+        Raises:
+            ValueError: If cls has no free-text fields.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        if cls_name not in TextIndex.fields:
+            raise ValueError("{} has no text fields".format(cls_name))
+        objects = FileStorage.__objects
+        keys = self.__index(TextIndex).search(cls_name, text, limit)
+        return {key: objects[key] for key in keys}
+
+    def within(self, south, west, north, east):
+        """Return the Places inside a box, through the spatial index.
+
+        Args:
+            south, west, north, east (float): The edges, in degrees; a
+                west edge east of the east edge crosses the 180th
+                meridian.
+        """
+        objects = FileStorage.__objects
+        keys = self.__index(PlaceGrid).within(south, west, north, east)
+        return {key: objects[key] for key in keys}
+
+    def near(self, latitude, longitude, km):
+        """Return the Places within km of a point, nearest first.
+
+        Args:
+            latitude, longitude (float): The point, in degrees.
+            km (float): The radius, in kilometres.
+        """
+        objects = FileStorage.__objects
+        keys = self.__index(PlaceGrid).near(latitude, longitude, km)
+        return {key: objects[key] for key in keys}
+
+    def aggregate(self, cls, function, field=None, by=None):
+        """Return function of field over the objects of cls.
+
+        Counts come from the class index, or from the foreign-key index
+        when grouped by a foreign key. Numbers of a Place column come
+        from the columns, grouped through the foreign-key index if need
+        be. Anything else is computed in one pass over the objects.
+
+        Args:
+            cls (type or str): The class of the objects.
+            function (str): count, sum, avg, min or max.
+            field (str): The attribute to aggregate; count takes none.
+            by (str): The attribute to group the objects by, if any.
+
+        Returns:
+            The result, or a dictionary of the result of every value of
+            by. See models.engine.query.aggregate().
+
+        Raises:
+            ValueError: If the aggregate is not valid.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        check_aggregate(function, field)
+        grouped = by in ForeignKeyIndex.fields.get(cls_name, ())
+        if function == "count" and by is None:
+            return self.count(cls_name)
+        if function == "count" and grouped:
+            groups = self.__index(ForeignKeyIndex).groups(cls_name, by)
+            return {value: len(keys) for value, keys in groups.items()}
+        if cls_name == "Place" and field in PlaceColumns.fields and (
+                by is None or grouped):
+            columns = self.__index(PlaceColumns)
+            if by is None:
+                name = "mean" if function == "avg" else function
+                return columns.stats(field)[name]
+            fold = {"sum": lambda v: sum(v, 0.0),
+                    "avg": lambda v: sum(v) / len(v) if v else None,
+                    "min": lambda v: min(v) if v else None,
+                    "max": lambda v: max(v) if v else None}[function]
+            groups = self.__index(ForeignKeyIndex).groups(cls_name, by)
+            return {value: fold(columns.values(field, keys))
+                    for value, keys in groups.items()}
+        return aggregate(self.all(cls_name).values(), function, field, by)
+
+    def place_columns(self):
+        """Return the numeric fields of every Place as columns.
+
+        Returns:
+            PlaceColumns: The columns, kept up to date from then on.
+        """
+        return self.__index(PlaceColumns)
 
     def save(self):
-        """Serialize __objects to the JSON file __file_path."""
-        odict = FileStorage.__objects
-        objdict = {obj: odict[obj].to_dict() for obj in odict.keys()}
-        with open(FileStorage.__file_path, "w") as f:
-            json.dump(objdict, f)
+        """Serialize __objects to the JSON file __file_path.
+
+        In journal mode only the keys created, changed or deleted since
+        the last save are appended to the journal.
+
+        Raises:
+            PermissionError: In mapped mode.
+        """
+        if self.__mapped:
+            raise PermissionError("storage is read-only")
+        if self.__journal:
+            self.__append_journal()
+            FileStorage.__dirty.clear()
+            if self.__should_compact():
+                self.compact()
+        elif self.__sharded:
+            self.__write_shards()
+            FileStorage.__dirty.clear()
+        elif self.__binary:
+            self.__write_binary()
+            FileStorage.__dirty.clear()
+        else:
+            self.__write_snapshot()
+            FileStorage.__dirty.clear()
 
     def reload(self):
-        """Deserialize the JSON file __file_path to __objects, if it exists."""
+        """Deserialize the JSON file __file_path to __objects, if it exists.
+
+        Any journal left next to the file is replayed on top of it. In
+        sharded mode the shards are only listed, and read on demand. In
+        mapped mode the binary snapshot is mapped again.
+        """
+        if self.__mapped:
+            self.__open_map()
+            self.__reset_indexes()
+            return
+        if self.__lazy and type(FileStorage.__objects) is not LazyObjects:
+            FileStorage.__objects = LazyObjects(self.__hydrate,
+                                                FileStorage.__objects)
+        self.__reset_indexes()
+        if self.__sharded:
+            self.__list_shards()
+            return
+        if self.__binary:
+            keys = self.__stream_binary()
+        else:
+            keys = self.__stream_json()
+        for key in keys:
+            pass
+        self.__replay(self.__journal_path() + ".old")
+        self.__replay(self.__journal_path())
+
+    def stream(self):
+        """Deserialize __file_path into __objects one object at a time.
+
+        Each object is put in __objects as soon as it is parsed, without
+        first decoding the whole file. The journal is not replayed. In
+        sharded mode the shards not read yet are streamed instead.
+
+        Yields:
+            BaseModel: The objects in the order they are stored.
+        """
+        self.__reset_indexes()
+        if self.__sharded:
+            keys = self.__stream_shards()
+        elif self.__mapped:
+            keys = self.__stream_mapped()
+        elif self.__binary:
+            keys = self.__stream_binary()
+        else:
+            keys = self.__stream_json()
+        for key in keys:
+            yield FileStorage.__objects[key]
+
+    def compact(self, *, wait=False):
+        """Fold the journal into a fresh snapshot of __file_path.
+
+        Pending changes are saved first. The snapshot is then written by
+        a background thread while new changes go to a fresh journal, so
+        the caller is not blocked unless wait is True.
+
+        Args:
+            wait (bool): Return only once the snapshot is written.
+        """
+        if not self.__journal:
+            self.save()
+            return
+        self.__wait_compaction()
+        if FileStorage.__dirty:
+            self.__append_journal()
+            FileStorage.__dirty.clear()
+        texts = [(json.dumps(key), self.__encode(key))
+                 for key in FileStorage.__objects.keys()]
+        self.__rotate_journal()
+        FileStorage.__compactor = threading.Thread(
+            target=self.__write_compacted,
+            args=(FileStorage.__file_path, texts))
+        FileStorage.__compactor.start()
+        if wait:
+            self.__wait_compaction()
+
+    def __shard_dir(self):
+        """Return the directory holding the shards of __file_path."""
+        return FileStorage.__file_path + ".d"
+
+    def __shard(self, key):
+        """Return the name of the shard key is saved to."""
+        cls_name, _, oid = key.partition(".")
+        if self.__partitions == 1:
+            return cls_name
+        part = zlib.crc32(oid.encode()) % self.__partitions
+        return "{}.{}".format(cls_name, part)
+
+    def __list_shards(self):
+        """Record the shards on disk as not read yet.
+
+        Objects of a file.json left by the single-file layout are loaded
+        and marked dirty, so the next save moves them into shards.
+        """
+        try:
+            names = os.listdir(self.__shard_dir())
+        except FileNotFoundError:
+            names = []
+        FileStorage.__unread.update(name[:-len(".json")] for name in names
+                                    if name.endswith(".json"))
+        try:
+            with open(FileStorage.__file_path) as f:
+                for key, l, text in iter_members(f):
+                    self.__load(key, l, text)
+                    FileStorage.__dirty.add(key)
+        except FileNotFoundError:
+            pass
+
+    def __read_shards(self, cls_name=None, names=None):
+        """Read the shards not read yet, or only those of cls_name or
+        among names."""
+        for key in self.__stream_shards(cls_name, names):
+            pass
+
+    def __stream_shards(self, cls_name=None, names=None):
+        """Read the shards not read yet, or only those of cls_name or
+        among names.
+
+        Keys already in __objects are left alone, since they were created
+        or changed since. A key found in the wrong shard, after a change
+        of partitions, is marked for a move on the next save.
+
+        Args:
+            cls_name (str): Only read the shards of this class.
+            names (set): Only read the shards of these names.
+
+        Yields:
+            str: The key of each object, in the order they are read.
+        """
+        shards = [shard for shard in FileStorage.__unread
+                  if (cls_name is None or shard.split(".")[0] == cls_name)
+                  and (names is None or shard in names)]
+        for shard in sorted(shards):
+            FileStorage.__unread.discard(shard)
+            path = os.path.join(self.__shard_dir(), shard + ".json")
+            try:
+                with open(path) as f:
+                    for key, l, text in iter_members(f):
+                        if key in FileStorage.__objects:
+                            continue
+                        self.__load(key, l, text)
+                        if self.__shard(key) != shard:
+                            FileStorage.__dirty.add(key)
+                            FileStorage.__stale.add(shard)
+                        yield key
+            except FileNotFoundError:
+                continue
+
+    def __write_shards(self):
+        """Rewrite the shards holding dirty keys.
+
+        Each shard is written to a temporary file moved over the old one,
+        and removed once it holds no object.
+        """
+        shards = set()
+        while True:
+            # Reading a shard can find keys that belong to another one,
+            # after a change of partitions, which then needs reading too.
+            names = FileStorage.__stale | {self.__shard(key)
+                                           for key in FileStorage.__dirty}
+            if names == shards:
+                break
+            shards = names
+            self.__read_shards(names=shards)
+        groups = {shard: [] for shard in shards}
+        for key in FileStorage.__objects.keys():
+            shard = self.__shard(key)
+            if shard in groups:
+                groups[shard].append(key)
+        os.makedirs(self.__shard_dir(), exist_ok=True)
+        for shard, keys in groups.items():
+            path = os.path.join(self.__shard_dir(), shard + ".json")
+            if len(keys) == 0:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with open(path + ".tmp", "w") as f:
+                f.write("{")
+                sep = ""
+                for key in keys:
+                    f.write("{}{}: {}".format(sep, json.dumps(key),
+                                              self.__encode(key)))
+                    sep = ", "
+                f.write("}")
+            os.replace(path + ".tmp", path)
+        FileStorage.__stale.clear()
+        try:
+            os.remove(FileStorage.__file_path)
+        except FileNotFoundError:
+            pass
+
+    def __stream_json(self):
+        """Read __file_path into __objects one object at a time.
+
+        Yields:
+            str: The key of each object, in the order they are stored.
+        """
+        self.__wait_compaction()
         try:
             with open(FileStorage.__file_path) as f:
-                objdict = json.load(f)
-                for l in objdict.values():
-                    cls_name = l["__class__"]
-                    del l["__class__"]
-                    self.new(eval(cls_name)(**l))
+                for key, l, text in iter_members(f):
+                    self.__load(key, l, text)
+                    yield key
+        except FileNotFoundError:
+            return
+
+    def __binary_path(self):
+        """Return the path of the binary snapshot of __file_path."""
+        return os.path.splitext(FileStorage.__file_path)[0] + ".bin"
+
+    def __stream_binary(self):
+        """Read the binary snapshot into __objects one object at a time.
+
+        Yields:
+            str: The key of each object, in the order they are stored.
+        """
+        try:
+            with open(self.__binary_path(), "rb") as f:
+                for key, odict in binary_codec.load(f):
+                    self.__load(key, odict)
+                    yield key
+        except FileNotFoundError:
+            return
+
+    def __open_map(self):
+        """Map the binary snapshot again.
+
+        Objects built from the previous mapping are dropped, so they are
+        built again from the new one; unsaved changes are kept.
+        """
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        objects = FileStorage.__objects
+        for key in [key for key in objects if key not in FileStorage.__dirty]:
+            del objects[key]
+        try:
+            self.__map = binary_codec.MappedSnapshot(self.__binary_path())
         except FileNotFoundError:
+            pass
+
+    def __stream_mapped(self, cls_name=None):
+        """Build the mapped objects not in __objects yet.
+
+        Keys deleted since the snapshot was mapped are skipped.
+
+        Args:
+            cls_name (str): Only build the objects of this class.
+
+        Yields:
+            str: The key of each object built.
+        """
+        if self.__map is None:
             return
+        for key, odict in self.__map.items(cls_name):
+            if (key not in FileStorage.__objects and
+                    key not in FileStorage.__dirty):
+                self.__load(key, odict)
+                yield key
+
+    def __read_mapped(self, cls_name=None):
+        """Build the mapped objects, or those of one class."""
+        for key in self.__stream_mapped(cls_name):
+            pass
+
+    def __write_binary(self):
+        """Rewrite the binary snapshot from __objects."""
+        path = self.__binary_path()
+        objects = FileStorage.__objects
+        with open(path + ".tmp", "wb") as f:
+            binary_codec.dump({key: objects[key].to_dict()
+                               for key in objects.keys()}, f)
+        os.replace(path + ".tmp", path)
+
+    def __journal_path(self):
+        """Return the path of the journal kept next to __file_path."""
+        return FileStorage.__file_path + ".log"
+
+    def __replay(self, path):
+        """Apply the records of the journal at path, if it exists.
+
+        A torn last record, left by an interrupted write, is ignored.
+
+        Raises:
+            ValueError: If a record before the last one cannot be decoded.
+        """
+        try:
+            f = open(path)
+        except FileNotFoundError:
+            return
+        with f:
+            torn = None
+            for number, line in enumerate(f, 1):
+                if torn is not None:
+                    raise ValueError("{}: corrupt record on line {}".format(
+                        path, torn))
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    torn = number
+                    continue
+                for key, l in record.items():
+                    self.__load(key, l)
+
+    @staticmethod
+    def __mend(path):
+        """End the journal at path on a whole line before appending to it.
+
+        An interrupted write can leave the last record without its
+        newline. The newline is added if the record is whole, otherwise
+        the torn record is cut off, so that the next record does not
+        land on the same line.
+        """
+        try:
+            f = open(path, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            start = end
+            while start > 0:
+                stop = start
+                start = max(0, stop - (1 << 16))
+                f.seek(start)
+                newline = f.read(stop - start).rfind(b"\n")
+                if newline >= 0:
+                    start += newline + 1
+                    break
+            f.seek(start)
+            try:
+                json.loads(f.read())
+            except ValueError:
+                f.truncate(start)
+            else:
+                f.write(b"\n")
+
+    def __should_compact(self):
+        """Return True when the journal outgrew the compaction thresholds."""
+        compactor = FileStorage.__compactor
+        if compactor is not None and compactor.is_alive():
+            return False
+        try:
+            logsize = os.path.getsize(self.__journal_path())
+        except FileNotFoundError:
+            return False
+        try:
+            snapsize = os.path.getsize(FileStorage.__file_path)
+        except FileNotFoundError:
+            snapsize = 0
+        return (logsize >= FileStorage.__compact_min and
+                logsize >= FileStorage.__compact_ratio * snapsize)
+
+    def __rotate_journal(self):
+        """Move the journal aside so new records start a fresh one.
+
+        A journal left aside by an interrupted compaction is kept and the
+        current records are appended to it.
+        """
+        path = self.__journal_path()
+        if not os.path.exists(path):
+            return
+        if os.path.exists(path + ".old"):
+            self.__mend(path + ".old")
+            with open(path) as src, open(path + ".old", "a") as dst:
+                dst.write(src.read())
+            os.remove(path)
+        else:
+            os.replace(path, path + ".old")
+
+    @staticmethod
+    def __write_compacted(path, texts):
+        """Write the (key, object) JSON texts as the snapshot at path.
+
+        The snapshot is written to a temporary file first and moved over
+        path, so a reader never sees it half-written. The rotated journal
+        is dropped last; replaying it again over the new snapshot is
+        harmless.
+        """
+        with open(path + ".tmp", "w") as f:
+            f.write("{")
+            sep = ""
+            for key, text in texts:
+                f.write("{}{}: {}".format(sep, key, text))
+                sep = ", "
+            f.write("}")
+        os.replace(path + ".tmp", path)
+        try:
+            os.remove(path + ".log.old")
+        except FileNotFoundError:
+            pass
+
+    def __wait_compaction(self):
+        """Block until the running compaction, if any, has finished."""
+        if FileStorage.__compactor is not None:
+            FileStorage.__compactor.join()
+            FileStorage.__compactor = None
+
+    def __load(self, key, odict, text=None):
+        """Put the object described by odict under key, or drop the key.
+
+        Unlike new() this does not mark the key as needing a save.
+
+        Args:
+            key (str): The <class name>.<id> key of the object.
+            odict (dict): The dictionary representation, or None.
+            text (str): The JSON text odict was decoded from, if known.
+        """
+        objects = FileStorage.__objects
+        if odict is None:
+            if key in objects:
+                # Plain dict.pop so a deferred object is not built to be
+                # dropped straight away.
+                dict.pop(objects, key)
+            FileStorage.__cache.pop(key, None)
+            self.__index_drop(key)
+            return
+        if text is None and type(objects) is LazyObjects:
+            text = json.dumps(odict)
+        if text is None:
+            FileStorage.__cache.pop(key, None)
+        else:
+            FileStorage.__cache[key] = text
+        if type(objects) is LazyObjects:
+            objects.defer(key)
+            self.__index_put(key, None)
+        else:
+            objects[key] = self.__build(odict)
+            self.__index_put(key, objects[key])
+
+    def __index(self, kind):
+        """Return the index of type kind, building it on first use."""
+        if FileStorage.__indexed is not FileStorage.__objects:
+            self.__reset_indexes()
+        index = FileStorage.__indexes.get(kind)
+        if index is None:
+            index = kind()
+            classes = kind.cls if type(kind.cls) is tuple else (kind.cls,)
+            for cls_name in classes:
+                objects = self.all(cls_name)
+                if kind.keys_only:
+                    for key in objects.keys():
+                        index.add(key)
+                else:
+                    for key, obj in objects.items():
+                        index.add(key, obj)
+            FileStorage.__indexes[kind] = index
+        return index
+
+    def __reset_indexes(self):
+        """Drop every index but a fresh class index of __objects."""
+        index = ClassIndex()
+        for key in FileStorage.__objects.keys():
+            index.add(key)
+        FileStorage.__indexes = {ClassIndex: index}
+        FileStorage.__indexed = FileStorage.__objects
+
+    def __index_put(self, key, obj):
+        """Index obj under key; None stands for an object not built yet.
+
+        Indexes that need the object itself are dropped in that case.
+        """
+        if FileStorage.__indexed is not FileStorage.__objects:
+            return
+        for kind, index in list(FileStorage.__indexes.items()):
+            if obj is None and not kind.keys_only:
+                del FileStorage.__indexes[kind]
+            else:
+                index.add(key, obj)
+
+    def __index_drop(self, key):
+        """Remove key from the indexes."""
+        if FileStorage.__indexed is not FileStorage.__objects:
+            return
+        for index in FileStorage.__indexes.values():
+            index.discard(key)
+
+    def __hydrate(self, key):
+        """Build the object under key from its cached JSON text.
+
+        The object is also stored in __objects, so the copies handed out
+        by all(cls) share the same instance.
+        """
+        objects = FileStorage.__objects
+        if (type(objects) is LazyObjects and key in objects and
+                objects.is_loaded(key)):
+            return objects[key]
+        obj = self.__build(json.loads(FileStorage.__cache[key]))
+        if key in objects:
+            dict.__setitem__(objects, key, obj)
+        return obj
+
+    @staticmethod
+    def __build(odict):
+        """Return a new instance from its dictionary representation."""
+        return registry[odict["__class__"]].from_dict(odict)
+
+    def __encode(self, key):
+        """Return the JSON text of the object under key.
+
+        The cached text is reused unless the key is dirty or its object
+        holds a list or dict, which may have been changed in place.
+        """
+        objects = FileStorage.__objects
+        text = FileStorage.__cache.get(key)
+        if text is not None and key not in FileStorage.__dirty:
+            if type(objects) is LazyObjects and not objects.is_loaded(key):
+                return text
+            if not any(type(value) in (list, dict)
+                       for value in vars(objects[key]).values()):
+                return text
+        text = json.dumps(objects[key].to_dict())
+        FileStorage.__cache[key] = text
+        return text
+
+    def __write_snapshot(self):
+        """Rewrite __file_path from __objects and drop the journal."""
+        self.__wait_compaction()
+        with open(FileStorage.__file_path, "w") as f:
+            f.write("{")
+            sep = ""
+            for key in FileStorage.__objects.keys():
+                f.write("{}{}: {}".format(sep, json.dumps(key),
+                                          self.__encode(key)))
+                sep = ", "
+            f.write("}")
+        for path in (self.__journal_path(), self.__journal_path() + ".old"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __append_journal(self):
+        """Append one record per dirty key to the journal.
+
+        A record is a one-key JSON object mapping the key to its
+        dictionary representation, or to null once it was deleted.
+        """
+        self.__mend(self.__journal_path())
+        with open(self.__journal_path(), "a") as f:
+            for key in FileStorage.__dirty:
+                if key in FileStorage.__objects:
+                    text = self.__encode(key)
+                else:
+                    text = "null"
+                f.write("{{{}: {}}}\n".format(json.dumps(key), text))
@@ -0,0 +1,701 @@
+#!/usr/bin/python3
+"""Defines the secondary indexes FileStorage keeps over its objects.
+
+An index is built from the objects of its class the first time it is
+asked for, then kept up to date by FileStorage as objects are created,
+changed and deleted. Every index has a cls attribute naming the class
+it covers, a tuple of them, or None for all of them, a keys_only
+attribute telling if it can be kept from the keys alone, without
+building the objects, and add(), discard() methods.
+"""
+import re
+from array import array
+from heapq import nlargest
+from math import (asin, cos, floor, isfinite, isnan, log, nan, radians,
+                  sin, sqrt)
+
+EARTH_RADIUS = 6371.0088
+"""float: The mean radius of the Earth, in kilometres."""
+
+
+def tokenize(text):
+    """Return the lowercase words of text, in order."""
+    return re.findall(r"\w+", text.lower())
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance in km between two points.
+
+    Args:
+        lat1, lon1 (float): The first point, in degrees.
+        lat2, lon2 (float): The second point, in degrees.
+    """
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    h = (sin((lat2 - lat1) / 2) ** 2 +
+         cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(h)))
+
+
+def around(latitude, longitude, km):
+    """Return the boxes holding every point within km of a point.
+
+    The boxes are (south, west, north, east) tuples in degrees; there
+    are two when the circle crosses the 180th meridian. The latitude is
+    clamped to [-90, 90] and the longitude brought into [-180, 180).
+    """
+    latitude = min(max(latitude, -90.0), 90.0)
+    longitude = (longitude + 180.0) % 360.0 - 180.0
+    dlat = km / radians(EARTH_RADIUS)
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if south == -90.0 or north == 90.0:
+        return [(south, -180.0, north, 180.0)]
+    dlon = dlat / cos(radians(max(abs(south), abs(north))))
+    if dlon >= 180.0:
+        return [(south, -180.0, north, 180.0)]
+    west, east = longitude - dlon, longitude + dlon
+    if west < -180.0:
+        return [(south, west + 360.0, north, 180.0),
+                (south, -180.0, north, east)]
+    if east > 180.0:
+        return [(south, west, north, 180.0),
+                (south, -180.0, north, east - 360.0)]
+    return [(south, west, north, east)]
+
+
+class ClassIndex:
+    """Keep the keys of every class, so counting or listing one does not
+    touch the objects of the others.
+
+    The keys of a class are kept in the order they were added, as dict
+    keys, which is the order of __objects.
+    """
+    cls = None
+    keys_only = True
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.__keys = {}
+
+    def add(self, key, obj=None):
+        """Add key to the keys of its class.
+
+        Args:
+            key (str): The <class name>.<id> key of the object.
+            obj (BaseModel): Unused; the class is read from key.
+        """
+        cls_name = key.partition(".")[0]
+        keys = self.__keys.get(cls_name)
+        if keys is None:
+            keys = self.__keys[cls_name] = {}
+        keys[key] = None
+
+    def discard(self, key):
+        """Remove key from the keys of its class, if it is there."""
+        keys = self.__keys.get(key.partition(".")[0])
+        if keys is not None:
+            keys.pop(key, None)
+
+    def count(self, cls_name=None):
+        """Return the number of keys, or of keys of one class."""
+        if cls_name is None:
+            return sum(len(keys) for keys in self.__keys.values())
+        return len(self.__keys.get(cls_name, ()))
+
+    def keys(self, cls_name):
+        """Return the keys of the class cls_name, in the order added.
+
+        The view is live and must not be iterated while keys change.
+        """
+        return self.__keys.get(cls_name, {}).keys()
+
+
+class ForeignKeyIndex:
+    """Keep the keys of the objects referencing each id, per field.
+
+    Only string values of the fields listed in fields are indexed.
+
+    Attributes:
+        fields (dict): The foreign-key fields of every class.
+    """
+    fields = {"City": ("state_id",),
+              "Place": ("city_id", "user_id"),
+              "Review": ("place_id", "user_id")}
+    cls = tuple(fields)
+    keys_only = False
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.__keys = {(cls_name, name): {}
+                       for cls_name, names in self.fields.items()
+                       for name in names}
+        self.__values = {}
+
+    def add(self, key, obj):
+        """Index the foreign keys of obj under key, moving changed ones.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it has foreign
+                keys.
+        """
+        cls_name = type(obj).__name__
+        fields = self.fields.get(cls_name)
+        if fields is None:
+            return
+        values = tuple([getattr(obj, name, None) for name in fields])
+        old = self.__values.get(key)
+        if values == old:
+            return
+        if old is not None:
+            self.discard(key)
+        self.__values[key] = values
+        for name, value in zip(fields, values):
+            if type(value) is not str:
+                continue
+            groups = self.__keys[(cls_name, name)]
+            keys = groups.get(value)
+            if keys is None:
+                keys = groups[value] = {}
+            keys[key] = None
+
+    def discard(self, key):
+        """Remove key from the index, if it is there."""
+        values = self.__values.pop(key, None)
+        if values is None:
+            return
+        cls_name = key.partition(".")[0]
+        for name, value in zip(self.fields[cls_name], values):
+            if type(value) is not str:
+                continue
+            groups = self.__keys[(cls_name, name)]
+            keys = groups.get(value)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del groups[value]
+
+    def keys(self, cls_name, name, value):
+        """Return the keys of the cls_name objects whose name is value.
+
+        The view is live and must not be iterated while keys change.
+        """
+        return self.__keys.get((cls_name, name), {}).get(value, {}).keys()
+
+    def groups(self, cls_name, name):
+        """Return the keys of the cls_name objects by value of name.
+
+        Returns:
+            dict: The live keys view of every value, as from keys().
+        """
+        return {value: keys.keys() for value, keys in
+                self.__keys.get((cls_name, name), {}).items()}
+
+
+class UniqueIndex:
+    """Keep the keys of the objects holding each value of a unique field.
+
+    Values are compared lowercased and only non-empty strings are
+    indexed. The index itself does not refuse duplicates, which FileStorage
+    checks before an object takes a value: when it is built from objects
+    that already share a value, the first one added holds it, and the
+    others take over in turn as it lets go.
+
+    Attributes:
+        fields (dict): The unique fields of every class.
+    """
+    fields = {"User": ("email",)}
+    cls = tuple(fields)
+    keys_only = False
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.__keys = {}
+        self.__values = {}
+        self.__shared = {}
+
+    @staticmethod
+    def normalize(value):
+        """Return value as it is compared, or None if it is not indexed."""
+        if type(value) is not str or not value:
+            return None
+        return value.lower()
+
+    def add(self, key, obj):
+        """Index the unique fields of obj under key, moving changed ones.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it has unique
+                fields.
+        """
+        cls_name = type(obj).__name__
+        fields = self.fields.get(cls_name)
+        if fields is None:
+            return
+        values = tuple([self.normalize(getattr(obj, name, None))
+                        for name in fields])
+        if values == self.__values.get(key):
+            return
+        self.discard(key)
+        self.__values[key] = values
+        for name, value in zip(fields, values):
+            if value is None:
+                continue
+            keys = self.__keys.get((cls_name, name, value))
+            if keys is None:
+                keys = self.__keys[(cls_name, name, value)] = {}
+            keys[key] = None
+            if len(keys) == 2:
+                self.__shared[(cls_name, name)] = self.__shared.get(
+                    (cls_name, name), 0) + 1
+
+    def discard(self, key):
+        """Remove key from the index, if it is there."""
+        values = self.__values.pop(key, None)
+        if values is None:
+            return
+        cls_name = key.partition(".")[0]
+        for name, value in zip(self.fields[cls_name], values):
+            keys = self.__keys.get((cls_name, name, value))
+            if keys is None or key not in keys:
+                continue
+            del keys[key]
+            if len(keys) == 1:
+                self.__shared[(cls_name, name)] -= 1
+            elif not keys:
+                del self.__keys[(cls_name, name, value)]
+
+    def key(self, cls_name, name, value):
+        """Return the key of the cls_name object whose name is value, in
+        any case, or None."""
+        keys = self.__keys.get((cls_name, name, self.normalize(value)))
+        return None if keys is None else next(iter(keys))
+
+    def shared(self, cls_name, name):
+        """Return True if objects of cls_name share a value of name."""
+        return self.__shared.get((cls_name, name), 0) > 0
+
+
+class AmenityIndex:
+    """Keep the keys of the Places having each Amenity id.
+
+    Only string ids of list or tuple amenity_ids are indexed. A list
+    changed in place is only seen once the Place is marked dirty.
+    """
+    cls = "Place"
+    keys_only = False
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.__places = {}
+        self.__amenities = {}
+
+    def add(self, key, obj):
+        """Index the amenity_ids of obj under key, moving changed ones.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it is a Place.
+        """
+        if type(obj).__name__ != self.cls:
+            return
+        ids = getattr(obj, "amenity_ids", ())
+        if type(ids) not in (list, tuple):
+            ids = ()
+        ids = tuple([i for i in ids if type(i) is str])
+        old = self.__amenities.get(key)
+        if ids == old:
+            return
+        if old is not None:
+            self.discard(key)
+        self.__amenities[key] = ids
+        for amenity_id in ids:
+            places = self.__places.get(amenity_id)
+            if places is None:
+                places = self.__places[amenity_id] = {}
+            places[key] = None
+
+    def discard(self, key):
+        """Remove key from the index, if it is there."""
+        for amenity_id in self.__amenities.pop(key, ()):
+            places = self.__places.get(amenity_id)
+            if places is not None:
+                places.pop(key, None)
+                if not places:
+                    del self.__places[amenity_id]
+
+    def keys(self, *amenity_ids):
+        """Return the keys of the Places having every one of amenity_ids.
+
+        The keys come in the order the Places having the rarest of the
+        amenities were added.
+        """
+        found = sorted((self.__places.get(i, {}) for i in amenity_ids),
+                       key=len)
+        if not found:
+            return []
+        return [key for key in found[0]
+                if all(key in places for places in found[1:])]
+
+
+class PlaceGrid:
+    """Keep the keys of the Places in a grid of latitude, longitude cells.
+
+    A box query only reads the cells it overlaps, and a radius query the
+    cells of the box around its circle. Places whose latitude or
+    longitude is not a finite number, or out of range, are left out.
+
+    Attributes:
+        size (float): The side of a cell, in degrees.
+    """
+    cls = "Place"
+    keys_only = False
+    size = 1.0
+
+    def __init__(self):
+        """Initialize an empty grid."""
+        self.__cells = {}
+        self.__points = {}
+
+    def __len__(self):
+        """Return the number of Places in the grid."""
+        return len(self.__points)
+
+    def add(self, key, obj):
+        """Put obj in the cell of its location, moving it if it changed.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it is a Place.
+        """
+        if type(obj).__name__ != self.cls:
+            return
+        lat = getattr(obj, "latitude", None)
+        lon = getattr(obj, "longitude", None)
+        old = self.__points.get(key)
+        if (type(lat) not in (int, float) or type(lon) not in (int, float) or
+                not -90.0 <= lat <= 90.0 or not -180.0 <= lon <= 180.0):
+            if old is not None:
+                self.discard(key)
+            return
+        if old is not None:
+            if old[0] == lat and old[1] == lon:
+                return
+            self.discard(key)
+        cell = (floor(lat / self.size), floor(lon / self.size))
+        self.__points[key] = (lat, lon, cell)
+        keys = self.__cells.get(cell)
+        if keys is None:
+            keys = self.__cells[cell] = {}
+        keys[key] = None
+
+    def discard(self, key):
+        """Remove key from the grid, if it is there."""
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        keys = self.__cells[point[2]]
+        del keys[key]
+        if not keys:
+            del self.__cells[point[2]]
+
+    def within(self, south, west, north, east):
+        """Return the keys of the Places inside a box, edges included.
+
+        A box whose west edge is east of its east edge crosses the 180th
+        meridian. The box is clamped to the globe, so only the cells of
+        its part on it are read; a box with an edge that is not a number
+        holds nothing.
+
+        Args:
+            south, west, north, east (float): The edges, in degrees.
+        """
+        if west > east:
+            return (self.within(south, west, north, 180.0) +
+                    self.within(south, -180.0, north, east))
+        south, north = max(south, -90.0), min(north, 90.0)
+        west, east = max(west, -180.0), min(east, 180.0)
+        if not (south <= north and west <= east):
+            return []
+        found = []
+        points = self.__points
+        cells = self.__cells
+        size = self.size
+        for i in range(floor(south / size), floor(north / size) + 1):
+            for j in range(floor(west / size), floor(east / size) + 1):
+                for key in cells.get((i, j), ()):
+                    lat, lon, _ = points[key]
+                    if south <= lat <= north and west <= lon <= east:
+                        found.append(key)
+        return found
+
+    def near(self, latitude, longitude, km):
+        """Return the keys of the Places within km of a point, nearest
+        first.
+
+        Args:
+            latitude, longitude (float): The point, in degrees; a point
+                that is not finite has no Places near it.
+            km (float): The radius, in kilometres.
+        """
+        if not (isfinite(latitude) and isfinite(longitude)):
+            return []
+        found = []
+        points = self.__points
+        for box in around(latitude, longitude, km):
+            for key in self.within(*box):
+                lat, lon, _ = points[key]
+                d = distance(latitude, longitude, lat, lon)
+                if d <= km:
+                    found.append((d, key))
+        found.sort()
+        return [key for _, key in found]
+
+
+class TextIndex:
+    """Keep an inverted index of the words of the free-text fields.
+
+    Each word of a class has a posting list mapping the keys of the
+    objects using it to the number of times they do. Searches return
+    the objects having every word, best first by the Okapi BM25 score.
+
+    Attributes:
+        fields (dict): The free-text fields of every class.
+        k1 (float): How fast repeating a word stops raising the score.
+        b (float): How much long texts are penalized.
+    """
+    fields = {"Place": ("name", "description"), "Review": ("text",)}
+    cls = tuple(fields)
+    keys_only = False
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.__postings = {}
+        self.__words = {}
+        self.__lengths = {}
+        self.__sizes = {}
+
+    def add(self, key, obj):
+        """Index the text of obj under key, replacing what it had.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it has text
+                fields.
+        """
+        cls_name = type(obj).__name__
+        fields = self.fields.get(cls_name)
+        if fields is None:
+            return
+        words = {}
+        for name in fields:
+            text = getattr(obj, name, None)
+            if type(text) is str:
+                for word in tokenize(text):
+                    words[word] = words.get(word, 0) + 1
+        if words == self.__words.get(key):
+            return
+        self.discard(key)
+        self.__words[key] = words
+        length = self.__lengths[key] = sum(words.values())
+        size = self.__sizes.setdefault(cls_name, [0, 0])
+        size[0] += 1
+        size[1] += length
+        for word, n in words.items():
+            postings = self.__postings.get((cls_name, word))
+            if postings is None:
+                postings = self.__postings[(cls_name, word)] = {}
+            postings[key] = n
+
+    def discard(self, key):
+        """Remove key from the index, if it is there."""
+        words = self.__words.pop(key, None)
+        if words is None:
+            return
+        cls_name = key.partition(".")[0]
+        size = self.__sizes[cls_name]
+        size[0] -= 1
+        size[1] -= self.__lengths.pop(key)
+        for word in words:
+            postings = self.__postings[(cls_name, word)]
+            del postings[key]
+            if not postings:
+                del self.__postings[(cls_name, word)]
+
+    def search(self, cls_name, text, limit=None):
+        """Return the keys of the cls_name objects having every word of
+        text, best match first.
+
+        Equal scores keep the order the objects were indexed in.
+
+        Args:
+            cls_name (str): The class of the objects.
+            text (str): The words to look for, in any case.
+            limit (int): Only return this many keys, the best ones.
+        """
+        words = set(tokenize(text))
+        if not words:
+            return []
+        found = sorted((self.__postings.get((cls_name, word), {})
+                        for word in words), key=len)
+        if not found[0]:
+            return []
+        docs, total = self.__sizes[cls_name]
+        # The BM25 length norm of a text is base + slope * its length.
+        base = self.k1 * (1 - self.b)
+        slope = self.k1 * self.b * docs / total
+        boost = self.k1 + 1
+        lengths = self.__lengths
+        idfs = [log(1 + (docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for postings in found]
+        scores = {}
+        for key, n in found[0].items():
+            norm = base + slope * lengths[key]
+            score = idfs[0] * n * boost / (n + norm)
+            for postings, idf in zip(found[1:], idfs[1:]):
+                n = postings.get(key)
+                if n is None:
+                    break
+                score += idf * n * boost / (n + norm)
+            else:
+                scores[key] = score
+        if limit is not None:
+            return nlargest(limit, scores, key=scores.__getitem__)
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+class PlaceColumns:
+    """Keep the numeric fields of every Place in contiguous arrays.
+
+    Each Place has a row holding its fields as doubles, so that range
+    filters and aggregates loop over one array of machine floats instead
+    of reading attributes object by object. Deleting a Place moves the
+    last row into its place, so the columns never have holes. A value
+    that is not a number is stored as NaN, which matches no range and is
+    left out of aggregates.
+
+    Attributes:
+        fields (tuple): The names of the columns.
+    """
+    cls = "Place"
+    keys_only = False
+    fields = ("number_rooms", "number_bathrooms", "max_guest",
+              "price_by_night", "latitude", "longitude")
+
+    def __init__(self):
+        """Initialize empty columns."""
+        self.__rows = {}
+        self.__keys = []
+        self.__columns = {name: array("d") for name in self.fields}
+        self.__nans = dict.fromkeys(self.fields, 0)
+
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self.__keys)
+
+    def add(self, key, obj):
+        """Store the fields of obj in the row of key, adding it if new.
+
+        Args:
+            key (str): The <class name>.<id> key of obj.
+            obj (BaseModel): The object; ignored unless it is a Place.
+        """
+        if type(obj).__name__ != self.cls:
+            return
+        row = self.__rows.get(key)
+        if row is None:
+            row = self.__rows[key] = len(self.__keys)
+            self.__keys.append(key)
+            for column in self.__columns.values():
+                column.append(0.0)
+        for name, column in self.__columns.items():
+            value = getattr(obj, name, nan)
+            if type(value) not in (int, float):
+                value = nan
+            old = column[row]
+            column[row] = value
+            self.__nans[name] += (value != value) - (old != old)
+
+    def discard(self, key):
+        """Drop the row of key, if any."""
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = self.__keys.pop()
+        for name, column in self.__columns.items():
+            if isnan(column[row]):
+                self.__nans[name] -= 1
+            value = column.pop()
+            if last != key:
+                column[row] = value
+        if last != key:
+            self.__keys[row] = last
+            self.__rows[last] = row
+
+    def column(self, name):
+        """Return the array of the column name, in row order.
+
+        The array is the live column and must not be changed.
+        """
+        return self.__columns[name]
+
+    def keys(self):
+        """Return the keys of the rows, in row order."""
+        return list(self.__keys)
+
+    def select(self, **ranges):
+        """Return the keys of the Places with every field in its range.
+
+        Args:
+            **ranges: A (low, high) pair per field name. Either bound
+                may be None; both are inclusive.
+
+        Raises:
+            KeyError: If a field has no column.
+        """
+        rows = None
+        for name, (low, high) in ranges.items():
+            column = self.__columns[name]
+            low = -float("inf") if low is None else low
+            high = float("inf") if high is None else high
+            if rows is None:
+                rows = [row for row, value in enumerate(column)
+                        if low <= value <= high]
+            else:
+                rows = [row for row in rows if low <= column[row] <= high]
+        if rows is None:
+            return list(self.__keys)
+        keys = self.__keys
+        return [keys[row] for row in rows]
+
+    def values(self, name, keys):
+        """Return the values of the column name in the rows of keys,
+        leaving NaN values out."""
+        column = self.__columns[name]
+        rows = self.__rows
+        values = [column[rows[key]] for key in keys]
+        return [value for value in values if value == value]
+
+    def stats(self, name, keys=None):
+        """Return the count, sum, min, max and mean of the column name.
+
+        NaN values are left out; min, max and mean are None when no
+        value is left.
+
+        Args:
+            name (str): The column.
+            keys (iterable): Only use the rows of these keys.
+        """
+        column = self.__columns[name]
+        if keys is not None:
+            column = self.values(name, keys)
+        elif self.__nans[name]:
+            column = [value for value in column if value == value]
+        count = len(column)
+        total = sum(column, 0.0)
+        return {"count": count, "sum": total,
+                "min": min(column) if count else None,
+                "max": max(column) if count else None,
+                "mean": total / count if count else None}
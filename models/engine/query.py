@@ -0,0 +1,339 @@
+#!/usr/bin/python3
+"""Defines the Query class, filtering, sorting and projecting objects.
+
+A query is written like the arguments of a Python call, for example
+    city_id == "x", price_by_night < 100, number_rooms >= 3,
+    order_by=price_by_night, limit=20
+It is parsed with ast, never evaluated: conditions compare an attribute
+with a literal, and are all required.
+"""
+import ast
+import operator
+from heapq import nlargest, nsmallest
+from itertools import islice
+from models.engine.indexes import ForeignKeyIndex, PlaceColumns, UniqueIndex
+
+OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt,
+             "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+             "in": lambda a, b: a in b, "not in": lambda a, b: a not in b,
+             "has": lambda a, b: b in a, "lacks": lambda a, b: b not in a}
+"""dict: The function of every condition operator, by name."""
+
+_names = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=",
+          ast.Gt: ">", ast.GtE: ">=", ast.In: "in", ast.NotIn: "not in"}
+# The operator of a condition written with the literal on the left.
+_flipped = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<",
+            ">=": "<=", "in": "has", "not in": "lacks"}
+
+
+class Query:
+    """Represent a query over the objects of one class.
+
+    Attributes:
+        cls_name (str): The class of the objects.
+        conditions (list): The (attribute, operator, value) conditions.
+        order (list): The (attribute, descending) sort keys.
+        limit (int): The number of results to keep, or None for all.
+        offset (int): The number of results to skip first.
+        fields (tuple): The attributes to keep, or None for the objects.
+    """
+
+    def __init__(self, cls_name, conditions=(), order=(), limit=None,
+                 offset=0, fields=None):
+        """Initialize a new Query.
+
+        Raises:
+            ValueError: If an operator is unknown or limit or offset is
+                not a non-negative integer.
+        """
+        for name, op, value in conditions:
+            if op not in OPERATORS:
+                raise ValueError("unknown operator {}".format(op))
+        for name, value in (("limit", limit), ("offset", offset)):
+            if value is not None and (type(value) is not int or value < 0):
+                raise ValueError("{} needs a non-negative integer".format(
+                    name))
+        self.cls_name = cls_name
+        self.conditions = list(conditions)
+        self.order = list(order)
+        self.limit = limit
+        self.offset = offset
+        self.fields = None if fields is None else tuple(fields)
+
+    @classmethod
+    def parse(cls, cls_name, text):
+        """Return the Query of cls_name written in text.
+
+        Conditions are comparisons of an attribute with a literal, such
+        as price_by_night < 100, 1 <= max_guest <= 4, city_id in ("a",
+        "b") or "wifi" in amenity_ids, joined by commas or and. The
+        keywords order_by, limit, offset and fields set the rest: order_by
+        takes an attribute or a tuple of them, - in front sorting it
+        descending, and fields a tuple of attributes.
+
+        Raises:
+            ValueError: If text is not a query.
+        """
+        try:
+            call = ast.parse("query({})".format(text), mode="eval").body
+        except SyntaxError:
+            raise ValueError("bad query {}".format(text)) from None
+        if type(call) is not ast.Call or type(call.func) is not ast.Name:
+            raise ValueError("bad query {}".format(text))
+        conditions = []
+        for node in call.args:
+            conditions.extend(_conditions(node))
+        options = {}
+        for keyword in call.keywords:
+            if keyword.arg == "order_by":
+                options["order"] = [_sort_key(node)
+                                    for node in _items(keyword.value)]
+            elif keyword.arg == "fields":
+                options["fields"] = [_name(node)
+                                     for node in _items(keyword.value)]
+            elif keyword.arg in ("limit", "offset"):
+                options[keyword.arg] = _literal(keyword.value)
+            else:
+                raise ValueError("unknown keyword {}".format(keyword.arg))
+        return cls(cls_name, conditions, **options)
+
+    def matches(self, obj):
+        """Return True if obj meets every condition.
+
+        A condition that cannot be compared, like a string with a
+        number, is not met.
+        """
+        for name, op, value in self.conditions:
+            try:
+                if not OPERATORS[op](getattr(obj, name, None), value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def plan(self, storage):
+        """Return how to read the candidates and the candidates.
+
+        The first index storage has that applies is used: lookup() for
+        an equality on a unique field, unless the value is not indexed,
+        like "", or objects share values of the field, then find() for
+        equalities on foreign keys and amenities, then the columns of
+        Place for ranges on numeric fields. Otherwise every object of the
+        class is read. The candidates still have to be checked against
+        every condition.
+
+        Returns:
+            tuple: A description of the plan and an iterable of objects.
+        """
+        cls_name = self.cls_name
+        equal = {}
+        for name, op, value in self.conditions:
+            if op == "==" and type(value) is str:
+                equal.setdefault(name, value)
+        for name in UniqueIndex.fields.get(cls_name, ()):
+            if (name in equal and
+                    UniqueIndex.normalize(equal[name]) is not None and
+                    hasattr(storage, "lookup") and
+                    hasattr(storage, "has_duplicates") and
+                    not storage.has_duplicates(cls_name, name)):
+                obj = storage.lookup(cls_name, name, equal[name])
+                return ("lookup {}.{}".format(cls_name, name),
+                        [] if obj is None else [obj])
+        fields = {name: equal[name] for name in
+                  ForeignKeyIndex.fields.get(cls_name, ()) if name in equal}
+        if cls_name == "Place":
+            amenity_ids = [value for name, op, value in self.conditions
+                           if name == "amenity_ids" and op == "has" and
+                           type(value) is str]
+            if amenity_ids:
+                fields["amenity_ids"] = amenity_ids
+        if fields and hasattr(storage, "find"):
+            return ("find {} by {}".format(cls_name, ", ".join(fields)),
+                    storage.find(cls_name, **fields).values())
+        ranges = self.__ranges()
+        if ranges and hasattr(storage, "place_columns"):
+            keys = storage.place_columns().select(**ranges)
+            return ("columns of Place for {}".format(", ".join(ranges)),
+                    [storage.get("Place", key[6:]) for key in keys])
+        return "scan {}".format(cls_name), storage.all(cls_name).values()
+
+    def run(self, storage):
+        """Return the results of the query in storage.
+
+        Returns:
+            list: The objects, or the dictionaries of their fields.
+
+        Raises:
+            ValueError: If the results cannot be sorted, their sort keys
+                having types that do not compare.
+        """
+        found = (obj for obj in self.plan(storage)[1] if self.matches(obj))
+        stop = None if self.limit is None else self.offset + self.limit
+        # Without sort keys, reading stops at the last result kept.
+        found = list(islice(found, None if self.order else stop))
+        try:
+            if len(self.order) == 1 and stop is not None:
+                name, descending = self.order[0]
+                pick = nlargest if descending else nsmallest
+                found = pick(stop, found,
+                             key=lambda obj: getattr(obj, name, None))
+            else:
+                # Sorting is stable, so sorting by the last key first
+                # leaves the results in the order of all of them.
+                for name, descending in reversed(self.order):
+                    found.sort(key=lambda obj: getattr(obj, name, None),
+                               reverse=descending)
+        except TypeError:
+            raise ValueError("cannot sort by {}".format(", ".join(
+                name for name, _ in self.order))) from None
+        found = found[self.offset:stop]
+        if self.fields is None:
+            return found
+        return [{name: getattr(obj, name, None) for name in self.fields}
+                for obj in found]
+
+    def __ranges(self):
+        """Return the (low, high) range of every Place column the
+        conditions bound, to select candidates with."""
+        if self.cls_name != "Place":
+            return {}
+        ranges = {}
+        for name, op, value in self.conditions:
+            if (name not in PlaceColumns.fields or
+                    type(value) not in (int, float) or
+                    op not in ("==", "<", "<=", ">", ">=")):
+                continue
+            low, high = ranges.get(name, (None, None))
+            if op in ("==", ">", ">="):
+                low = value if low is None else max(low, value)
+            if op in ("==", "<", "<="):
+                high = value if high is None else min(high, value)
+            ranges[name] = (low, high)
+        return ranges
+
+
+FUNCTIONS = ("count", "sum", "avg", "min", "max")
+"""tuple: The aggregate functions."""
+
+
+def aggregate(objects, function, field=None, by=None):
+    """Return function of field over objects, in one pass.
+
+    count counts the objects and takes no field. sum, avg, min and max
+    only take the numbers of field into account, as floats; with none,
+    sum is 0.0 and the others None.
+
+    Args:
+        objects (iterable): The objects.
+        function (str): One of FUNCTIONS.
+        field (str): The attribute to aggregate.
+        by (str): The attribute to group the objects by, if any.
+
+    Returns:
+        The result, or a dictionary of the result of every value of by,
+        in the order the values are first met.
+
+    Raises:
+        ValueError: If function is unknown, field is missing or given to
+            count, or a value of by cannot be a dictionary key.
+    """
+    check_aggregate(function, field)
+    groups = {}
+    for obj in objects:
+        group = getattr(obj, by, None) if by is not None else None
+        try:
+            acc = groups.get(group)
+        except TypeError:
+            raise ValueError("cannot group by {}".format(by)) from None
+        if acc is None:
+            # The count of objects, then of numbers, their sum, min, max.
+            acc = groups[group] = [0, 0, 0.0, None, None]
+        acc[0] += 1
+        if field is None:
+            continue
+        value = getattr(obj, field, None)
+        if type(value) not in (int, float) or value != value:
+            continue
+        value = float(value)
+        acc[1] += 1
+        acc[2] += value
+        if acc[3] is None or value < acc[3]:
+            acc[3] = value
+        if acc[4] is None or value > acc[4]:
+            acc[4] = value
+    results = {group: _result(function, *acc) for group, acc in groups.items()}
+    if by is not None:
+        return results
+    return results.get(None, _result(function, 0, 0, 0.0, None, None))
+
+
+def check_aggregate(function, field):
+    """Raise ValueError if function of field is not an aggregate."""
+    if function not in FUNCTIONS:
+        raise ValueError("unknown function {}".format(function))
+    if function == "count" and field is not None:
+        raise ValueError("count takes no field")
+    if function != "count" and field is None:
+        raise ValueError("{} needs a field".format(function))
+
+
+def _result(function, n, count, total, low, high):
+    """Return the result of function from its accumulators."""
+    if function == "count":
+        return n
+    if function == "sum":
+        return total
+    if function == "avg":
+        return total / count if count else None
+    return low if function == "min" else high
+
+
+def _conditions(node):
+    """Return the conditions of a comparison, or of an and of them."""
+    if type(node) is ast.BoolOp and type(node.op) is ast.And:
+        return [c for value in node.values for c in _conditions(value)]
+    if type(node) is not ast.Compare:
+        raise ValueError("bad condition {}".format(ast.unparse(node)))
+    conditions = []
+    operands = [node.left] + node.comparators
+    for left, op, right in zip(operands, node.ops, operands[1:]):
+        op = _names.get(type(op))
+        if op is None:
+            raise ValueError("bad condition {}".format(ast.unparse(node)))
+        if type(left) is ast.Name:
+            conditions.append((left.id, op, _literal(right)))
+        elif type(right) is ast.Name:
+            conditions.append((right.id, _flipped[op], _literal(left)))
+        else:
+            raise ValueError("bad condition {}".format(ast.unparse(node)))
+    return conditions
+
+
+def _items(node):
+    """Return the elements of a tuple or list node, or the node alone."""
+    if type(node) in (ast.Tuple, ast.List):
+        return node.elts
+    return [node]
+
+
+def _name(node):
+    """Return the attribute name of a node."""
+    if type(node) is not ast.Name:
+        raise ValueError("bad attribute {}".format(ast.unparse(node)))
+    return node.id
+
+
+def _sort_key(node):
+    """Return the (attribute, descending) sort key of a node."""
+    if type(node) is ast.UnaryOp and type(node.op) is ast.USub:
+        return _name(node.operand), True
+    return _name(node), False
+
+
+def _literal(node):
+    """Return the value of a literal node."""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError):
+        # TypeError comes from unhashable keys or elements, like {[1]: 2}.
+        raise ValueError("bad value {}".format(ast.unparse(node))) from None
@@ -0,0 +1,577 @@
+#!/usr/bin/python3
+"""Defines the SQLiteStorage class."""
+import json
+import sqlite3
+from math import isfinite
+from models.base_model import BaseModel, registry
+from models.engine.indexes import ForeignKeyIndex, TextIndex, UniqueIndex
+from models.engine.indexes import around
+from models.engine.indexes import distance, tokenize
+from models.engine.query import aggregate, check_aggregate
+from models.user import User
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
+
+
+class SQLiteStorage:
+    """Represent a storage engine backed by a SQLite database.
+
+    Every class has its own table of (id, data) rows, data being the JSON
+    text of the object's dictionary representation. Objects are loaded
+    into an identity map on demand: get() reads one row through the
+    primary key and all(cls) one table. The foreign keys listed in
+    ForeignKeyIndex.fields have expression indexes, which find() uses,
+    and so have the Place latitude, for within() and near(), and the
+    lowercased UniqueIndex.fields, for lookup().
+
+    Attributes:
+        __classes (tuple): The classes stored, one table each.
+    """
+    __classes = (BaseModel, User, State, City, Place, Amenity, Review)
+
+    def __init__(self, path="hbnb.db"):
+        """Initialize a new SQLiteStorage.
+
+        Args:
+            path (str): The path of the SQLite database file.
+        """
+        self.__path = path
+        self.__conn = None
+        self.__objects = {}
+        self.__dirty = set()
+        self.__loaded = set()
+
+    def all(self, cls=None):
+        """Return the dictionary of objects, or the objects of one class.
+
+        Args:
+            cls (type or str): Only return the objects of this class.
+        """
+        if cls is None:
+            for c in SQLiteStorage.__classes:
+                self.__load_table(c.__name__)
+            return self.__objects
+        cls_name = cls if type(cls) is str else cls.__name__
+        self.__load_table(cls_name)
+        prefix = cls_name + "."
+        return {key: obj for key, obj in self.__objects.items()
+                if key.startswith(prefix)}
+
+    def get(self, cls, id):
+        """Return the object of class cls with the given id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        key = "{}.{}".format(cls_name, id)
+        if key in self.__objects or cls_name in self.__loaded:
+            return self.__objects.get(key)
+        table = self.__table(cls_name)
+        if key in self.__dirty or table is None:
+            return None
+        row = self.__connect().execute(
+            "SELECT data FROM {} WHERE id = ?".format(table),
+            (id,)).fetchone()
+        if row is None:
+            return None
+        obj = self.__build(row[0])
+        self.__objects[key] = obj
+        return obj
+
+    def get_many(self, cls, ids):
+        """Return the objects of class cls with the given ids, reading
+        the ones not in memory with one query.
+
+        Args:
+            cls (type or str): The class of the objects.
+            ids (iterable): The ids of the objects.
+
+        Returns:
+            list: The objects found, once each, in the order of ids.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        keys = {"{}.{}".format(cls_name, id): id for id in ids}
+        table = self.__table(cls_name)
+        if table is not None and cls_name not in self.__loaded:
+            missing = [id for key, id in keys.items()
+                       if key not in self.__objects and
+                       key not in self.__dirty]
+            if missing:
+                rows = self.__connect().execute(
+                    "SELECT id, data FROM {} WHERE id IN ({})".format(
+                        table, ", ".join("?" * len(missing))), missing)
+                for oid, data in rows:
+                    key = "{}.{}".format(cls_name, oid)
+                    self.__objects[key] = self.__build(data)
+        found = []
+        for key in keys:
+            obj = self.__objects.get(key)
+            if obj is not None:
+                found.append(obj)
+        return found
+
+    def count(self, cls=None):
+        """Return the number of objects, or of objects of one class.
+
+        Tables not loaded yet are counted without building their rows.
+
+        Args:
+            cls (type or str): Only count the objects of this class.
+        """
+        if cls is None:
+            return sum(self.count(c) for c in SQLiteStorage.__classes)
+        cls_name = cls if type(cls) is str else cls.__name__
+        if cls_name in self.__loaded:
+            return len(self.all(cls_name))
+        table = self.__table(cls_name)
+        if table is None:
+            return 0
+        db = self.__connect()
+        n, = db.execute("SELECT COUNT(*) FROM {}".format(table)).fetchone()
+        prefix = cls_name + "."
+        for key in self.__dirty:
+            if key.startswith(prefix):
+                stored = db.execute(
+                    "SELECT 1 FROM {} WHERE id = ?".format(table),
+                    (key[len(prefix):],)).fetchone() is not None
+                n += (key in self.__objects) - stored
+        return n
+
+    def aggregate(self, cls, function, field=None, by=None):
+        """Return function of field over the objects of cls, in one pass.
+
+        Args:
+            cls (type or str): The class of the objects.
+            function (str): count, sum, avg, min or max.
+            field (str): The attribute to aggregate; count takes none.
+            by (str): The attribute to group the objects by, if any.
+
+        Returns:
+            The result, or a dictionary of the result of every value of
+            by. See models.engine.query.aggregate().
+
+        Raises:
+            ValueError: If the aggregate is not valid.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        check_aggregate(function, field)
+        if function == "count" and by is None:
+            return self.count(cls_name)
+        return aggregate(self.all(cls_name).values(), function, field, by)
+
+    def lookup(self, cls, name, value):
+        """Return the object of cls whose unique field name is value, in
+        any case, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            name (str): The unique field, like email for User.
+            value (str): The value to look for.
+
+        Raises:
+            ValueError: If name is not a unique field of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        if name not in UniqueIndex.fields.get(cls_name, ()):
+            raise ValueError("{}.{} is not unique".format(cls_name, name))
+        for obj in self.__holders(cls_name, name, value):
+            return obj
+        return None
+
+    def has_duplicates(self, cls, name):
+        """Return True if objects of cls share a value of the unique field
+        name, in any case, as rows written by another program can.
+
+        The values are read from the index on the field, without
+        building the objects.
+
+        Raises:
+            ValueError: If name is not a unique field of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        if name not in UniqueIndex.fields.get(cls_name, ()):
+            raise ValueError("{}.{} is not unique".format(cls_name, name))
+        values = set()
+        table = self.__table(cls_name)
+        rows = [] if table is None else self.__connect().execute(
+            "SELECT id, lower(json_extract(data, '$.{0}')) FROM {1} WHERE "
+            "json_type(data, '$.{0}') = 'text' AND lower(json_extract("
+            "data, '$.{0}')) != ''".format(name, table))
+        for oid, value in rows:
+            if "{}.{}".format(cls_name, oid) in self.__dirty:
+                continue
+            if value in values:
+                return True
+            values.add(value)
+        prefix = cls_name + "."
+        for key in self.__dirty:
+            obj = self.__objects.get(key)
+            if not key.startswith(prefix) or obj is None:
+                continue
+            value = UniqueIndex.normalize(getattr(obj, name, None))
+            if value is None:
+                continue
+            if value in values:
+                return True
+            values.add(value)
+        return False
+
+    def check_unique(self, obj, name, value):
+        """Refuse value for the field name of obj if another object has it.
+
+        Fields that are not unique, and values that are not indexed, are
+        always accepted.
+
+        Raises:
+            ValueError: If another object of the class of obj has value,
+                in any case, in its unique field name.
+        """
+        cls_name = obj.__class__.__name__
+        if (name not in UniqueIndex.fields.get(cls_name, ()) or
+                UniqueIndex.normalize(value) is None):
+            return
+        for other in self.__holders(cls_name, name, value):
+            if other.id != obj.id:
+                raise ValueError("{}.{} {} is already taken".format(
+                    cls_name, name, value))
+
+    def find(self, cls, **fields):
+        """Return the objects of cls referencing the given ids.
+
+        Places can also be found by amenities: find(Place,
+        amenity_ids=[<id>, <id>]) gives the Places having all of them.
+        A foreign key given a list of ids finds the objects referencing
+        any of them.
+
+        Args:
+            cls (type or str): The class of the objects.
+            **fields: The id, or list of ids, of each field.
+
+        Raises:
+            ValueError: If a field is not a foreign key of cls.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        for name in fields:
+            if name not in ForeignKeyIndex.fields.get(cls_name, ()) and (
+                    cls_name, name) != ("Place", "amenity_ids"):
+                raise ValueError("{}.{} is not a foreign key".format(
+                    cls_name, name))
+        amenity_ids = fields.pop("amenity_ids", ())
+        if type(amenity_ids) is str:
+            amenity_ids = (amenity_ids,)
+        for name, value in fields.items():
+            if type(value) not in (list, tuple, set, frozenset):
+                value = (value,)
+            fields[name] = tuple(value)
+        where = ["json_extract(data, '$.{}') IN ({})".format(
+            name, ", ".join("?" * len(value))) for name, value in
+            fields.items()]
+        where += ["EXISTS (SELECT 1 FROM json_each(data, '$.amenity_ids') "
+                  "WHERE value = ?)"] * len(amenity_ids)
+        if not where:
+            return self.all(cls_name)
+        if not all(fields.values()):
+            return {}
+        rows = self.__connect().execute(
+            "SELECT id, data FROM {} WHERE {}".format(
+                self.__table(cls_name), " AND ".join(where)),
+            tuple(value for values in fields.values() for value in values) +
+            tuple(amenity_ids))
+        found = {}
+        for oid, data in rows:
+            key = "{}.{}".format(cls_name, oid)
+            if key in self.__dirty:
+                continue
+            if key not in self.__objects:
+                self.__objects[key] = self.__build(data)
+            found[key] = self.__objects[key]
+        prefix = cls_name + "."
+        for key in self.__dirty:
+            obj = self.__objects.get(key)
+            if (key.startswith(prefix) and obj is not None and
+                    all(getattr(obj, name, None) in values
+                        for name, values in fields.items()) and
+                    all(i in getattr(obj, "amenity_ids", ())
+                        for i in amenity_ids)):
+                found[key] = obj
+        return found
+
+    def search(self, cls, text, limit=None):
+        """Return the objects of cls whose text has every word of text,
+        best match first.
+
+        The rows are narrowed down in SQL, then ranked by a TextIndex of
+        the matching objects only, so word rarity is measured among
+        them rather than in the whole table.
+
+        Args:
+            cls (type or str): The class of the objects.
+            text (str): The words to look for, in any case.
+            limit (int): Only return this many objects, the best ones.
+
+        Raises:
+            ValueError: If cls has no free-text fields.
+        """
+        cls_name = cls if type(cls) is str else cls.__name__
+        fields = TextIndex.fields.get(cls_name)
+        if fields is None:
+            raise ValueError("{} has no text fields".format(cls_name))
+        words = sorted(set(tokenize(text)))
+        if not words:
+            return {}
+        anywhere = " OR ".join(
+            "instr(lower(json_extract(data, '$.{}')), ?)".format(name)
+            for name in fields)
+        rows = self.__connect().execute(
+            "SELECT id, data FROM {} WHERE {}".format(
+                self.__table(cls_name),
+                " AND ".join(["({})".format(anywhere)] * len(words))),
+            tuple(word for word in words for _ in fields))
+        candidates = {}
+        for oid, data in rows:
+            key = "{}.{}".format(cls_name, oid)
+            if key in self.__dirty:
+                continue
+            if key not in self.__objects:
+                self.__objects[key] = self.__build(data)
+            candidates[key] = self.__objects[key]
+        prefix = cls_name + "."
+        for key in self.__dirty:
+            if key.startswith(prefix) and key in self.__objects:
+                candidates[key] = self.__objects[key]
+        index = TextIndex()
+        for key, obj in candidates.items():
+            index.add(key, obj)
+        return {key: candidates[key]
+                for key in index.search(cls_name, text, limit)}
+
+    def within(self, south, west, north, east):
+        """Return the Places inside a box.
+
+        Args:
+            south, west, north, east (float): The edges, in degrees; a
+                west edge east of the east edge crosses the 180th
+                meridian.
+        """
+        found = {}
+        for key, obj in self.__located(south, north):
+            lon = obj.longitude
+            if (west <= lon <= east if west <= east else
+                    lon >= west or lon <= east):
+                found[key] = obj
+        return found
+
+    def near(self, latitude, longitude, km):
+        """Return the Places within km of a point, nearest first.
+
+        Args:
+            latitude, longitude (float): The point, in degrees; a point
+                that is not finite has no Places near it.
+            km (float): The radius, in kilometres.
+        """
+        if not (isfinite(latitude) and isfinite(longitude)):
+            return {}
+        box = around(latitude, longitude, km)[0]
+        found = []
+        for key, obj in self.__located(box[0], box[2]):
+            d = distance(latitude, longitude, obj.latitude, obj.longitude)
+            if d <= km:
+                found.append((d, key, obj))
+        found.sort(key=lambda f: f[:2])
+        return {key: obj for _, key, obj in found}
+
+    def new(self, obj):
+        """Set in the objects obj with key <obj_class_name>.id
+
+        Raises:
+            ValueError: If a unique field of obj has the value of another
+                object.
+        """
+        for name in UniqueIndex.fields.get(obj.__class__.__name__, ()):
+            self.check_unique(obj, name, getattr(obj, name, None))
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        self.__objects[key] = obj
+        self.__dirty.add(key)
+
+    def mark_dirty(self, obj):
+        """Flag obj as changed so the next save writes its row.
+
+        Objects that are not in the identity map are ignored.
+        """
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if key in self.__objects:
+            self.__dirty.add(key)
+
+    def delete(self, obj=None):
+        """Delete obj so the next save removes its row."""
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        self.__objects.pop(key, None)
+        self.__dirty.add(key)
+
+    def save(self):
+        """Upsert the rows of the changed objects and delete the others.
+
+        All the changes since the last save are written in one
+        transaction.
+        """
+        if len(self.__dirty) == 0:
+            return
+        conn = self.__connect()
+        with conn:
+            for key in self.__dirty:
+                cls_name, _, oid = key.partition(".")
+                table = self.__table(cls_name)
+                if table is None:
+                    continue
+                obj = self.__objects.get(key)
+                if obj is None:
+                    conn.execute("DELETE FROM {} WHERE id = ?".format(table),
+                                 (oid,))
+                else:
+                    conn.execute("INSERT INTO {} (id, data) VALUES (?, ?) "
+                                 "ON CONFLICT(id) DO UPDATE SET "
+                                 "data = excluded.data".format(table),
+                                 (oid, json.dumps(obj.to_dict())))
+        self.__dirty.clear()
+
+    def reload(self):
+        """Open the database, creating the missing tables.
+
+        Objects are not read here but on demand, and the ones already
+        read are dropped so they are read again.
+        """
+        conn = self.__connect()
+        with conn:
+            for c in SQLiteStorage.__classes:
+                conn.execute('CREATE TABLE IF NOT EXISTS "{}" '
+                             '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+                             .format(c.__name__))
+                names = ForeignKeyIndex.fields.get(c.__name__, ())
+                if c is Place:
+                    names += ("latitude",)
+                for name in names:
+                    conn.execute(
+                        'CREATE INDEX IF NOT EXISTS "{0}_{1}" ON "{0}" '
+                        "(json_extract(data, '$.{1}'))".format(
+                            c.__name__, name))
+                for name in UniqueIndex.fields.get(c.__name__, ()):
+                    conn.execute(
+                        'CREATE INDEX IF NOT EXISTS "{0}_{1}" ON "{0}" '
+                        "(lower(json_extract(data, '$.{1}')))".format(
+                            c.__name__, name))
+        self.__objects = {key: self.__objects[key] for key in self.__dirty
+                          if key in self.__objects}
+        self.__loaded.clear()
+
+    def compact(self, *, wait=False):
+        """Save pending changes and rebuild the database file.
+
+        Args:
+            wait (bool): Unused, the rebuild is always synchronous.
+        """
+        self.save()
+        self.__connect().execute("VACUUM")
+
+    def close(self):
+        """Close the connection to the database."""
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+    def __connect(self):
+        """Return the connection to the database, opening it if needed."""
+        if self.__conn is None:
+            self.__conn = sqlite3.connect(self.__path)
+        return self.__conn
+
+    def __table(self, cls_name):
+        """Return the quoted table name of cls_name, or None if unknown."""
+        for c in SQLiteStorage.__classes:
+            if c.__name__ == cls_name:
+                return '"{}"'.format(cls_name)
+        return None
+
+    def __holders(self, cls_name, name, value):
+        """Return the cls_name objects whose name is value, in any case."""
+        value = UniqueIndex.normalize(value)
+        if value is None:
+            return []
+        rows = self.__connect().execute(
+            "SELECT id, data FROM {} WHERE lower(json_extract(data, "
+            "'$.{}')) = ?".format(self.__table(cls_name), name), (value,))
+        holders = []
+        for oid, data in rows:
+            key = "{}.{}".format(cls_name, oid)
+            if key in self.__dirty:
+                continue
+            if key not in self.__objects:
+                self.__objects[key] = self.__build(data)
+            holders.append(self.__objects[key])
+        prefix = cls_name + "."
+        for key in self.__dirty:
+            obj = self.__objects.get(key)
+            if (key.startswith(prefix) and obj is not None and
+                    UniqueIndex.normalize(getattr(obj, name, None)) == value):
+                holders.append(obj)
+        return holders
+
+    def __located(self, south, north):
+        """Return the (key, Place) pairs between two latitudes.
+
+        Places whose latitude or longitude is not a number are left out;
+        the ones never given any stand at the class default.
+        """
+        rows = self.__connect().execute(
+            'SELECT id, data FROM "Place" WHERE '
+            "json_extract(data, '$.latitude') BETWEEN ? AND ? OR "
+            "json_extract(data, '$.latitude') IS NULL", (south, north))
+        candidates = []
+        for oid, data in rows:
+            key = "Place." + oid
+            if key in self.__dirty:
+                continue
+            if key not in self.__objects:
+                self.__objects[key] = self.__build(data)
+            candidates.append((key, self.__objects[key]))
+        for key in self.__dirty:
+            obj = self.__objects.get(key)
+            if key.startswith("Place.") and obj is not None:
+                candidates.append((key, obj))
+        located = []
+        for key, obj in candidates:
+            lat = getattr(obj, "latitude", None)
+            lon = getattr(obj, "longitude", None)
+            if (type(lat) in (int, float) and type(lon) in (int, float) and
+                    lon == lon and south <= lat <= north):
+                located.append((key, obj))
+        return located
+
+    def __load_table(self, cls_name):
+        """Read every row of the cls_name table into the identity map.
+
+        Objects already in the map, or deleted since the last save, are
+        left alone.
+        """
+        table = self.__table(cls_name)
+        if cls_name in self.__loaded or table is None:
+            return
+        rows = self.__connect().execute(
+            "SELECT id, data FROM {}".format(table))
+        for oid, data in rows:
+            key = "{}.{}".format(cls_name, oid)
+            if key not in self.__objects and key not in self.__dirty:
+                self.__objects[key] = self.__build(data)
+        self.__loaded.add(cls_name)
+
+    @staticmethod
+    def __build(data):
+        """Return a new instance from the JSON text of its dictionary."""
+        odict = json.loads(data)
+        return registry[odict["__class__"]].from_dict(odict)
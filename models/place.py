@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ the Place class."""
+import models
 from models.base_model import BaseModel
 
 
@@ -30,3 +31,26 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    @property
+    def city(self):
+        """City: The city of the place, or None."""
+        return models.storage.get("City", self.city_id)
+
+    @property
+    def user(self):
+        """User: The owner of the place, or None."""
+        return models.storage.get("User", self.user_id)
+
+    @property
+    def reviews(self):
+        """list: The Reviews of the place, through the foreign keys."""
+        return list(models.storage.find("Review", place_id=self.id).values())
+
+    @property
+    def amenities(self):
+        """list: The Amenities of amenity_ids, read in one batch.
+
+        Ids of Amenities that do not exist are left out.
+        """
+        return models.storage.get_many("Amenity", self.amenity_ids)
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ the Review class."""
+import models
 from models.base_model import BaseModel
 
 
@@ -14,3 +15,13 @@ class Review(BaseModel):
     place_id = ""
     user_id = ""
     text = ""
+
+    @property
+    def place(self):
+        """Place: The place reviewed, or None."""
+        return models.storage.get("Place", self.place_id)
+
+    @property
+    def user(self):
+        """User: The author of the review, or None."""
+        return models.storage.get("User", self.user_id)
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ the State class."""
+import models
 from models.base_model import BaseModel
 
 
@@ -10,3 +11,8 @@ class State(BaseModel):
     """
 
     name = ""
+
+    @property
+    def cities(self):
+        """list: The Cities of the state, through the foreign keys."""
+        return list(models.storage.find("City", state_id=self.id).values())
@@ -1,12 +1,13 @@
 #!/usr/bin/python3
 """ the User class."""
+import models
 from models.base_model import BaseModel
 
 
 class User(BaseModel):
     """Represent a User.
 
-        email (string): The email of the user.
+        email (string): The email of the user, unique in any case.
         password (string): The password of the user.
         first_name (string): The first name of the user.
         last_name (string): The last name of the user.
@@ -16,3 +17,24 @@ class User(BaseModel):
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def places(self):
+        """list: The Places the user owns, through the foreign keys."""
+        return list(models.storage.find("Place", user_id=self.id).values())
+
+    @property
+    def reviews(self):
+        """list: The Reviews the user wrote, through the foreign keys."""
+        return list(models.storage.find("Review", user_id=self.id).values())
+
+    def __setattr__(self, name, value):
+        """Set an attribute, refusing an email another User has.
+
+        Raises:
+            ValueError: If name is email and value is the email of
+                another User in storage, in any case.
+        """
+        if name == "email":
+            models.storage.check_unique(self, name, value)
+        super().__setattr__(name, value)
@@ -10,10 +10,18 @@ Unittest classes:
     TestHBNBCommand_all
     TestHBNBCommand_destroy
     TestHBNBCommand_update
+    TestHBNBCommand_location
+    TestHBNBCommand_search
+    TestHBNBCommand_where
+    TestHBNBCommand_aggregate
+    TestHBNBCommand_modes
 """
 import os
+import subprocess
 import sys
+import tempfile
 import unittest
+from ast import literal_eval
 from models import storage
 from models.engine.file_storage import FileStorage
 from console import HBNBCommand
@@ -71,10 +79,15 @@ class TestHBNBCommand_help(unittest.TestCase):
             self.assertEqual(h, output.getvalue().strip())
 
     def test_help_all(self):
-        h = ("Usage: all or all <class> or <class>.all()\n        "
+        h = ("Usage: all [<class>] [--limit <n>] [--offset <n>] or "
+             "<class>.all()\n        "
              "Display string representations of all instances of a given class"
              ".\n        If no class is specified, displays all instantiated "
-             "objects.")
+             "objects.\n        Skip the first --offset instances and show at "
+             "most --limit.\n        --<foreign key> <id> only shows the "
+             "instances referencing that id,\n        as in all Review "
+             "--place_id <id>, and --amenity_ids <id>,<id> only\n        "
+             "the Places having all of these amenities.")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help all"))
             self.assertEqual(h, output.getvalue().strip())
@@ -96,10 +109,69 @@ class TestHBNBCommand_help(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd("help update"))
             self.assertEqual(h, output.getvalue().strip())
 
+    def test_help_compact(self):
+        h = ("Usage: compact\n        "
+             "Fold the storage journal into a fresh snapshot in the "
+             "background.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help compact"))
+            self.assertEqual(h, output.getvalue().strip())
+
+    def test_help_near(self):
+        h = ("Usage: near Place <latitude> <longitude> <km> or\n       "
+             "Place.near(<latitude>, <longitude>, <km>)\n        "
+             "Display the Places within km of a point, nearest first.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help near"))
+            self.assertEqual(h, output.getvalue().strip())
+
+    def test_help_within(self):
+        h = ("Usage: within Place <south> <west> <north> <east> or\n       "
+             "Place.within(<south>, <west>, <north>, <east>)\n        "
+             "Display the Places inside a latitude, longitude box.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help within"))
+            self.assertEqual(h, output.getvalue().strip())
+
+    def test_help_search(self):
+        h = ("Usage: search <class> <words> [--limit <n>] or\n       "
+             "<class>.search(<words>)\n        "
+             "Display the instances of a given class whose text has every "
+             "word,\n        best match first, showing at most --limit.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help search"))
+            self.assertEqual(h, output.getvalue().strip())
+
+    def test_help_where(self):
+        h = ("Usage: where <class> <query> or <class>.where(<query>)\n"
+             "        Display the instances of a given class meeting every "
+             "condition,\n        as in Place.where(city_id == \"<id>\", "
+             "price_by_night < 100,\n        number_rooms >= 3, "
+             "order_by=price_by_night, limit=20).\n        "
+             "order_by=-<attribute> sorts descending, offset=<n> skips "
+             "results\n        and fields=(<attribute>, ...) only shows "
+             "these attributes.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help where"))
+            self.assertEqual(h, output.getvalue().strip())
+
+    def test_help_aggregate(self):
+        h = ("Usage: aggregate <class> <function> [<attribute>] [--by "
+             "<attribute>]\n       or <class>.aggregate(<function>, "
+             "[<attribute>], [--by <attribute>])\n        Display count, or "
+             "the sum, avg, min or max of an attribute, over\n        the "
+             "instances of a given class, or per value of --by, as in\n"
+             "        aggregate Place avg price_by_night --by city_id.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help aggregate"))
+            self.assertEqual(h, output.getvalue().strip())
+
     def test_help(self):
         h = ("Documented commands (type help <topic>):\n"
              "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+             "EOF        all      count   destroy  near  search  update  "
+             "within\naggregate  compact  create  help     quit  show    "
+             "where")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(h, output.getvalue().strip())
@@ -151,6 +223,15 @@ class TestHBNBCommand_create(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd("create MyModel"))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_create_read_only_storage(self):
+        correct = "** storage is read-only **"
+        with patch("console.storage.save",
+                   side_effect=PermissionError("storage is read-only")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("create User"))
+                self.assertEqual(correct,
+                                 output.getvalue().strip().split("\n")[-1])
+
     def test_invalid_syntax(self):
         correct = "*** Unknown syntax: MyModel.create()"
         with patch("sys.stdout", new=StringIO()) as output:
@@ -737,6 +818,97 @@ class TestHBNBCommand_all(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd("MyModel.all()"))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_all_same_format_as_list(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create State"))
+            self.assertFalse(HBNBCommand().onecmd("create State"))
+        objl = [obj.__str__() for obj in storage.all("State").values()]
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all State"))
+            self.assertEqual(str(objl) + "\n", output.getvalue())
+
+    def test_all_limit_offset(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            for i in range(4):
+                self.assertFalse(HBNBCommand().onecmd("create Amenity"))
+        objl = [obj.__str__() for obj in storage.all("Amenity").values()]
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "all Amenity --limit 2 --offset 1"))
+            self.assertEqual(str(objl[1:3]), output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all Amenity --limit 0"))
+            self.assertEqual("[]", output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Amenity.all(--offset {})".format(len(objl) - 1)))
+            self.assertEqual(str(objl[-1:]), output.getvalue().strip())
+
+    def test_all_foreign_key(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create State"))
+            stId = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create City"))
+            self.assertFalse(HBNBCommand().onecmd("create City"))
+            ctIds = output.getvalue().split()
+        HBNBCommand().onecmd("update City {} state_id {}".format(
+            ctIds[0], stId))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "all City --state_id {}".format(stId)))
+            self.assertIn(ctIds[0], output.getvalue())
+            self.assertNotIn(ctIds[1], output.getvalue())
+        HBNBCommand().onecmd("City.destroy({})".format(ctIds[0]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "City.all(--state_id {})".format(stId)))
+            self.assertEqual("[]", output.getvalue().strip())
+
+    def test_all_amenities(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create Place"))
+            self.assertFalse(HBNBCommand().onecmd("create Place"))
+            plIds = output.getvalue().split()
+        HBNBCommand().onecmd("Place.update({}, {{'amenity_ids': "
+                             "['wifi', 'tv']}})".format(plIds[0]))
+        HBNBCommand().onecmd("Place.update({}, {{'amenity_ids': "
+                             "['wifi']}})".format(plIds[1]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "all Place --amenity_ids wifi,tv"))
+            self.assertIn(plIds[0], output.getvalue())
+            self.assertNotIn(plIds[1], output.getvalue())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Place.all(--amenity_ids wifi)"))
+            self.assertIn(plIds[0], output.getvalue())
+            self.assertIn(plIds[1], output.getvalue())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "all User --amenity_ids wifi"))
+            self.assertEqual("** User.amenity_ids is not a foreign key **",
+                             output.getvalue().strip())
+
+    def test_all_not_a_foreign_key(self):
+        correct = "** City.name is not a foreign key **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all City --name x"))
+            self.assertEqual(correct, output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all --state_id x"))
+            self.assertEqual("** class name missing **",
+                             output.getvalue().strip())
+
+    def test_all_invalid_limit(self):
+        correct = "** --limit needs a non-negative integer **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all User --limit -1"))
+            self.assertEqual(correct, output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all --limit"))
+            self.assertEqual(correct, output.getvalue().strip())
+
     def test_all_objects_space_notation(self):
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("create BaseModel"))
@@ -1078,6 +1250,109 @@ class TestHBNBCommand_update(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd(testCmd))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_update_value_not_evaluated(self):
+        correct = "** value missing **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create BaseModel")
+            testId = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            testCmd = "update BaseModel {} print(1)".format(testId)
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual(correct, output.getvalue().strip())
+
+    def test_update_email_taken(self):
+        email = "{}@hbnb.io".format(os.urandom(4).hex())
+        usIds = []
+        for _ in range(2):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create User")
+                usIds.append(output.getvalue().strip())
+        HBNBCommand().onecmd("update User {} email {}".format(
+            usIds[0], email))
+        correct = "** User.email {} is already taken **".format(
+            email.upper())
+        with patch("sys.stdout", new=StringIO()) as output:
+            testCmd = "update User {} email {}".format(
+                usIds[1], email.upper())
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual(correct, output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            testCmd = "User.update({}, {{'email': '{}'}})".format(
+                usIds[1], email.upper())
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual(correct, output.getvalue().strip())
+        self.assertEqual("", storage.get("User", usIds[1]).email)
+
+    def test_update_dictionary_all_or_nothing(self):
+        email = "{}@hbnb.io".format(os.urandom(4).hex())
+        usIds = []
+        for _ in range(2):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create User")
+                usIds.append(output.getvalue().strip())
+        HBNBCommand().onecmd("update User {} email {}".format(
+            usIds[0], email))
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            plId = output.getvalue().strip()
+        for testCmd in [
+                "User.update({}, {{'first_name': 'Bob', 'email': '{}'}})"
+                .format(usIds[1], email),
+                "Place.update({}, {{'name': 'Bob', 'max_guest': 'abc'}})"
+                .format(plId)]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                with patch.object(storage, "save") as save:
+                    self.assertFalse(HBNBCommand().onecmd(testCmd))
+                    save.assert_not_called()
+                self.assertTrue(output.getvalue().startswith("** "))
+        self.assertEqual("", storage.get("User", usIds[1]).first_name)
+        self.assertEqual("", storage.get("Place", plId).name)
+
+    def test_update_relationship(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            stId = output.getvalue().strip()
+        for testCmd in ["update State {} cities x".format(stId),
+                        "State.update({}, {{'cities': []}})".format(stId)]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertIn("cities", output.getvalue())
+                self.assertTrue(output.getvalue().startswith("** "))
+        self.assertEqual([], storage.get("State", stId).cities)
+
+    def test_update_special_name(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create User")
+            usId = output.getvalue().strip()
+        for testCmd, name in [
+                ("update User {} __class__ x".format(usId), "__class__"),
+                ("User.update({}, {{'__module__': 'x'}})".format(usId),
+                 "__module__"),
+                ("User.update({}, {{1: 2}})".format(usId), "1")]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual("** {} can't be updated **".format(name),
+                                 output.getvalue().strip())
+        self.assertEqual("User", type(storage.get("User", usId)).__name__)
+
+    def test_update_id_and_timestamps(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create User")
+            usId = output.getvalue().strip()
+        created_at = storage.get("User", usId).created_at
+        for testCmd, name in [
+                ("update User {} id newid".format(usId), "id"),
+                ("User.update({}, {{'created_at': 'x'}})".format(usId),
+                 "created_at"),
+                ("update User {} updated_at x".format(usId), "updated_at")]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual("** {} can't be updated **".format(name),
+                                 output.getvalue().strip())
+        self.assertIsNone(storage.get("User", "newid"))
+        self.assertEqual(usId, storage.get("User", usId).id)
+        self.assertEqual(created_at, storage.get("User", usId).created_at)
+
     def test_update_missing_attr_value_space_notation(self):
         correct = "** value missing **"
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1501,6 +1776,324 @@ class TestHBNBCommand_update(unittest.TestCase):
         self.assertEqual(9.8, test_dict["latitude"])
 
 
+class TestHBNBCommand_location(unittest.TestCase):
+    """Unittests for testing near and within of the HBNB command
+    interpreter."""
+
+    def setUp(self):
+        self.plIds = []
+        for lat, lon in [(45.5, 100.25), (45.6, 100.25), (48.0, 100.25)]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("create Place"))
+                plId = output.getvalue().strip()
+            HBNBCommand().onecmd("Place.update({}, {{'latitude': {}, "
+                                 "'longitude': {}}})".format(plId, lat, lon))
+            self.plIds.append(plId)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_near(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "near Place 45.61 100.25 20"))
+            out = output.getvalue()
+            self.assertIn(self.plIds[0], out)
+            self.assertNotIn(self.plIds[2], out)
+            self.assertLess(out.index(self.plIds[1]),
+                            out.index(self.plIds[0]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Place.near(48.0, 100.25, 1)"))
+            self.assertIn(self.plIds[2], output.getvalue())
+            self.assertNotIn(self.plIds[0], output.getvalue())
+
+    def test_within(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "within Place 45 100 46 101"))
+            self.assertIn(self.plIds[0], output.getvalue())
+            self.assertIn(self.plIds[1], output.getvalue())
+            self.assertNotIn(self.plIds[2], output.getvalue())
+        HBNBCommand().onecmd("Place.destroy({})".format(self.plIds[0]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Place.within(45, 100, 46, 101)"))
+            self.assertNotIn(self.plIds[0], output.getvalue())
+
+    def test_within_large_box(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "within Place -1e7 -1e7 1e7 1e7"))
+            for plId in self.plIds:
+                self.assertIn(plId, output.getvalue())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "near Place 45.5 100.25 1e300"))
+            for plId in self.plIds:
+                self.assertIn(plId, output.getvalue())
+
+    def test_location_errors(self):
+        errors = [("near", "** class name missing **"),
+                  ("within MyModel 1 2 3 4", "** class doesn't exist **"),
+                  ("near User 1 2 3", "** User has no location **"),
+                  ("near Place 1 2", "** coordinates missing **"),
+                  ("within Place 1 2 x 4",
+                   "** coordinates must be numbers **"),
+                  ("near Place nan 0 10", "** coordinates must be finite **"),
+                  ("near Place 0 0 nan", "** coordinates must be finite **"),
+                  ("near Place inf 0 10", "** coordinates must be finite **"),
+                  ("within Place nan 0 1 1",
+                   "** coordinates must be finite **"),
+                  ("within Place 0 0 inf inf",
+                   "** coordinates must be finite **")]
+        for command, correct in errors:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(correct, output.getvalue().strip())
+
+
+class TestHBNBCommand_search(unittest.TestCase):
+    """Unittests for testing search of the HBNB command interpreter."""
+
+    def setUp(self):
+        self.rvIds = []
+        # Reviews of other tests stay in storage, so the word is unique.
+        self.word = "quokka" + os.urandom(4).hex()
+        for text in ["{0} {0} stay", "a {0} den, very quiet",
+                     "no marsupials"]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("create Review"))
+                rvId = output.getvalue().strip()
+            HBNBCommand().onecmd('update Review {} text "{}"'.format(
+                rvId, text.format(self.word.upper())))
+            self.rvIds.append(rvId)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_search(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "search Review " + self.word))
+            out = output.getvalue()
+            self.assertLess(out.index(self.rvIds[0]),
+                            out.index(self.rvIds[1]))
+            self.assertNotIn(self.rvIds[2], out)
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Review.search(quiet {})".format(self.word)))
+            self.assertNotIn(self.rvIds[0], output.getvalue())
+            self.assertIn(self.rvIds[1], output.getvalue())
+
+    def test_search_limit_and_changes(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "search Review {} --limit 1".format(self.word)))
+            self.assertIn(self.rvIds[0], output.getvalue())
+            self.assertNotIn(self.rvIds[1], output.getvalue())
+        HBNBCommand().onecmd("destroy Review {}".format(self.rvIds[0]))
+        HBNBCommand().onecmd('update Review {} text "{}"'.format(
+            self.rvIds[2], self.word))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "search Review " + self.word))
+            self.assertNotIn(self.rvIds[0], output.getvalue())
+            self.assertIn(self.rvIds[2], output.getvalue())
+
+    def test_search_errors(self):
+        errors = [("search", "** class name missing **"),
+                  ("search MyModel x", "** class doesn't exist **"),
+                  ("search Review", "** words missing **"),
+                  ("search User x", "** User has no text fields **"),
+                  ("search Review x --limit",
+                   "** --limit needs a non-negative integer **")]
+        for command, correct in errors:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(correct, output.getvalue().strip())
+
+
+class TestHBNBCommand_where(unittest.TestCase):
+    """Unittests for testing where of the HBNB command interpreter."""
+
+    def setUp(self):
+        # Places of other tests stay in storage, so the city is unique.
+        self.city = os.urandom(4).hex()
+        self.plIds = []
+        for price, rooms in [(80, 3), (120, 4), (60, 1), (50, 5)]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("create Place"))
+                plId = output.getvalue().strip()
+            HBNBCommand().onecmd(
+                "Place.update({}, {{'city_id': '{}', 'price_by_night': {}, "
+                "'number_rooms': {}}})".format(plId, self.city, price, rooms))
+            self.plIds.append(plId)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_where(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                'Place.where(city_id == "{}", price_by_night < 100, '
+                "number_rooms >= 3, order_by=price_by_night)".format(
+                    self.city)))
+            out = output.getvalue()
+            self.assertLess(out.index(self.plIds[3]), out.index(self.plIds[0]))
+            self.assertNotIn(self.plIds[1], out)
+            self.assertNotIn(self.plIds[2], out)
+
+    def test_where_space_notation_fields_limit(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "where Place city_id == '{}', order_by=(-number_rooms), "
+                "limit=2, offset=1, fields=(id, number_rooms)".format(
+                    self.city)))
+            self.assertEqual(str([{"id": self.plIds[1], "number_rooms": 4},
+                                  {"id": self.plIds[0], "number_rooms": 3}]),
+                             output.getvalue().strip())
+
+    def test_where_errors(self):
+        errors = [("where", "** class name missing **"),
+                  ("MyModel.where(a == 1)", "** class doesn't exist **"),
+                  ("Place.where(a == b)", "** bad value b **"),
+                  ("Place.where(name == {[1]: 2})",
+                   "** bad value {[1]: 2} **"),
+                  ("Place.where(a + 1)", "** bad condition a + 1 **"),
+                  ("Place.where(a == 1, limit=-1)",
+                   "** limit needs a non-negative integer **"),
+                  ("Place.where(sort=a)", "** unknown keyword sort **"),
+                  ("Place.where(a ==)", "** bad query a == **")]
+        for command, correct in errors:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(correct, output.getvalue().strip())
+
+
+class TestHBNBCommand_aggregate(unittest.TestCase):
+    """Unittests for testing aggregate of the HBNB command interpreter."""
+
+    def setUp(self):
+        # Places of other tests stay in storage, so the cities are unique.
+        self.cities = [os.urandom(4).hex(), os.urandom(4).hex()]
+        for i, price in enumerate([80, 120, 60]):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("create Place"))
+                plId = output.getvalue().strip()
+            HBNBCommand().onecmd(
+                "Place.update({}, {{'city_id': '{}', 'price_by_night': "
+                "{}}})".format(plId, self.cities[i % 2], price))
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_aggregate_by(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "aggregate Place avg price_by_night --by city_id"))
+            groups = literal_eval(output.getvalue())
+            self.assertEqual(70.0, groups[self.cities[0]])
+            self.assertEqual(120.0, groups[self.cities[1]])
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "Place.aggregate(count, --by city_id)"))
+            groups = literal_eval(output.getvalue())
+            self.assertEqual(2, groups[self.cities[0]])
+
+    def test_aggregate(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "aggregate Place max price_by_night"))
+            self.assertLessEqual(120.0, float(output.getvalue()))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("Place.aggregate(count)"))
+            self.assertEqual(str(storage.count("Place")),
+                             output.getvalue().strip())
+
+    def test_aggregate_errors(self):
+        errors = [("aggregate", "** class name missing **"),
+                  ("aggregate MyModel count", "** class doesn't exist **"),
+                  ("aggregate Place", "** function missing **"),
+                  ("aggregate Place median price_by_night",
+                   "** unknown function median **"),
+                  ("aggregate Place sum", "** sum needs a field **"),
+                  ("aggregate Place count name", "** count takes no field **"),
+                  ("aggregate Place count --by",
+                   "** --by needs an attribute **")]
+        for command, correct in errors:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(correct, output.getvalue().strip())
+
+
+class TestHBNBCommand_modes(unittest.TestCase):
+    """Unittests for testing the storage modes chosen by environment
+    variables, in a console started in a fresh interpreter."""
+
+    console = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "console.py")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_console(self, commands, **variables):
+        """Return the output lines of the console run on commands."""
+        env = dict(os.environ, HBNB_TYPE_STORAGE="", HBNB_FILE_JOURNAL="",
+                   HBNB_FILE_LAZY="", HBNB_FILE_SHARDED="",
+                   HBNB_FILE_PARTITIONS="1", HBNB_FILE_CODEC="json",
+                   HBNB_FILE_MAPPED="")
+        env.update(variables)
+        out = subprocess.run([sys.executable, self.console],
+                             input="\n".join(commands) + "\n", env=env,
+                             cwd=self.tmpdir.name, check=True,
+                             capture_output=True, text=True).stdout
+        return [line.strip() for line in out.split(HBNBCommand.prompt)
+                if line.strip()]
+
+    def test_sharded(self):
+        ids = self.run_console(["create User", "create User",
+                                "create State"], HBNB_FILE_SHARDED="1",
+                               HBNB_FILE_PARTITIONS="2")
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmpdir.name, "file.json")))
+        self.assertTrue(os.listdir(
+            os.path.join(self.tmpdir.name, "file.json.d")))
+        lines = self.run_console(
+            ["count User", "count State", "show User {}".format(ids[0])],
+            HBNB_FILE_SHARDED="1", HBNB_FILE_PARTITIONS="2")
+        self.assertEqual(["2", "1"], lines[:2])
+        self.assertIn(ids[0], lines[2])
+
+    def test_mapped_refuses_changes(self):
+        usId = self.run_console(["create User"], HBNB_FILE_CODEC="binary")[0]
+        lines = self.run_console(
+            ["count User", "create User", "count User",
+             "destroy User {}".format(usId), "count User",
+             "update User {} first_name Betty".format(usId),
+             "show User {}".format(usId)],
+            HBNB_FILE_CODEC="binary", HBNB_FILE_MAPPED="1")
+        self.assertEqual(["1", "** storage is read-only **", "1",
+                          "** storage is read-only **", "1",
+                          "** storage is read-only **"], lines[:6])
+        self.assertNotIn("Betty", lines[6])
+
+
 class TestHBNBCommand_count(unittest.TestCase):
     """Unittests for testing count method of HBNB comand interpreter."""
 
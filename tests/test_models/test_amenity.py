@@ -5,6 +5,7 @@ Unittest classes:
     TestAmenity_instantiation
     TestAmenity_save
     TestAmenity_to_dict
+    TestAmenity_relationships
 """
 import os
 import models
@@ -12,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.amenity import Amenity
+from models.place import Place
 
 
 class TestAmenity_instantiation(unittest.TestCase):
@@ -186,5 +188,16 @@ class TestAmenity_to_dict(unittest.TestCase):
             ame.to_dict(None)
 
 
+class TestAmenity_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the Amenity class."""
+
+    def test_places(self):
+        ame = Amenity()
+        places = [Place(), Place(), Place()]
+        places[0].amenity_ids = [ame.id]
+        places[2].amenity_ids = ["other", ame.id]
+        self.assertEqual([places[0], places[2]], ame.places)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,13 +5,20 @@ Unittest classes:
     TestBaseModel_instantiation
     TestBaseModel_save
     TestBaseModel_to_dict
+    TestBaseModel_registry
+    TestBaseModel_stamps
+    TestBaseModel_from_dict
+    TestBaseModel_compact
 """
 import os
+import subprocess
+import sys
 import models
 import unittest
+import unittest.mock
 from datetime import datetime
 from time import sleep
-from models.base_model import BaseModel
+from models.base_model import BaseModel, registry, lazy_stamps
 
 
 class TestBaseModel_instantiation(unittest.TestCase):
@@ -188,5 +195,144 @@ class TestBaseModel_to_dict(unittest.TestCase):
             bmo.to_dict(None)
 
 
+class TestBaseModel_registry(unittest.TestCase):
+    """Unittests for testing the registry of model classes."""
+
+    def test_models_registered(self):
+        from models.user import User
+        from models.review import Review
+        self.assertIs(BaseModel, registry["BaseModel"])
+        self.assertIs(User, registry["User"])
+        self.assertIs(Review, registry["Review"])
+
+    def test_subclass_registered(self):
+        class Castle(BaseModel):
+            pass
+        self.addCleanup(registry.pop, "Castle")
+        self.assertIs(Castle, registry["Castle"])
+
+    def test_builtins_not_registered(self):
+        self.assertNotIn("print", registry)
+
+
+class TestBaseModel_stamps(unittest.TestCase):
+    """Unittests for testing the timestamp decoding of BaseModel."""
+
+    stamp = "2017-09-28T21:03:54.052298"
+
+    def test_stamp_without_microseconds(self):
+        bm = BaseModel(id="345", created_at="2017-09-28T21:03:54",
+                       updated_at=self.stamp)
+        self.assertEqual(datetime(2017, 9, 28, 21, 3, 54), bm.created_at)
+        self.assertEqual(datetime(2017, 9, 28, 21, 3, 54, 52298),
+                         bm.updated_at)
+
+    def test_lazy_stamps_kept_as_text(self):
+        lazy_stamps()
+        self.addCleanup(lazy_stamps, False)
+        bm = BaseModel(id="345", created_at=self.stamp,
+                       updated_at=self.stamp)
+        self.assertEqual(self.stamp, bm.__dict__["created_at"])
+        self.assertEqual(self.stamp, bm.to_dict()["created_at"])
+        self.assertEqual(datetime.fromisoformat(self.stamp), bm.created_at)
+        self.assertEqual(datetime, type(bm.__dict__["created_at"]))
+        self.assertEqual(self.stamp, bm.__dict__["updated_at"])
+
+    def test_lazy_stamps_str(self):
+        lazy_stamps()
+        self.addCleanup(lazy_stamps, False)
+        bm = BaseModel(id="345", created_at=self.stamp,
+                       updated_at=self.stamp)
+        self.assertIn("'created_at': " + repr(
+            datetime.fromisoformat(self.stamp)), bm.__str__())
+
+    def test_lazy_stamps_off(self):
+        lazy_stamps()
+        lazy_stamps(False)
+        bm = BaseModel(id="345", created_at=self.stamp,
+                       updated_at=self.stamp)
+        self.assertEqual(datetime, type(bm.__dict__["created_at"]))
+        self.assertNotIn("created_at", BaseModel.__dict__)
+
+
+class TestBaseModel_from_dict(unittest.TestCase):
+    """Unittests for testing the from_dict constructor of BaseModel."""
+
+    def test_roundtrip(self):
+        bm = BaseModel()
+        bm.name = "Holberton"
+        copy = BaseModel.from_dict(bm.to_dict())
+        self.assertEqual(BaseModel, type(copy))
+        self.assertEqual(bm.__dict__, copy.__dict__)
+        self.assertNotIn("__class__", copy.__dict__)
+
+    def test_not_stored(self):
+        odict = BaseModel().to_dict()
+        odict["id"] = "from_dict_not_stored"
+        copy = BaseModel.from_dict(odict)
+        self.assertNotIn(copy, models.storage.all().values())
+
+    def test_no_uuid_generated(self):
+        odict = BaseModel().to_dict()
+        with unittest.mock.patch("models.base_model.uuid4") as uuid4:
+            BaseModel.from_dict(odict)
+        uuid4.assert_not_called()
+
+    def test_does_not_change_arg(self):
+        odict = BaseModel().to_dict()
+        copy = dict(odict)
+        BaseModel.from_dict(odict)
+        self.assertEqual(copy, odict)
+
+    def test_kwargs_without_id(self):
+        bm = BaseModel(name="Holberton")
+        self.assertEqual(str, type(bm.id))
+        self.assertEqual(datetime, type(bm.created_at))
+
+
+class TestBaseModel_compact(unittest.TestCase):
+    """Unittests for testing compact models (HBNB_COMPACT_MODELS=1).
+
+    Compact models are chosen when the classes are defined, so every
+    check runs in a fresh interpreter.
+    """
+
+    script = """
+import json
+from models.base_model import BaseModel
+from models.place import Place
+pla = Place(id="1", created_at="2017-09-28T21:03:54.052298",
+            updated_at="2017-09-28T21:03:54")
+pla.price_by_night = 90
+pla.my_number = 89
+pla.name = "Loft"
+del pla.my_number
+copy = Place.from_dict(pla.to_dict())
+copy.number_rooms = 2
+bm = BaseModel(**BaseModel(id="2", created_at="2017-09-28T21:03:54.052298",
+                           updated_at="2017-09-28T21:03:54").to_dict())
+print(pla)
+print(json.dumps(pla.to_dict()))
+print(copy)
+print(copy.number_bathrooms, Place.max_guest, Place.amenity_ids)
+print(bm)
+print(hasattr(pla, "__dict__") and "price_by_night" in pla.__dict__)
+"""
+
+    def run_script(self, compact):
+        env = dict(os.environ, HBNB_COMPACT_MODELS=compact,
+                   HBNB_TYPE_STORAGE="", HBNB_FILE_CODEC="json")
+        return subprocess.run([sys.executable, "-c", self.script], env=env,
+                              check=True, capture_output=True,
+                              text=True).stdout.split("\n")
+
+    def test_same_output(self):
+        regular = self.run_script("0")
+        compact = self.run_script("1")
+        self.assertEqual("True", regular[-2])
+        self.assertEqual("False", compact[-2])
+        self.assertEqual(regular[:-2], compact[:-2])
+
+
 if __name__ == "__main__":
     unittest.main()
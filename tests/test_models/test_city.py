@@ -5,6 +5,7 @@ Unittest classes:
     TestCity_instantiation
     TestCity_save
     TestCity_to_dict
+    TestCity_relationships
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.city import City
+from models.place import Place
+from models.state import State
 
 
 class TestCity_instantiation(unittest.TestCase):
@@ -191,5 +194,25 @@ class TestCity_to_dict(unittest.TestCase):
             cyi.to_dict(None)
 
 
+class TestCity_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the City class."""
+
+    def test_state(self):
+        sta = State()
+        cyi = City()
+        self.assertIsNone(cyi.state)
+        cyi.state_id = sta.id
+        self.assertIs(sta, cyi.state)
+
+    def test_places(self):
+        cyi = City()
+        pla = Place()
+        self.assertEqual([], cyi.places)
+        pla.city_id = cyi.id
+        self.assertEqual([pla], cyi.places)
+        models.storage.delete(pla)
+        self.assertEqual([], cyi.places)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/binary_codec.py.
+
+Unittest classes:
+    TestBinaryCodec_dump_load
+    TestBinaryCodec_mapped
+    TestBinaryCodec_convert
+"""
+import json
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from models.engine import binary_codec
+from models.place import Place
+from models.user import User
+
+
+class TestBinaryCodec_dump_load(unittest.TestCase):
+    """Unittests for testing dump and load of the binary codec."""
+
+    def roundtrip(self, objects):
+        f = BytesIO()
+        binary_codec.dump(objects, f)
+        f.seek(0)
+        return dict(binary_codec.load(f))
+
+    def test_roundtrip_models(self):
+        pla = Place()
+        pla.name = "Loft"
+        pla.number_rooms = 3
+        pla.latitude = 37.77
+        pla.amenity_ids = ["a", "b"]
+        pla.description = None
+        usr = User()
+        usr.email = "bétty@hbnb.io"
+        objects = {"Place." + pla.id: pla.to_dict(),
+                   "User." + usr.id: usr.to_dict()}
+        self.assertEqual(objects, self.roundtrip(objects))
+
+    def test_roundtrip_keeps_field_order(self):
+        usr = User()
+        usr.last_name = "Schwartz"
+        usr.first_name = "Betty"
+        odict = self.roundtrip({"User." + usr.id: usr.to_dict()})
+        self.assertEqual(list(usr.to_dict()),
+                         list(odict["User." + usr.id]))
+
+    def test_roundtrip_non_uuid_id(self):
+        odict = {"id": "123", "created_at": "2017-09-28T21:03:54.052298",
+                 "updated_at": "2017-09-28T21:03:54.052302",
+                 "big": 1 << 70, "__class__": "BaseModel"}
+        self.assertEqual({"BaseModel.123": odict},
+                         self.roundtrip({"BaseModel.123": odict}))
+
+    def test_roundtrip_uuid_lookalike_ids(self):
+        ids = ["12345678-1234-1234-1234-1234567890AB",
+               "12345678-1234-1234-1234-1234567890 b",
+               "12345678-1234-1234-1234-1234567890xy"]
+        objects = {}
+        for oid in ids:
+            objects["BaseModel." + oid] = {
+                "id": oid, "created_at": "2017-09-28T21:03:54.052298",
+                "updated_at": "2017-09-28T21:03:54.052302",
+                "__class__": "BaseModel"}
+        self.assertEqual(objects, self.roundtrip(objects))
+
+    def test_roundtrip_empty(self):
+        self.assertEqual({}, self.roundtrip({}))
+
+    def test_uuid_ids_take_16_bytes(self):
+        usr = User()
+        f = BytesIO()
+        binary_codec.dump({"User." + usr.id: usr.to_dict()}, f)
+        self.assertNotIn(usr.id.encode(), f.getvalue())
+
+    def test_load_not_a_snapshot(self):
+        with self.assertRaises(ValueError):
+            list(binary_codec.load(BytesIO(b'{"a": 1}')))
+
+
+class TestBinaryCodec_mapped(unittest.TestCase):
+    """Unittests for testing the MappedSnapshot class."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "file.bin")
+        self.usrs = [User() for i in range(50)]
+        self.pla = Place()
+        self.pla.name = "Loft"
+        self.objects = {"User." + usr.id: usr.to_dict()
+                        for usr in self.usrs}
+        self.objects["Place." + self.pla.id] = self.pla.to_dict()
+        self.objects["BaseModel.plain"] = {
+            "id": "plain", "created_at": "2017-09-28T21:03:54.052298",
+            "updated_at": "2017-09-28T21:03:54.052302",
+            "__class__": "BaseModel"}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def mapped(self, data=None):
+        with open(self.path, "wb") as f:
+            if data is None:
+                binary_codec.dump(self.objects, f)
+            else:
+                f.write(data)
+        snapshot = binary_codec.MappedSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_get(self):
+        snapshot = self.mapped()
+        for key, odict in self.objects.items():
+            self.assertEqual(odict, snapshot.get(key))
+        self.assertIsNone(snapshot.get("User.nope"))
+        self.assertIsNone(snapshot.get("Place." + self.usrs[0].id))
+
+    def test_contains(self):
+        snapshot = self.mapped()
+        self.assertIn("Place." + self.pla.id, snapshot)
+        self.assertNotIn("MyModel.plain", snapshot)
+
+    def test_count(self):
+        snapshot = self.mapped()
+        self.assertEqual(52, len(snapshot))
+        self.assertEqual(52, snapshot.count())
+        self.assertEqual(50, snapshot.count("User"))
+        self.assertEqual(1, snapshot.count("Place"))
+        self.assertEqual(0, snapshot.count("State"))
+
+    def test_items(self):
+        snapshot = self.mapped()
+        self.assertEqual(self.objects, dict(snapshot.items()))
+        self.assertEqual(["Place." + self.pla.id],
+                         [key for key, odict in snapshot.items("Place")])
+        self.assertEqual([], list(snapshot.items("State")))
+
+    def test_snapshot_without_index(self):
+        f = BytesIO()
+        binary_codec.dump(self.objects, f)
+        data = f.getvalue()
+        footer = binary_codec._footer
+        end = footer.unpack(data[-footer.size:])[0]
+        snapshot = self.mapped(data[:end])
+        self.assertEqual(self.objects["Place." + self.pla.id],
+                         snapshot.get("Place." + self.pla.id))
+        self.assertEqual(50, snapshot.count("User"))
+
+    def test_load_ignores_index(self):
+        self.mapped()
+        with open(self.path, "rb") as f:
+            self.assertEqual(self.objects, dict(binary_codec.load(f)))
+
+    def test_not_a_snapshot(self):
+        with self.assertRaises(ValueError):
+            self.mapped(b'{"a": 1}')
+
+
+class TestBinaryCodec_convert(unittest.TestCase):
+    """Unittests for testing the conversion tools of the binary codec."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_json_to_binary_and_back(self):
+        usr = User()
+        usr.first_name = "Betty"
+        objects = {"User." + usr.id: usr.to_dict()}
+        src = os.path.join(self.tmpdir.name, "file.json")
+        mid = os.path.join(self.tmpdir.name, "file.bin")
+        dst = os.path.join(self.tmpdir.name, "back.json")
+        with open(src, "w") as f:
+            json.dump(objects, f)
+        binary_codec.json_to_binary(src, mid)
+        binary_codec.binary_to_json(mid, dst)
+        with open(dst) as f:
+            self.assertEqual(objects, json.load(f))
+        self.assertLess(os.path.getsize(mid), os.path.getsize(src))
+
+
+if __name__ == "__main__":
+    unittest.main()
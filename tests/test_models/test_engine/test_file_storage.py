@@ -4,14 +4,28 @@
 Unittest classes:
     TestFileStorage_instantiation
     TestFileStorage_methods
+    TestFileStorage_journal
+    TestFileStorage_dirty
+    TestFileStorage_compact
+    TestFileStorage_stream
+    TestFileStorage_lazy
+    TestFileStorage_sharded
+    TestFileStorage_binary
+    TestFileStorage_mapped
+    TestFileStorage_indexes
 """
 import os
 import json
 import models
+import tempfile
 import unittest
 from datetime import datetime
+from unittest.mock import patch
 from models.base_model import BaseModel
-from models.engine.file_storage import FileStorage
+from io import StringIO
+from models.engine.file_storage import FileStorage, LazyObjects
+from models.engine.file_storage import iter_members
+from models.engine.query import aggregate
 from models.user import User
 from models.state import State
 from models.place import Place
@@ -20,6 +34,43 @@ from models.amenity import Amenity
 from models.review import Review
 
 
+class TempStorage:
+    """Point FileStorage at an empty temporary directory for each test.
+
+    setUp() saves every class attribute FileStorage keeps its state in
+    and starts from empty ones; tearDown() waits for a running
+    compaction and puts them all back, so no test sees the objects,
+    pending changes, cached texts, shards or indexes of another.
+    """
+
+    state = ("file_path", "objects", "dirty", "cache", "compact_min",
+             "compact_ratio", "compactor", "unread", "stale", "indexes",
+             "indexed")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "file.json")
+        self.saved = {name: getattr(FileStorage, "_FileStorage__" + name)
+                      for name in self.state}
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__dirty = set()
+        FileStorage._FileStorage__cache = {}
+        FileStorage._FileStorage__compactor = None
+        FileStorage._FileStorage__unread = set()
+        FileStorage._FileStorage__stale = set()
+        FileStorage._FileStorage__indexes = {}
+        FileStorage._FileStorage__indexed = None
+
+    def tearDown(self):
+        compactor = FileStorage._FileStorage__compactor
+        if compactor is not None:
+            compactor.join()
+        for name, value in self.saved.items():
+            setattr(FileStorage, "_FileStorage__" + name, value)
+        self.tmpdir.cleanup()
+
+
 class TestFileStorage_instantiation(unittest.TestCase):
     """Unittests for testing instantiation of the FileStorage class."""
 
@@ -65,9 +116,22 @@ class TestFileStorage_methods(unittest.TestCase):
     def test_all(self):
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
+    def test_all_with_None(self):
+        self.assertIs(models.storage.all(), models.storage.all(None))
+
+    def test_all_with_cls(self):
+        usr = User()
+        sta = State()
+        for cls in (User, "User"):
+            usrs = models.storage.all(cls)
+            self.assertEqual(dict, type(usrs))
+            self.assertIn("User." + usr.id, usrs)
+            self.assertNotIn("State." + sta.id, usrs)
+            self.assertTrue(all(type(obj) is User for obj in usrs.values()))
+
+    def test_all_with_two_args(self):
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(User, None)
 
     def test_new(self):
         bmo = BaseModel()
@@ -165,5 +229,865 @@ class TestFileStorage_methods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(TempStorage, unittest.TestCase):
+    """Unittests for testing the journal mode of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = FileStorage(journal=True)
+
+    def journal_lines(self):
+        with open(self.path + ".log", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_journal_with_arg(self):
+        with self.assertRaises(TypeError):
+            FileStorage(True)
+
+    def test_save_appends_only_dirty_keys(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        sta = State()
+        self.storage.new(sta)
+        self.storage.save()
+        lines = self.journal_lines()
+        self.assertEqual(2, len(lines))
+        self.assertEqual(["User." + usr.id], list(lines[0].keys()))
+        self.assertEqual(["State." + sta.id], list(lines[1].keys()))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_delete_appends_null_record(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        self.storage.delete(usr)
+        self.storage.save()
+        self.assertEqual({"User." + usr.id: None}, self.journal_lines()[1])
+
+    def test_reload_replays_journal_over_snapshot(self):
+        usr = User()
+        sta = State()
+        self.storage.new(usr)
+        self.storage.new(sta)
+        FileStorage().save()
+        usr.first_name = "Betty"
+        self.storage.new(usr)
+        self.storage.delete(sta)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        objs = self.storage.all()
+        self.assertEqual(["User." + usr.id], list(objs.keys()))
+        self.assertEqual("Betty", objs["User." + usr.id].first_name)
+
+    def test_reload_ignores_torn_last_record(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"User.1": {"id": "1"')
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(["User." + usr.id], list(self.storage.all().keys()))
+
+    def test_save_after_torn_record(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"User.1": {"id": "1"')
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        users = []
+        for _ in range(3):
+            users.append(User())
+            self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual({"User." + obj.id for obj in [usr] + users},
+                         set(self.storage.all().keys()))
+        self.assertEqual(4, len(self.journal_lines()))
+
+    def test_save_after_unterminated_record(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        with open(self.path + ".log", "rb+") as f:
+            f.truncate(os.path.getsize(self.path + ".log") - 1)
+        sta = State()
+        self.storage.new(sta)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(["User." + usr.id, "State." + sta.id],
+                         list(self.storage.all().keys()))
+
+    def test_reload_corrupt_record(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"User.1": {"id": "1"\n{"User.2": null}\n')
+        FileStorage._FileStorage__objects = {}
+        with self.assertRaises(ValueError):
+            self.storage.reload()
+
+    def test_full_save_drops_journal(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        FileStorage().save()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        with open(self.path, "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+
+class TestFileStorage_dirty(TempStorage, unittest.TestCase):
+    """Unittests for testing dirty-object tracking of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.sta = State()
+        models.storage.save()
+
+    def test_mark_dirty_with_no_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.mark_dirty()
+
+    def test_save_skips_untouched_objects(self):
+        with patch.object(State, "to_dict") as to_dict:
+            models.storage.save()
+            to_dict.assert_not_called()
+
+    def test_attribute_write_marks_dirty(self):
+        self.usr.first_name = "Betty"
+        with patch.object(State, "to_dict") as to_dict:
+            models.storage.save()
+            to_dict.assert_not_called()
+        with open(self.path, "r") as f:
+            objdict = json.load(f)
+        self.assertEqual("Betty", objdict["User." + self.usr.id]["first_name"])
+        self.assertIn("State." + self.sta.id, objdict)
+
+    def test_object_save_marks_dirty(self):
+        self.usr.save()
+        with open(self.path, "r") as f:
+            objdict = json.load(f)
+        updated_at = objdict["User." + self.usr.id]["updated_at"]
+        self.assertEqual(self.usr.updated_at.isoformat(), updated_at)
+
+    def test_delete_is_not_written(self):
+        models.storage.delete(self.sta)
+        models.storage.save()
+        with open(self.path, "r") as f:
+            objdict = json.load(f)
+        self.assertEqual(["User." + self.usr.id], list(objdict.keys()))
+
+    def test_list_changed_in_place_is_written(self):
+        pl = Place()
+        pl.amenity_ids = ["x"]
+        models.storage.save()
+        pl.amenity_ids.append("y")
+        models.storage.save()
+        with open(self.path, "r") as f:
+            objdict = json.load(f)
+        self.assertEqual(["x", "y"],
+                         objdict["Place." + pl.id]["amenity_ids"])
+
+
+class TestFileStorage_compact(TempStorage, unittest.TestCase):
+    """Unittests for testing journal compaction of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = FileStorage(journal=True)
+
+    def tearDown(self):
+        self.storage.compact(wait=True)
+        super().tearDown()
+
+    def test_compact_with_arg(self):
+        with self.assertRaises(TypeError):
+            self.storage.compact(True)
+
+    def test_compact_folds_journal_into_snapshot(self):
+        usr = User()
+        sta = State()
+        self.storage.new(usr)
+        self.storage.new(sta)
+        self.storage.save()
+        self.storage.delete(sta)
+        self.storage.compact(wait=True)
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertFalse(os.path.exists(self.path + ".log.old"))
+        with open(self.path, "r") as f:
+            self.assertEqual(["User." + usr.id], list(json.load(f).keys()))
+
+    def test_saves_during_compaction_are_kept(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        self.storage.compact()
+        sta = State()
+        self.storage.new(sta)
+        self.storage.save()
+        self.storage.compact(wait=True)
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertIn("User." + usr.id, self.storage.all())
+        self.assertIn("State." + sta.id, self.storage.all())
+
+    def test_reload_replays_rotated_journal(self):
+        usr = User()
+        self.storage.new(usr)
+        self.storage.save()
+        os.replace(self.path + ".log", self.path + ".log.old")
+        sta = State()
+        self.storage.new(sta)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertIn("User." + usr.id, self.storage.all())
+        self.assertIn("State." + sta.id, self.storage.all())
+
+    def test_save_triggers_compaction_past_threshold(self):
+        FileStorage._FileStorage__compact_min = 1
+        self.storage.new(User())
+        self.storage.save()
+        self.storage._FileStorage__wait_compaction()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + ".log"))
+
+    def test_save_below_threshold_keeps_journal(self):
+        self.storage.new(User())
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(self.path + ".log"))
+
+
+class TestFileStorage_stream(TempStorage, unittest.TestCase):
+    """Unittests for testing the streaming reload of the FileStorage class."""
+
+    def test_iter_members_across_chunks(self):
+        text = ' { "a.1" : {"x": "}{,:"} , "b.2": {"y": [1, 2]},"c":null} '
+        members = list(iter_members(StringIO(text), chunk=3))
+        self.assertEqual([("a.1", {"x": "}{,:"}, '{"x": "}{,:"}'),
+                          ("b.2", {"y": [1, 2]}, '{"y": [1, 2]}'),
+                          ("c", None, "null")], members)
+
+    def test_iter_members_scalars_across_chunks(self):
+        text = '{"a": 123456, "b": 1.5e10, "c": true, "d": 1}'
+        for chunk in range(1, 10):
+            members = list(iter_members(StringIO(text), chunk=chunk))
+            self.assertEqual([("a", 123456, "123456"),
+                              ("b", 1.5e10, "1.5e10"),
+                              ("c", True, "true"),
+                              ("d", 1, "1")], members)
+
+    def test_iter_members_empty_object(self):
+        self.assertEqual([], list(iter_members(StringIO("{}"))))
+
+    def test_iter_members_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_members(StringIO('{"a": {"x": 1}'), chunk=4))
+
+    def test_iter_members_not_an_object(self):
+        with self.assertRaises(ValueError):
+            list(iter_members(StringIO('[1, 2]')))
+
+    def test_stream_yields_objects_as_loaded(self):
+        usr = User()
+        sta = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        stream = models.storage.stream()
+        first = next(stream)
+        self.assertEqual(usr.id, first.id)
+        self.assertEqual(User, type(first))
+        self.assertEqual(["User." + usr.id], list(models.storage.all()))
+        self.assertEqual([sta.id], [obj.id for obj in stream])
+        self.assertEqual(2, len(models.storage.all()))
+
+    def test_stream_missing_file(self):
+        self.assertEqual([], list(models.storage.stream()))
+
+
+class TestFileStorage_lazy(TempStorage, unittest.TestCase):
+    """Unittests for testing the lazy mode of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.sta = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage(lazy=True)
+        self.storage.reload()
+        self.objs = self.storage.all()
+
+    def test_reload_defers_objects(self):
+        self.assertEqual(LazyObjects, type(self.objs))
+        self.assertIn("User." + self.usr.id, self.objs)
+        self.assertFalse(self.objs.is_loaded("User." + self.usr.id))
+        self.assertFalse(self.objs.is_loaded("State." + self.sta.id))
+
+    def test_lookup_builds_only_that_object(self):
+        usr = self.objs["User." + self.usr.id]
+        self.assertEqual(User, type(usr))
+        self.assertEqual("Betty", usr.first_name)
+        self.assertIs(usr, self.objs.get("User." + self.usr.id))
+        self.assertFalse(self.objs.is_loaded("State." + self.sta.id))
+
+    def test_values_builds_every_object(self):
+        ids = sorted(obj.id for obj in self.objs.values())
+        self.assertEqual(sorted([self.usr.id, self.sta.id]), ids)
+
+    def test_copies_build_objects(self):
+        key = "User." + self.usr.id
+        for copy in [dict(self.objs), {**self.objs}, self.objs.copy()]:
+            self.assertEqual(User, type(copy[key]))
+            self.assertEqual("Betty", copy[key].first_name)
+            self.assertIs(self.objs[key], copy[key])
+
+    def test_copy_stays_lazy(self):
+        copy = self.objs.copy()
+        self.assertEqual(LazyObjects, type(copy))
+        self.assertFalse(copy.is_loaded("State." + self.sta.id))
+        self.assertFalse(self.objs.is_loaded("State." + self.sta.id))
+
+    def test_save_does_not_build_objects(self):
+        with patch.object(FileStorage, "_FileStorage__hydrate") as hydrate:
+            self.storage.save()
+            hydrate.assert_not_called()
+        FileStorage._FileStorage__objects = {}
+        FileStorage().reload()
+        self.assertEqual("Betty",
+                         FileStorage().all()["User." + self.usr.id].first_name)
+
+    def test_journal_delete_drops_deferred_key(self):
+        storage = FileStorage(journal=True, lazy=True)
+        storage.delete(self.objs["State." + self.sta.id])
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(["User." + self.usr.id], list(storage.all()))
+
+
+class TestFileStorage_sharded(TempStorage, unittest.TestCase):
+    """Unittests for testing the sharded mode of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.shards = self.path + ".d"
+        self.storage = FileStorage(sharded=True)
+        self.usr = User()
+        self.sta = State()
+        self.storage.save()
+
+    def test_sharded_with_journal(self):
+        with self.assertRaises(ValueError):
+            FileStorage(sharded=True, journal=True)
+
+    def test_bad_partitions(self):
+        with self.assertRaises(ValueError):
+            FileStorage(sharded=True, partitions=0)
+
+    def test_save_writes_one_file_per_class(self):
+        self.assertEqual(["State.json", "User.json"],
+                         sorted(os.listdir(self.shards)))
+        self.assertFalse(os.path.exists(self.path))
+        with open(os.path.join(self.shards, "User.json"), "r") as f:
+            self.assertEqual(["User." + self.usr.id], list(json.load(f)))
+
+    def test_save_rewrites_only_dirty_shards(self):
+        state_shard = os.path.join(self.shards, "State.json")
+        os.utime(state_shard, (0, 0))
+        self.usr.first_name = "Betty"
+        self.storage.save()
+        self.assertEqual(0, os.path.getmtime(state_shard))
+
+    def test_reload_reads_only_requested_class(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        usrs = self.storage.all("User")
+        self.assertEqual(["User." + self.usr.id], list(usrs))
+        self.assertNotIn("State." + self.sta.id,
+                         FileStorage._FileStorage__objects)
+        self.assertIn("State." + self.sta.id, self.storage.all())
+
+    def test_delete_removes_empty_shard(self):
+        self.storage.delete(self.sta)
+        self.storage.save()
+        self.assertEqual(["User.json"], os.listdir(self.shards))
+
+    def test_partitions_split_class(self):
+        storage = FileStorage(sharded=True, partitions=4)
+        for i in range(20):
+            User()
+        storage.save()
+        names = [name for name in os.listdir(self.shards)
+                 if name.startswith("User.")]
+        self.assertLess(1, len(names))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(21, len(storage.all(User)))
+
+    def test_save_reads_only_dirty_shards(self):
+        storage = FileStorage(sharded=True, partitions=4)
+        for i in range(20):
+            User()
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        usr = User()
+        storage.save()
+        self.assertLess(1, len(FileStorage._FileStorage__unread))
+        self.assertGreater(21, len(FileStorage._FileStorage__objects))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(22, len(storage.all(User)))
+        self.assertIn("User." + usr.id, storage.all())
+
+    def test_save_after_change_of_partitions(self):
+        storage = FileStorage(sharded=True, partitions=4)
+        for i in range(20):
+            User()
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(sharded=True, partitions=3)
+        storage.reload()
+        User()
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(22, len(storage.all(User)))
+        storage.save()
+        self.assertEqual(["State.json", "User.0.json", "User.1.json",
+                          "User.2.json"], sorted(os.listdir(self.shards)))
+
+    def test_single_file_is_moved_into_shards(self):
+        FileStorage().save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(2, len(self.storage.all()))
+
+
+class TestFileStorage_binary(TempStorage, unittest.TestCase):
+    """Unittests for testing the binary codec of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = FileStorage(codec="binary")
+
+    def test_bad_codec(self):
+        with self.assertRaises(ValueError):
+            FileStorage(codec="xml")
+
+    def test_binary_with_journal(self):
+        with self.assertRaises(ValueError):
+            FileStorage(codec="binary", journal=True)
+
+    def test_save_and_reload(self):
+        usr = User()
+        usr.first_name = "Betty"
+        pla = Place()
+        pla.number_rooms = 4
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.tmpdir.name, "file.bin")))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        objs = self.storage.all()
+        self.assertEqual("Betty", objs["User." + usr.id].first_name)
+        self.assertEqual(4, objs["Place." + pla.id].number_rooms)
+        self.assertEqual(usr.created_at, objs["User." + usr.id].created_at)
+
+    def test_lazy_binary(self):
+        usr = User()
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(codec="binary", lazy=True)
+        storage.reload()
+        self.assertFalse(storage.all().is_loaded("User." + usr.id))
+        self.assertEqual(usr.id, storage.get(User, usr.id).id)
+
+
+class TestFileStorage_mapped(TempStorage, unittest.TestCase):
+    """Unittests for testing the mapped mode of the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.pla = Place()
+        FileStorage(codec="binary").save()
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage(codec="binary", mapped=True)
+        self.storage.reload()
+
+    def test_mapped_needs_binary(self):
+        with self.assertRaises(ValueError):
+            FileStorage(mapped=True)
+
+    def test_reload_builds_nothing(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+
+    def test_get(self):
+        usr = self.storage.get(User, self.usr.id)
+        self.assertEqual("Betty", usr.first_name)
+        self.assertIs(usr, self.storage.get("User", self.usr.id))
+        self.assertIsNone(self.storage.get(User, self.pla.id))
+        self.assertEqual(["User." + self.usr.id],
+                         list(FileStorage._FileStorage__objects))
+
+    def test_count(self):
+        self.assertEqual(2, self.storage.count())
+        self.assertEqual(1, self.storage.count(User))
+        self.assertEqual(1, self.storage.count("Place"))
+        self.assertEqual(0, self.storage.count("State"))
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+
+    def test_count_unsaved_changes(self):
+        # Changes made through another, writable, storage.
+        State()
+        models.storage.delete(self.storage.get(Place, self.pla.id))
+        self.storage.get(User, self.usr.id)
+        models.storage.get(User, self.usr.id).last_name = "Schwartz"
+        self.assertEqual(1, self.storage.count("State"))
+        self.assertEqual(0, self.storage.count("Place"))
+        self.assertEqual(1, self.storage.count("User"))
+
+    def test_all(self):
+        self.assertEqual(["Place." + self.pla.id],
+                         list(self.storage.all(Place)))
+        models.storage.delete(self.storage.get(User, self.usr.id))
+        self.assertEqual(["Place." + self.pla.id],
+                         list(self.storage.all()))
+
+    def test_save_refused(self):
+        with self.assertRaises(PermissionError):
+            self.storage.save()
+
+    def test_changes_refused(self):
+        usr = self.storage.get(User, self.usr.id)
+        pla = self.storage.get(Place, self.pla.id)
+        self.assertEqual(1, len(self.storage.find(Place, city_id="")))
+        with patch("models.storage", self.storage):
+            with self.assertRaises(PermissionError):
+                State()
+            with self.assertRaises(PermissionError):
+                usr.first_name = "Holberton"
+            with self.assertRaises(PermissionError):
+                pla.city_id = "c"
+        with self.assertRaises(PermissionError):
+            self.storage.new(State(id="1", created_at="2017-09-28T21:03:54",
+                                   updated_at="2017-09-28T21:03:54"))
+        with self.assertRaises(PermissionError):
+            self.storage.delete(self.storage.get(User, self.usr.id))
+        self.assertEqual(2, self.storage.count())
+        self.assertEqual(0, self.storage.count(State))
+        self.assertEqual("Betty",
+                         self.storage.get(User, self.usr.id).first_name)
+        self.assertEqual(["Place." + self.pla.id],
+                         list(self.storage.find(Place, city_id="")))
+        self.assertEqual(set(), FileStorage._FileStorage__dirty)
+
+    def test_detached_changes_allowed(self):
+        with patch("models.storage", self.storage):
+            usr = User(id="tmp", created_at="2017-09-28T21:03:54",
+                       updated_at="2017-09-28T21:03:54")
+            usr.first_name = "Holberton"
+            self.storage.mark_dirty(usr)
+        self.assertEqual("Holberton", usr.first_name)
+        self.assertIsNone(self.storage.get(User, "tmp"))
+        self.assertEqual(set(), FileStorage._FileStorage__dirty)
+
+
+class TestFileStorage_indexes(TempStorage, unittest.TestCase):
+    """Unittests for testing the indexes kept by the FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = FileStorage()
+        self.pla = Place()
+        self.pla.price_by_night = 80
+
+    def test_place_columns_built(self):
+        User()
+        columns = self.storage.place_columns()
+        self.assertEqual(["Place." + self.pla.id], columns.keys())
+        self.assertIs(columns, self.storage.place_columns())
+
+    def test_place_columns_follow_changes(self):
+        columns = self.storage.place_columns()
+        pla = Place()
+        pla.price_by_night = 120
+        self.pla.price_by_night = 60
+        self.assertEqual(["Place." + self.pla.id],
+                         columns.select(price_by_night=(50, 70)))
+        self.assertEqual(["Place." + pla.id],
+                         columns.select(price_by_night=(100, None)))
+        self.storage.delete(self.pla)
+        self.assertEqual(["Place." + pla.id], columns.keys())
+
+    def test_place_columns_after_reload(self):
+        self.storage.save()
+        columns = self.storage.place_columns()
+        self.storage.reload()
+        self.assertIsNot(columns, self.storage.place_columns())
+        self.assertEqual(["Place." + self.pla.id],
+                         self.storage.place_columns().keys())
+
+    def test_place_columns_objects_replaced(self):
+        columns = self.storage.place_columns()
+        FileStorage._FileStorage__objects = {}
+        Place()
+        self.assertIsNot(columns, self.storage.place_columns())
+        self.assertEqual(1, len(self.storage.place_columns()))
+        self.assertEqual(1, len(columns))
+
+    def test_count(self):
+        User()
+        User()
+        self.assertEqual(2, self.storage.count(User))
+        self.assertEqual(1, self.storage.count("Place"))
+        self.assertEqual(3, self.storage.count())
+        self.assertEqual(0, self.storage.count("MyModel"))
+
+    def test_count_follows_changes(self):
+        self.assertEqual(1, self.storage.count(Place))
+        Place()
+        self.storage.delete(self.pla)
+        self.storage.delete(self.pla)
+        self.assertEqual(1, self.storage.count(Place))
+
+    def test_count_after_reload(self):
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(1, self.storage.count(Place))
+
+    def test_count_lazy_builds_nothing(self):
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(lazy=True)
+        storage.reload()
+        self.assertEqual(1, storage.count(Place))
+        objects = FileStorage._FileStorage__objects
+        self.assertFalse(objects.is_loaded("Place." + self.pla.id))
+
+    def test_count_sharded(self):
+        storage = FileStorage(sharded=True)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(1, storage.count(Place))
+        self.assertEqual(1, storage.count())
+
+    def test_all_cls_keeps_order(self):
+        states = [State() for i in range(5)]
+        self.storage.delete(states[1])
+        states[3].name = "California"
+        self.assertEqual(["State." + st.id for st in states if
+                          st is not states[1]],
+                         list(self.storage.all(State)))
+
+    def test_all_cls_does_not_scan(self):
+        class NoScan(dict):
+            def items(self):
+                raise AssertionError("all objects scanned")
+
+            def values(self):
+                raise AssertionError("all objects scanned")
+
+        FileStorage._FileStorage__objects = NoScan()
+        sta = State()
+        Review()
+        self.assertEqual({"State." + sta.id: sta},
+                         self.storage.all(State))
+
+    def test_find(self):
+        sta = State()
+        cities = [City(), City(), City()]
+        cities[0].state_id = sta.id
+        cities[2].state_id = sta.id
+        rev = Review()
+        rev.place_id = self.pla.id
+        rev.user_id = "u"
+        self.assertEqual({"City." + cities[0].id: cities[0],
+                          "City." + cities[2].id: cities[2]},
+                         self.storage.find(City, state_id=sta.id))
+        self.assertEqual(["Review." + rev.id], list(self.storage.find(
+            "Review", place_id=self.pla.id, user_id="u")))
+        self.assertEqual({}, self.storage.find(
+            "Review", place_id=self.pla.id, user_id="v"))
+
+    def test_find_many_ids(self):
+        cities = [City(), City(), City()]
+        for cty, state_id in zip(cities, ["s1", "s2", "s3"]):
+            cty.state_id = state_id
+        self.assertEqual([cities[1], cities[0]], list(self.storage.find(
+            City, state_id=["s2", "s1", "nope"]).values()))
+        self.assertEqual({}, self.storage.find(City, state_id=[]))
+        self.pla.city_id = "s3"
+        self.assertEqual([self.pla], list(self.storage.find(
+            Place, city_id=("s3",), amenity_ids=[]).values()))
+
+    def test_get_many(self):
+        ams = [Amenity(), Amenity()]
+        self.assertEqual([ams[1], ams[0]], self.storage.get_many(
+            Amenity, [ams[1].id, "nope", ams[0].id, ams[1].id]))
+        self.assertEqual([], self.storage.get_many("Amenity", []))
+
+    def test_find_follows_changes(self):
+        cty = City()
+        cty.state_id = "s1"
+        self.assertEqual(1, len(self.storage.find(City, state_id="s1")))
+        cty.state_id = "s2"
+        other = City()
+        other.state_id = "s1"
+        self.assertEqual([other], list(
+            self.storage.find(City, state_id="s1").values()))
+        self.storage.delete(other)
+        self.assertEqual({}, self.storage.find(City, state_id="s1"))
+
+    def test_find_not_a_foreign_key(self):
+        with self.assertRaises(ValueError):
+            self.storage.find(City, name="x")
+        with self.assertRaises(ValueError):
+            self.storage.find(State, state_id="x")
+
+    def test_find_amenities(self):
+        places = [Place(), Place(), Place()]
+        places[0].amenity_ids = ["wifi", "tv"]
+        places[1].amenity_ids = ["wifi"]
+        places[2].amenity_ids = ["tv", "wifi"]
+        places[2].city_id = "c"
+        self.assertEqual(["Place." + places[0].id, "Place." + places[2].id],
+                         list(self.storage.find(Place,
+                                                amenity_ids=["wifi", "tv"])))
+        self.assertEqual(["Place." + places[2].id], list(self.storage.find(
+            Place, amenity_ids="tv", city_id="c")))
+        self.assertEqual(4, len(self.storage.find(Place, amenity_ids=[])))
+        places[0].amenity_ids = ["wifi"]
+        self.storage.delete(places[2])
+        self.assertEqual({}, self.storage.find(Place, amenity_ids=["tv"]))
+        with self.assertRaises(ValueError):
+            self.storage.find(City, amenity_ids=["tv"])
+
+    def test_find_lazy(self):
+        cty = City()
+        cty.state_id = "s1"
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(lazy=True)
+        storage.reload()
+        self.assertEqual(["City." + cty.id],
+                         list(storage.find(City, state_id="s1")))
+
+    def test_within_and_near(self):
+        self.pla.latitude = 48.8566
+        self.pla.longitude = 2.3522
+        other = Place()
+        other.latitude = 51.5074
+        other.longitude = -0.1278
+        self.assertEqual(["Place." + self.pla.id], list(
+            self.storage.within(48, 2, 49, 3)))
+        self.assertEqual([other, self.pla], list(
+            self.storage.near(51.0, 0.0, 500).values()))
+        other.latitude = 10.0
+        self.storage.delete(self.pla)
+        self.assertEqual({}, self.storage.near(51.0, 0.0, 500))
+        self.assertEqual(["Place." + other.id], list(
+            self.storage.within(9, -1, 11, 1)))
+
+    def test_search(self):
+        rev = Review()
+        rev.text = "Garden, lovely garden"
+        other = Review()
+        other.text = "A garden"
+        self.pla.description = "Garden flat"
+        self.assertEqual([rev, other], list(
+            self.storage.search(Review, "GARDEN").values()))
+        self.assertEqual([self.pla], list(
+            self.storage.search("Place", "garden").values()))
+        rev.text = "Nothing to see"
+        self.storage.delete(other)
+        self.assertEqual({}, self.storage.search(Review, "garden"))
+        with self.assertRaises(ValueError):
+            self.storage.search(User, "garden")
+
+    def test_lookup(self):
+        usr = User()
+        usr.email = "Ann@Example.com"
+        User().email = "bob@example.com"
+        self.assertIs(usr, self.storage.lookup(User, "email",
+                                               "ann@example.COM"))
+        self.assertIsNone(self.storage.lookup("User", "email", "eve@x.io"))
+        usr.email = "ann@hbnb.io"
+        self.assertIsNone(self.storage.lookup(User, "email",
+                                              "ann@example.com"))
+        self.storage.delete(usr)
+        self.assertIsNone(self.storage.lookup(User, "email", "ann@hbnb.io"))
+        with self.assertRaises(ValueError):
+            self.storage.lookup(User, "first_name", "Ann")
+
+    def test_unique_email(self):
+        usr = User()
+        usr.email = "ann@example.com"
+        usr.email = "ANN@example.com"
+        other = User()
+        with self.assertRaises(ValueError):
+            other.email = "Ann@Example.com"
+        self.assertEqual("", other.email)
+        other.email = ""
+        copy = User(**usr.to_dict())
+        self.storage.new(copy)
+        copy.id = "copy"
+        with self.assertRaises(ValueError):
+            self.storage.new(copy)
+        self.assertNotIn("User.copy", self.storage.all())
+
+    def test_aggregate(self):
+        for city, price in [("a", 60), ("b", 100), ("a", "free")]:
+            pla = Place()
+            pla.city_id = city
+            pla.price_by_night = price
+        Review().place_id = self.pla.id
+        objs = self.storage.all(Place).values()
+        for function, field, by in [("count", None, None),
+                                    ("count", None, "city_id"),
+                                    ("avg", "price_by_night", None),
+                                    ("max", "price_by_night", "city_id"),
+                                    ("sum", "latitude", "city_id"),
+                                    ("min", "name", "city_id")]:
+            self.assertEqual(
+                aggregate(objs, function, field, by),
+                self.storage.aggregate(Place, function, field, by))
+        self.assertEqual({"": 80.0, "a": 60.0, "b": 100.0},
+                         self.storage.aggregate(Place, "min",
+                                                "price_by_night", "city_id"))
+        self.assertEqual({self.pla.id: 1}, self.storage.aggregate(
+            "Review", "count", by="place_id"))
+        with self.assertRaises(ValueError):
+            self.storage.aggregate(Place, "sum")
+
+    def test_place_columns_lazy(self):
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(lazy=True)
+        storage.reload()
+        self.assertEqual([80.0], list(
+            storage.place_columns().column("price_by_night")))
+
+
 if __name__ == "__main__":
     unittest.main()
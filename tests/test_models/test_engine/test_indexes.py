@@ -0,0 +1,391 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/indexes.py.
+
+Unittest classes:
+    TestClassIndex
+    TestForeignKeyIndex
+    TestUniqueIndex
+    TestAmenityIndex
+    TestPlaceGrid
+    TestTextIndex
+    TestPlaceColumns
+"""
+import unittest
+from math import isnan
+from models.engine.indexes import AmenityIndex, ClassIndex
+from models.engine.indexes import ForeignKeyIndex, PlaceColumns, PlaceGrid
+from models.engine.indexes import TextIndex, UniqueIndex, around, distance
+from models.engine.indexes import tokenize
+from models.review import Review
+from models.place import Place
+from models.user import User
+
+
+def place(pid, **attrs):
+    """Return a Place with id pid and the given attributes."""
+    pla = Place(id=pid, created_at="2017-09-28T21:03:54.052298",
+                updated_at="2017-09-28T21:03:54.052298")
+    pla.__dict__.update(attrs)
+    return pla
+
+
+class TestClassIndex(unittest.TestCase):
+    """Unittests for testing the ClassIndex class."""
+
+    def setUp(self):
+        self.index = ClassIndex()
+        for key in ("User.1", "User.2", "Place.1"):
+            self.index.add(key)
+
+    def test_count(self):
+        self.assertEqual(3, self.index.count())
+        self.assertEqual(2, self.index.count("User"))
+        self.assertEqual(0, self.index.count("State"))
+
+    def test_add_twice(self):
+        self.index.add("User.1", User(id="1"))
+        self.assertEqual(2, self.index.count("User"))
+
+    def test_discard(self):
+        self.index.discard("User.1")
+        self.index.discard("User.nope")
+        self.index.discard("State.1")
+        self.assertEqual(["User.2"], list(self.index.keys("User")))
+        self.assertEqual([], list(self.index.keys("State")))
+
+    def test_keys_in_order(self):
+        self.index.add("User.0")
+        self.index.add("User.1")
+        self.assertEqual(["User.1", "User.2", "User.0"],
+                         list(self.index.keys("User")))
+
+
+class TestForeignKeyIndex(unittest.TestCase):
+    """Unittests for testing the ForeignKeyIndex class."""
+
+    def setUp(self):
+        self.index = ForeignKeyIndex()
+        self.reviews = []
+        for i in range(3):
+            rev = Review(id=str(i), place_id="p{}".format(i % 2),
+                         user_id="u")
+            self.reviews.append(rev)
+            self.index.add("Review." + rev.id, rev)
+
+    def test_keys(self):
+        self.assertEqual(["Review.0", "Review.2"],
+                         list(self.index.keys("Review", "place_id", "p0")))
+        self.assertEqual(3, len(self.index.keys("Review", "user_id", "u")))
+        self.assertEqual([], list(self.index.keys("City", "state_id", "p0")))
+
+    def test_groups(self):
+        groups = self.index.groups("Review", "place_id")
+        self.assertEqual({"p0": ["Review.0", "Review.2"], "p1": ["Review.1"]},
+                         {value: list(keys) for value, keys in groups.items()})
+        self.assertEqual({}, self.index.groups("City", "state_id"))
+
+    def test_add_changed_value(self):
+        rev = self.reviews[0]
+        rev.__dict__["place_id"] = "p1"
+        self.index.add("Review.0", rev)
+        self.assertEqual(["Review.2"],
+                         list(self.index.keys("Review", "place_id", "p0")))
+        self.assertEqual(["Review.1", "Review.0"],
+                         list(self.index.keys("Review", "place_id", "p1")))
+
+    def test_add_ignores_other_classes_and_values(self):
+        self.index.add("User.1", User(id="1"))
+        rev = Review(id="9", place_id=["p0"])
+        self.index.add("Review.9", rev)
+        self.assertEqual(2, len(self.index.keys("Review", "place_id", "p0")))
+        self.index.discard("Review.9")
+
+    def test_discard(self):
+        self.index.discard("Review.0")
+        self.index.discard("Review.nope")
+        self.assertEqual(["Review.2"],
+                         list(self.index.keys("Review", "place_id", "p0")))
+        self.assertEqual(2, len(self.index.keys("Review", "user_id", "u")))
+
+
+class TestUniqueIndex(unittest.TestCase):
+    """Unittests for testing the UniqueIndex class."""
+
+    def setUp(self):
+        self.index = UniqueIndex()
+        self.index.add("User.1", User(id="1", email="Ann@Example.com"))
+        self.index.add("User.2", User(id="2", email="bob@example.com"))
+
+    def test_key(self):
+        self.assertEqual("User.1",
+                         self.index.key("User", "email", "ann@example.COM"))
+        self.assertIsNone(self.index.key("User", "email", "eve@example.com"))
+        self.assertIsNone(self.index.key("User", "email", ""))
+
+    def test_add_changed_value(self):
+        self.index.add("User.1", User(id="1", email="ann@hbnb.io"))
+        self.assertIsNone(self.index.key("User", "email", "ann@example.com"))
+        self.assertEqual("User.1",
+                         self.index.key("User", "email", "ANN@hbnb.io"))
+
+    def test_add_keeps_first_holder(self):
+        self.index.add("User.3", User(id="3", email="BOB@example.com"))
+        self.index.add("User.4", User(id="4", email=""))
+        self.index.add("User.5", User(id="5", email=["x"]))
+        self.index.add("State.1", User(id="1", email="x"))
+        self.assertEqual("User.2",
+                         self.index.key("User", "email", "bob@example.com"))
+        self.index.discard("User.3")
+        self.assertEqual("User.2",
+                         self.index.key("User", "email", "bob@example.com"))
+
+    def test_shared(self):
+        self.assertFalse(self.index.shared("User", "email"))
+        self.index.add("User.3", User(id="3", email="BOB@example.com"))
+        self.index.add("User.4", User(id="4", email="bob@EXAMPLE.com"))
+        self.assertTrue(self.index.shared("User", "email"))
+        self.index.discard("User.2")
+        self.assertEqual("User.3",
+                         self.index.key("User", "email", "bob@example.com"))
+        self.index.add("User.3", User(id="3", email="eve@example.com"))
+        self.assertFalse(self.index.shared("User", "email"))
+        self.assertEqual("User.4",
+                         self.index.key("User", "email", "bob@example.com"))
+
+    def test_discard(self):
+        self.index.discard("User.1")
+        self.index.discard("User.nope")
+        self.assertIsNone(self.index.key("User", "email", "ann@example.com"))
+
+
+class TestAmenityIndex(unittest.TestCase):
+    """Unittests for testing the AmenityIndex class."""
+
+    def setUp(self):
+        self.index = AmenityIndex()
+        for i, ids in enumerate([["wifi", "tv"], ["wifi"], ["tv", "wifi"]]):
+            self.index.add("Place.{}".format(i), place(
+                str(i), amenity_ids=ids))
+
+    def test_keys(self):
+        self.assertEqual(["Place.0", "Place.1", "Place.2"],
+                         self.index.keys("wifi"))
+        self.assertEqual(["Place.0", "Place.2"],
+                         self.index.keys("wifi", "tv"))
+        self.assertEqual([], self.index.keys("wifi", "pool"))
+        self.assertEqual([], self.index.keys())
+
+    def test_add_changed_ids(self):
+        pla = place("1", amenity_ids=["tv"])
+        self.index.add("Place.1", pla)
+        self.assertEqual(["Place.0", "Place.2"], self.index.keys("wifi"))
+        self.assertEqual(["Place.0", "Place.2", "Place.1"],
+                         self.index.keys("tv"))
+
+    def test_add_ignores_other_classes_and_values(self):
+        self.index.add("User.1", User(id="1"))
+        self.index.add("Place.3", place("3", amenity_ids="wifi"))
+        self.index.add("Place.4", place("4", amenity_ids=[1, "tv"]))
+        self.index.add("Place.5", place("5"))
+        self.assertEqual(3, len(self.index.keys("wifi")))
+        self.assertEqual(["Place.0", "Place.2", "Place.4"],
+                         self.index.keys("tv"))
+
+    def test_discard(self):
+        self.index.discard("Place.0")
+        self.index.discard("Place.nope")
+        self.assertEqual(["Place.2"], self.index.keys("tv", "wifi"))
+
+
+class TestPlaceGrid(unittest.TestCase):
+    """Unittests for testing the PlaceGrid class and its geometry."""
+
+    def setUp(self):
+        self.grid = PlaceGrid()
+        points = [(48.8566, 2.3522), (51.5074, -0.1278), (40.7128, -74.006),
+                  (-17.7134, 178.065), (-16.5, -179.9)]
+        for i, (lat, lon) in enumerate(points):
+            self.grid.add("Place.{}".format(i), place(
+                str(i), latitude=lat, longitude=lon))
+
+    def test_distance(self):
+        self.assertAlmostEqual(343.9, distance(48.8566, 2.3522,
+                                               51.5074, -0.1278), places=0)
+        self.assertEqual(0.0, distance(10.0, 20.0, 10.0, 20.0))
+
+    def test_around(self):
+        self.assertEqual(1, len(around(0.0, 0.0, 100.0)))
+        self.assertEqual(2, len(around(0.0, 179.9, 100.0)))
+        self.assertEqual([(88.0, -180.0, 90.0, 180.0)],
+                         [(round(b[0]), *b[1:]) for b in
+                          around(89.5, 10.0, 170.0)])
+
+    def test_within(self):
+        self.assertEqual(["Place.0", "Place.1"],
+                         sorted(self.grid.within(45, -5, 55, 5)))
+        self.assertEqual([], self.grid.within(0, 0, 1, 1))
+        self.assertEqual(["Place.3", "Place.4"],
+                         sorted(self.grid.within(-20, 170, -10, -170)))
+
+    def test_within_clamped(self):
+        self.assertEqual(5, len(self.grid.within(-1e7, -1e7, 1e7, 1e7)))
+        inf = float("inf")
+        self.assertEqual(5, len(self.grid.within(-inf, -inf, inf, inf)))
+        self.assertEqual([], self.grid.within(float("nan"), 0, 1, 1))
+        self.assertEqual([], self.grid.within(100, 0, 200, 1))
+
+    def test_near_not_finite(self):
+        self.assertEqual([], self.grid.near(float("nan"), 0.0, 10))
+        self.assertEqual([], self.grid.near(float("inf"), 0.0, 10))
+        self.assertEqual([], self.grid.near(48.0, 2.0, float("nan")))
+        self.assertEqual(5, len(self.grid.near(0.0, 0.0, float("inf"))))
+        self.assertEqual(["Place.0"], self.grid.near(48.8566, 362.3522, 1))
+
+    def test_near(self):
+        self.assertEqual(["Place.0", "Place.1"],
+                         self.grid.near(48.0, 2.0, 500))
+        self.assertEqual(["Place.1", "Place.0"],
+                         self.grid.near(51.0, 0.0, 500))
+        self.assertEqual(["Place.4", "Place.3"],
+                         self.grid.near(-16.5, 179.9, 250))
+
+    def test_add_moved_and_discard(self):
+        self.grid.add("Place.0", place("0", latitude=40.7, longitude=-74.0))
+        self.assertEqual(["Place.0", "Place.2"],
+                         self.grid.near(40.7, -74.0, 10))
+        self.grid.add("Place.2", place("2", latitude="x", longitude=1.0))
+        self.grid.add("Place.5", place("5", latitude=float("inf"),
+                                       longitude=1.0))
+        self.grid.add("Place.6", place("6", latitude=91.0, longitude=1.0))
+        self.grid.add("User.1", User(id="1"))
+        self.assertEqual(4, len(self.grid))
+        self.grid.discard("Place.0")
+        self.grid.discard("Place.nope")
+        self.assertEqual([], self.grid.near(40.7, -74.0, 10))
+
+
+class TestTextIndex(unittest.TestCase):
+    """Unittests for testing the TextIndex class."""
+
+    def setUp(self):
+        self.index = TextIndex()
+        texts = ["Great view, great host", "great location",
+                 "The host was rude", "Quiet and clean. Great!"]
+        for i, text in enumerate(texts):
+            self.index.add("Review.{}".format(i), Review(id=str(i),
+                                                         text=text))
+
+    def test_tokenize(self):
+        self.assertEqual(["great", "view", "great", "host_1"],
+                         tokenize("Great view,  GREAT host_1!"))
+
+    def test_search(self):
+        self.assertEqual(["Review.0", "Review.1", "Review.3"],
+                         self.index.search("Review", "great"))
+        self.assertEqual(["Review.0", "Review.1"],
+                         self.index.search("Review", "great", limit=2))
+        self.assertEqual(["Review.0"],
+                         self.index.search("Review", "host GREAT"))
+        self.assertEqual([], self.index.search("Review", "great rude"))
+        self.assertEqual([], self.index.search("Review", "..."))
+        self.assertEqual([], self.index.search("Place", "great"))
+
+    def test_search_ranks_rare_words_higher(self):
+        self.index.add("Review.4", Review(id="4", text="great great host"))
+        self.index.add("Review.5", Review(id="5", text="host host great"))
+        self.assertEqual(["Review.5", "Review.4", "Review.0"],
+                         self.index.search("Review", "great host"))
+
+    def test_add_fields_and_changes(self):
+        pla = place("1", name="Loft", description="Great loft")
+        self.index.add("Place.1", pla)
+        self.assertEqual(["Place.1"], self.index.search("Place", "loft"))
+        self.index.add("Review.1", Review(id="1", text="bad location"))
+        self.assertEqual(["Review.0", "Review.3"],
+                         self.index.search("Review", "great"))
+        self.index.add("User.1", User(id="1", first_name="great"))
+        self.index.add("Review.5", Review(id="5", text=["great"]))
+        self.assertEqual(2, len(self.index.search("Review", "great")))
+
+    def test_discard(self):
+        self.index.discard("Review.0")
+        self.index.discard("Review.nope")
+        self.assertEqual(["Review.2"], self.index.search("Review", "host"))
+
+
+class TestPlaceColumns(unittest.TestCase):
+    """Unittests for testing the PlaceColumns class."""
+
+    def setUp(self):
+        self.columns = PlaceColumns()
+        for i in range(5):
+            self.columns.add("Place.{}".format(i), place(
+                str(i), price_by_night=10 * i, number_rooms=i,
+                latitude=1.5 * i))
+
+    def test_add(self):
+        self.assertEqual(5, len(self.columns))
+        self.assertEqual([0.0, 10.0, 20.0, 30.0, 40.0],
+                         list(self.columns.column("price_by_night")))
+        self.assertEqual([0.0] * 5, list(self.columns.column("max_guest")))
+
+    def test_add_ignores_other_classes(self):
+        self.columns.add("User.1", User(id="1"))
+        self.assertEqual(5, len(self.columns))
+
+    def test_add_existing_updates_row(self):
+        self.columns.add("Place.1", place("1", price_by_night=99))
+        self.assertEqual(5, len(self.columns))
+        self.assertEqual(99.0, self.columns.column("price_by_night")[1])
+
+    def test_discard_moves_last_row(self):
+        self.columns.discard("Place.1")
+        self.columns.discard("Place.nope")
+        self.assertEqual(["Place.0", "Place.4", "Place.2", "Place.3"],
+                         self.columns.keys())
+        self.assertEqual([0.0, 40.0, 20.0, 30.0],
+                         list(self.columns.column("price_by_night")))
+        self.columns.discard("Place.3")
+        self.assertEqual(["Place.0", "Place.4", "Place.2"],
+                         self.columns.keys())
+
+    def test_select(self):
+        self.assertEqual(["Place.1", "Place.2", "Place.3"],
+                         self.columns.select(price_by_night=(10, 30)))
+        self.assertEqual(["Place.3"], self.columns.select(
+            price_by_night=(10, None), number_rooms=(None, 3),
+            latitude=(4.0, 5.0)))
+        self.assertEqual(5, len(self.columns.select()))
+
+    def test_select_unknown_field(self):
+        with self.assertRaises(KeyError):
+            self.columns.select(name=(1, 2))
+
+    def test_stats(self):
+        stats = self.columns.stats("price_by_night")
+        self.assertEqual({"count": 5, "sum": 100.0, "min": 0.0,
+                          "max": 40.0, "mean": 20.0}, stats)
+
+    def test_not_a_number(self):
+        self.columns.add("Place.9", place("9", price_by_night="cheap"))
+        self.assertTrue(isnan(self.columns.column("price_by_night")[5]))
+        self.assertNotIn("Place.9",
+                         self.columns.select(price_by_night=(None, None)))
+        self.assertEqual(5, self.columns.stats("price_by_night")["count"])
+        self.columns.discard("Place.9")
+        self.assertEqual(5, self.columns.stats("price_by_night")["count"])
+
+    def test_stats_keys(self):
+        self.columns.add("Place.9", place("9", price_by_night="cheap"))
+        stats = self.columns.stats("price_by_night",
+                                   ["Place.1", "Place.4", "Place.9"])
+        self.assertEqual({"count": 2, "sum": 50.0, "min": 10.0,
+                          "max": 40.0, "mean": 25.0}, stats)
+
+    def test_stats_empty(self):
+        self.assertEqual({"count": 0, "sum": 0, "min": None, "max": None,
+                          "mean": None}, PlaceColumns().stats("latitude"))
+
+
+if __name__ == "__main__":
+    unittest.main()
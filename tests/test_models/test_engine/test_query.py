@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+
+Unittest classes:
+    TestQuery_parse
+    TestQuery_run
+    TestQuery_aggregate
+"""
+import json
+import os
+import tempfile
+import unittest
+from models.engine.file_storage import FileStorage
+from models.engine.query import Query, aggregate
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+
+class TestQuery_parse(unittest.TestCase):
+    """Unittests for testing the parsing of queries."""
+
+    def test_conditions(self):
+        query = Query.parse("Place", 'city_id == "c", 1 <= max_guest < 4, '
+                                     '"wifi" in amenity_ids and 100 > '
+                                     'price_by_night, name not in ("a",)')
+        self.assertEqual([("city_id", "==", "c"), ("max_guest", ">=", 1),
+                          ("max_guest", "<", 4),
+                          ("amenity_ids", "has", "wifi"),
+                          ("price_by_night", "<", 100),
+                          ("name", "not in", ("a",))], query.conditions)
+
+    def test_keywords(self):
+        query = Query.parse("Place", "order_by=(city_id, -price_by_night), "
+                                     "limit=5, offset=2, fields=[id, name]")
+        self.assertEqual([], query.conditions)
+        self.assertEqual([("city_id", False), ("price_by_night", True)],
+                         query.order)
+        self.assertEqual((5, 2, ("id", "name")),
+                         (query.limit, query.offset, query.fields))
+        self.assertEqual([("name", True)],
+                         Query.parse("User", "order_by=-name").order)
+
+    def test_not_evaluated(self):
+        for text in ["__import__('os').system('true') == 1",
+                     "a == print(1)", "a is None", "a or b",
+                     "order_by=1", "limit='x'", "a == 1)(", "x",
+                     "name == {[1]: 2}", "name in {[1]}"]:
+            with self.assertRaises(ValueError):
+                Query.parse("User", text)
+
+    def test_matches(self):
+        query = Query.parse("Place", "price_by_night < 100, "
+                                     "'tv' in amenity_ids")
+        self.assertTrue(query.matches(Place(price_by_night=50,
+                                            amenity_ids=["tv"])))
+        self.assertFalse(query.matches(Place(price_by_night=150,
+                                             amenity_ids=["tv"])))
+        self.assertFalse(query.matches(Place(price_by_night="cheap",
+                                             amenity_ids=["tv"])))
+        self.assertFalse(query.matches(Place(price_by_night=50)))
+
+
+class TestQuery_run(unittest.TestCase):
+    """Unittests for testing the planning and running of queries."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__objects)
+        FileStorage._FileStorage__file_path = os.path.join(
+            self.tmpdir.name, "file.json")
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.places = []
+        for i, (price, rooms) in enumerate([(80, 3), (120, 4), (60, 1),
+                                            (50, 5), (80, 2)]):
+            pla = Place()
+            pla.city_id = "c{}".format(i % 2)
+            pla.price_by_night = price
+            pla.number_rooms = rooms
+            pla.amenity_ids = ["wifi"] if i < 3 else []
+            self.places.append(pla)
+        self.usr = User()
+        self.usr.email = "ann@example.com"
+
+    def tearDown(self):
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__objects) = self.saved
+        self.tmpdir.cleanup()
+
+    def run_query(self, cls_name, text):
+        """Return the plan and results of a query."""
+        query = Query.parse(cls_name, text)
+        return query.plan(self.storage)[0], query.run(self.storage)
+
+    def test_plan_lookup(self):
+        plan, found = self.run_query("User", 'email == "ann@example.com"')
+        self.assertEqual("lookup User.email", plan)
+        self.assertEqual([self.usr], found)
+        # The index ignores case, the condition does not.
+        plan, found = self.run_query("User", 'email == "ANN@example.com"')
+        self.assertEqual("lookup User.email", plan)
+        self.assertEqual([], found)
+
+    def test_plan_lookup_skipped(self):
+        other = User()
+        plan, found = self.run_query("User", 'email == ""')
+        self.assertEqual("scan User", plan)
+        self.assertEqual([other], found)
+        self.storage.save()
+        with open(FileStorage._FileStorage__file_path) as f:
+            objs = json.load(f)
+        dup = dict(objs["User." + self.usr.id], id="dup",
+                   email="ANN@example.com")
+        objs["User.dup"] = dup
+        with open(FileStorage._FileStorage__file_path, "w") as f:
+            json.dump(objs, f)
+        self.storage.reload()
+        plan, found = self.run_query("User", 'email == "ANN@example.com"')
+        self.assertEqual("scan User", plan)
+        self.assertEqual(["dup"], [usr.id for usr in found])
+
+    def test_plan_find(self):
+        plan, found = self.run_query(
+            "Place", 'city_id == "c0", "wifi" in amenity_ids')
+        self.assertEqual("find Place by city_id, amenity_ids", plan)
+        self.assertEqual([self.places[0], self.places[2]], found)
+
+    def test_plan_columns(self):
+        plan, found = self.run_query(
+            "Place", "price_by_night < 80, number_rooms >= 1")
+        self.assertEqual(
+            "columns of Place for price_by_night, number_rooms", plan)
+        self.assertEqual([self.places[2], self.places[3]], found)
+
+    def test_plan_scan(self):
+        Review().text = "ok"
+        plan, found = self.run_query("Review", "text == 'ok'")
+        self.assertEqual("scan Review", plan)
+        self.assertEqual(1, len(found))
+
+    def test_order_limit_offset(self):
+        _, found = self.run_query("Place", "order_by=(-price_by_night, "
+                                           "number_rooms)")
+        self.assertEqual([1, 4, 0, 2, 3], [self.places.index(p)
+                                           for p in found])
+        _, found = self.run_query("Place", "order_by=price_by_night, "
+                                           "limit=2, offset=1")
+        self.assertEqual([self.places[2], self.places[0]], found)
+        _, found = self.run_query("Place", "limit=2")
+        self.assertEqual(self.places[:2], found)
+
+    def test_fields(self):
+        _, found = self.run_query("Place", "price_by_night > 100, "
+                                           "fields=(number_rooms, nope)")
+        self.assertEqual([{"number_rooms": 4, "nope": None}], found)
+
+    def test_unsortable(self):
+        self.places[0].name = 1
+        with self.assertRaises(ValueError):
+            self.run_query("Place", "order_by=name")
+
+
+class TestQuery_aggregate(unittest.TestCase):
+    """Unittests for testing the aggregate function."""
+
+    def setUp(self):
+        self.places = [Place(city_id="a", price_by_night=80),
+                       Place(city_id="b", price_by_night=120),
+                       Place(city_id="a", price_by_night=60.5),
+                       Place(city_id="a", price_by_night="free")]
+
+    def test_aggregate(self):
+        self.assertEqual(4, aggregate(self.places, "count"))
+        self.assertEqual(260.5, aggregate(self.places, "sum",
+                                          "price_by_night"))
+        self.assertEqual(60.5, aggregate(self.places, "min",
+                                         "price_by_night"))
+        self.assertEqual(120.0, aggregate(self.places, "max",
+                                          "price_by_night"))
+        self.assertAlmostEqual(86.8333, aggregate(
+            self.places, "avg", "price_by_night"), places=4)
+
+    def test_aggregate_by(self):
+        self.assertEqual({"a": 3, "b": 1},
+                         aggregate(self.places, "count", by="city_id"))
+        self.assertEqual({"a": 70.25, "b": 120.0}, aggregate(
+            self.places, "avg", "price_by_night", by="city_id"))
+        self.assertEqual({"a": None, "b": None}, aggregate(
+            self.places, "max", "name", by="city_id"))
+
+    def test_aggregate_empty(self):
+        self.assertEqual(0, aggregate([], "count"))
+        self.assertEqual(0.0, aggregate([], "sum", "price_by_night"))
+        self.assertIsNone(aggregate([], "avg", "price_by_night"))
+        self.assertEqual({}, aggregate([], "min", "price_by_night",
+                                       by="city_id"))
+
+    def test_aggregate_errors(self):
+        for args in [("median", "price_by_night"), ("sum", None),
+                     ("count", "price_by_night")]:
+            with self.assertRaises(ValueError):
+                aggregate(self.places, *args)
+        with self.assertRaises(ValueError):
+            aggregate([Place(amenity_ids=["x"])], "count", by="amenity_ids")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,320 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/sqlite_storage.py.
+
+Unittest classes:
+    TestSQLiteStorage_instantiation
+    TestSQLiteStorage_methods
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+class TestSQLiteStorage_instantiation(unittest.TestCase):
+    """Unittests for testing instantiation of the SQLiteStorage class."""
+
+    def test_SQLiteStorage_instantiation_no_args(self):
+        self.assertEqual(type(SQLiteStorage()), SQLiteStorage)
+
+    def test_SQLiteStorage_instantiation_with_path(self):
+        self.assertEqual(type(SQLiteStorage("test.db")), SQLiteStorage)
+
+    def test_SQLiteStorage_instantiation_with_two_args(self):
+        with self.assertRaises(TypeError):
+            SQLiteStorage("test.db", None)
+
+
+class TestSQLiteStorage_methods(unittest.TestCase):
+    """Unittests for testing methods of the SQLiteStorage class."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "hbnb.db")
+        self.storage = SQLiteStorage(self.path)
+        self.storage.reload()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.sta = State()
+        self.storage.new(self.usr)
+        self.storage.new(self.sta)
+        self.storage.save()
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmpdir.cleanup()
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = SQLiteStorage(self.path)
+        self.storage.reload()
+
+    def rows(self, table):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(
+                'SELECT id FROM "{}"'.format(table)).fetchall()
+        finally:
+            conn.close()
+
+    def test_reload_creates_one_table_per_class(self):
+        conn = sqlite3.connect(self.path)
+        names = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        self.assertEqual({"BaseModel", "User", "State", "City", "Place",
+                          "Amenity", "Review"}, names)
+
+    def test_save_writes_rows(self):
+        self.assertEqual([(self.usr.id,)], self.rows("User"))
+        self.assertEqual([(self.sta.id,)], self.rows("State"))
+
+    def test_get_reads_one_row(self):
+        self.reopen()
+        usr = self.storage.get(User, self.usr.id)
+        self.assertEqual(User, type(usr))
+        self.assertEqual("Betty", usr.first_name)
+        self.assertIs(usr, self.storage.get("User", self.usr.id))
+        self.assertEqual(["User." + self.usr.id],
+                         list(self.storage._SQLiteStorage__objects))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.storage.get(User, "nope"))
+        self.assertIsNone(self.storage.get("MyModel", self.usr.id))
+
+    def test_all_with_cls(self):
+        self.reopen()
+        self.assertEqual(["User." + self.usr.id],
+                         list(self.storage.all(User)))
+        self.assertEqual(2, len(self.storage.all()))
+
+    def test_count(self):
+        self.reopen()
+        self.assertEqual(1, self.storage.count(User))
+        self.assertEqual(2, self.storage.count())
+        self.assertEqual(0, self.storage.count("MyModel"))
+        self.assertEqual({}, self.storage._SQLiteStorage__objects)
+
+    def test_count_unsaved_changes(self):
+        self.storage.new(State())
+        self.storage.delete(self.usr)
+        self.assertEqual(2, self.storage.count(State))
+        self.assertEqual(0, self.storage.count(User))
+
+    def test_find(self):
+        cty = City()
+        cty.state_id = self.sta.id
+        self.storage.new(cty)
+        self.storage.save()
+        self.reopen()
+        found = self.storage.find(City, state_id=self.sta.id)
+        self.assertEqual(["City." + cty.id], list(found))
+        self.assertIs(found["City." + cty.id],
+                      self.storage.get(City, cty.id))
+        self.assertEqual({}, self.storage.find(City, state_id="nope"))
+
+    def test_find_many_ids(self):
+        cities = [City(), City(), City()]
+        for cty, state_id in zip(cities, [self.sta.id, "s2", "s3"]):
+            cty.state_id = state_id
+            self.storage.new(cty)
+        self.storage.save()
+        self.reopen()
+        found = self.storage.find(City, state_id=["s2", self.sta.id, "x"])
+        self.assertEqual({"City." + cities[0].id, "City." + cities[1].id},
+                         set(found))
+        self.assertEqual({}, self.storage.find(City, state_id=[]))
+        cty = self.storage.get(City, cities[2].id)
+        cty.state_id = "s2"
+        self.storage.mark_dirty(cty)
+        self.assertEqual(3, len(self.storage.find(
+            City, state_id=("s2", self.sta.id))))
+
+    def test_get_many(self):
+        self.reopen()
+        found = self.storage.get_many(State, ["nope", self.sta.id,
+                                              self.sta.id])
+        self.assertEqual([self.storage.get(State, self.sta.id)], found)
+        self.storage.delete(found[0])
+        self.assertEqual([], self.storage.get_many(State, [self.sta.id]))
+        self.assertEqual([], self.storage.get_many("Nope", ["x"]))
+
+    def test_find_unsaved_changes(self):
+        cty = City()
+        cty.state_id = self.sta.id
+        self.storage.new(cty)
+        self.storage.save()
+        cty.state_id = "other"
+        self.storage.mark_dirty(cty)
+        new = City()
+        new.state_id = self.sta.id
+        self.storage.new(new)
+        self.assertEqual(["City." + new.id],
+                         list(self.storage.find(City, state_id=self.sta.id)))
+
+    def test_find_not_a_foreign_key(self):
+        with self.assertRaises(ValueError):
+            self.storage.find(City, name="x")
+
+    def test_find_amenities(self):
+        places = [Place(), Place()]
+        places[0].amenity_ids = ["wifi", "tv"]
+        places[1].amenity_ids = ["wifi"]
+        for pla in places:
+            self.storage.new(pla)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(["Place." + places[0].id], list(self.storage.find(
+            Place, amenity_ids=["tv", "wifi"])))
+        self.assertEqual(2, len(self.storage.find(Place, amenity_ids="wifi")))
+        places[1].amenity_ids = ["wifi", "tv"]
+        self.storage.new(places[1])
+        self.assertEqual(2, len(self.storage.find(Place, amenity_ids="tv")))
+
+    def test_within_and_near(self):
+        paris, london = Place(), Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        london.latitude, london.longitude = 51.5074, -0.1278
+        self.storage.new(paris)
+        self.storage.new(london)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(["Place." + paris.id], list(
+            self.storage.within(48, 2, 49, 3)))
+        self.assertEqual(["Place." + london.id, "Place." + paris.id], list(
+            self.storage.near(51.0, 0.0, 500)))
+        london.latitude = 10.0
+        self.storage.new(london)
+        self.assertEqual(["Place." + paris.id], list(
+            self.storage.near(51.0, 0.0, 500)))
+        self.storage.new(Place())
+        self.assertEqual(1, len(self.storage.within(-1, -1, 1, 1)))
+
+    def test_search(self):
+        revs = [Review(), Review(), Review()]
+        revs[0].text = "Lovely lovely garden"
+        revs[1].text = "A garden, lovely"
+        revs[2].text = "Gardening tools"
+        for rev in revs:
+            self.storage.new(rev)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(["Review." + revs[0].id, "Review." + revs[1].id],
+                         list(self.storage.search(Review, "Garden lovely")))
+        revs[2].text = "garden"
+        self.storage.new(revs[2])
+        self.assertEqual(3, len(self.storage.search("Review", "garden")))
+        self.assertEqual({}, self.storage.search("Review", "!"))
+        with self.assertRaises(ValueError):
+            self.storage.search(User, "garden")
+
+    def test_lookup_and_unique(self):
+        usr = User(email="Ann@Example.com")
+        self.storage.new(usr)
+        self.storage.save()
+        self.reopen()
+        found = self.storage.lookup(User, "email", "ann@example.COM")
+        self.assertEqual(usr.id, found.id)
+        self.assertIsNone(self.storage.lookup(User, "email", "eve@x.io"))
+        other = User(email="ANN@example.com")
+        with self.assertRaises(ValueError):
+            self.storage.new(other)
+        found.email = "ann@hbnb.io"
+        self.storage.new(found)
+        self.storage.new(other)
+        self.assertIs(other, self.storage.lookup(User, "email",
+                                                 "ann@example.com"))
+        with self.assertRaises(ValueError):
+            self.storage.lookup(User, "password", "x")
+
+    def test_has_duplicates(self):
+        usr = User(email="Ann@Example.com")
+        self.storage.new(usr)
+        self.storage.save()
+        self.assertFalse(self.storage.has_duplicates(User, "email"))
+        data = json.dumps(User(id="dup", email="ANN@example.com",
+                               created_at="2017-09-28T21:03:54",
+                               updated_at="2017-09-28T21:03:54").to_dict())
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute('INSERT INTO "User" (id, data) VALUES (?, ?)',
+                         ("dup", data))
+        conn.close()
+        self.reopen()
+        self.assertTrue(self.storage.has_duplicates("User", "email"))
+        dup = self.storage.get(User, "dup")
+        dup.email = "eve@hbnb.io"
+        self.storage.mark_dirty(dup)
+        self.assertFalse(self.storage.has_duplicates("User", "email"))
+        with self.assertRaises(ValueError):
+            self.storage.has_duplicates(User, "password")
+
+    def test_aggregate(self):
+        for price in (60, 100):
+            pla = Place()
+            pla.city_id = "a"
+            pla.price_by_night = price
+            self.storage.new(pla)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(2, self.storage.aggregate(Place, "count"))
+        self.assertEqual({"a": 80.0}, self.storage.aggregate(
+            "Place", "avg", "price_by_night", "city_id"))
+        with self.assertRaises(ValueError):
+            self.storage.aggregate(Place, "count", "name")
+
+    def test_find_uses_index(self):
+        conn = sqlite3.connect(self.path)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM \"Review\" WHERE "
+            "json_extract(data, '$.place_id') = ?", ("x",)).fetchall()
+        many = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM \"Review\" WHERE "
+            "json_extract(data, '$.place_id') IN (?, ?)",
+            ("x", "y")).fetchall()
+        conn.close()
+        self.assertIn("Review_place_id", str(plan))
+        self.assertIn("Review_place_id", str(many))
+
+    def test_save_upserts_changed_object(self):
+        self.usr.first_name = "Holberton"
+        self.storage.new(self.usr)
+        self.storage.save()
+        self.reopen()
+        usr = self.storage.get(User, self.usr.id)
+        self.assertEqual("Holberton", usr.first_name)
+        self.assertEqual(1, len(self.rows("User")))
+
+    def test_delete(self):
+        self.storage.delete(self.sta)
+        self.assertIsNone(self.storage.get(State, self.sta.id))
+        self.assertEqual({}, self.storage.all(State))
+        self.storage.save()
+        self.assertEqual([], self.rows("State"))
+
+    def test_mark_dirty(self):
+        self.usr.last_name = "Schwartz"
+        self.storage.mark_dirty(self.usr)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual("Schwartz",
+                         self.storage.get(User, self.usr.id).last_name)
+
+    def test_save_with_arg(self):
+        with self.assertRaises(TypeError):
+            self.storage.save(None)
+
+    def test_reload_with_arg(self):
+        with self.assertRaises(TypeError):
+            self.storage.reload(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
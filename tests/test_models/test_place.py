@@ -5,6 +5,7 @@ Unittest classes:
     TestPlace_instantiation
     TestPlace_save
     TestPlace_to_dict
+    TestPlace_relationships
 """
 import os
 import models
@@ -12,6 +13,10 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.place import Place
+from models.amenity import Amenity
+from models.city import City
+from models.review import Review
+from models.user import User
 
 
 class TestPlace_instantiation(unittest.TestCase):
@@ -245,5 +250,34 @@ class TestPlace_to_dict(unittest.TestCase):
             pla.to_dict(None)
 
 
+class TestPlace_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the Place class."""
+
+    def test_city_and_user(self):
+        cyi = City()
+        usr = User()
+        pla = Place()
+        self.assertIsNone(pla.city)
+        self.assertIsNone(pla.user)
+        pla.city_id = cyi.id
+        pla.user_id = usr.id
+        self.assertIs(cyi, pla.city)
+        self.assertIs(usr, pla.user)
+
+    def test_reviews(self):
+        pla = Place()
+        reviews = [Review(), Review()]
+        for rev in reviews:
+            rev.place_id = pla.id
+        self.assertEqual(reviews, pla.reviews)
+
+    def test_amenities(self):
+        ams = [Amenity(), Amenity()]
+        pla = Place()
+        self.assertEqual([], pla.amenities)
+        pla.amenity_ids = [ams[1].id, "nope", ams[0].id]
+        self.assertEqual([ams[1], ams[0]], pla.amenities)
+
+
 if __name__ == "__main__":
     unittest.main()
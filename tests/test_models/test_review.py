@@ -5,6 +5,7 @@ Unittest classes:
     TestReview_instantiation
     TestReview_save
     TestReview_to_dict
+    TestReview_relationships
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.review import Review
+from models.place import Place
+from models.user import User
 
 
 class TestReview_instantiation(unittest.TestCase):
@@ -197,5 +200,20 @@ class TestReview_to_dict(unittest.TestCase):
             rev.to_dict(None)
 
 
+class TestReview_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the Review class."""
+
+    def test_place_and_user(self):
+        pla = Place()
+        usr = User()
+        rev = Review()
+        self.assertIsNone(rev.place)
+        self.assertIsNone(rev.user)
+        rev.place_id = pla.id
+        rev.user_id = usr.id
+        self.assertIs(pla, rev.place)
+        self.assertIs(usr, rev.user)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@ Unittest classes:
     TestState_instantiation
     TestState_save
     TestState_to_dict
+    TestState_relationships
 """
 import os
 import models
@@ -12,6 +13,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.state import State
+from models.city import City
 
 
 class TestState_instantiation(unittest.TestCase):
@@ -185,5 +187,24 @@ class TestState_to_dict(unittest.TestCase):
             sta.to_dict(None)
 
 
+class TestState_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the State class."""
+
+    def test_cities(self):
+        sta = State()
+        self.assertEqual([], sta.cities)
+        cities = [City(state_id=sta.id), City(), City(state_id=sta.id)]
+        for cty in cities:
+            models.storage.new(cty)
+        self.assertEqual([cities[0], cities[2]], sta.cities)
+        cities[0].state_id = "other"
+        models.storage.mark_dirty(cities[0])
+        self.assertEqual([cities[2]], sta.cities)
+
+    def test_cities_read_only(self):
+        with self.assertRaises(AttributeError):
+            State().cities = []
+
+
 if __name__ == "__main__":
     unittest.main()
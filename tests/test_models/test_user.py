@@ -5,6 +5,7 @@ Unittest classes:
     TestUser_instantiation
     TestUser_save
     TestUser_to_dict
+    TestUser_relationships
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.user import User
+from models.place import Place
+from models.review import Review
 
 
 class TestUser_instantiation(unittest.TestCase):
@@ -191,5 +194,18 @@ class TestUser_to_dict(unittest.TestCase):
             usr.to_dict(None)
 
 
+class TestUser_relationships(unittest.TestCase):
+    """Unittests for testing the relationships of the User class."""
+
+    def test_places_and_reviews(self):
+        usr = User()
+        self.assertEqual(([], []), (usr.places, usr.reviews))
+        pla = Place()
+        pla.user_id = usr.id
+        rev = Review()
+        rev.user_id = usr.id
+        self.assertEqual(([pla], [rev]), (usr.places, usr.reviews))
+
+
 if __name__ == "__main__":
     unittest.main()